@@ -0,0 +1,73 @@
+"""Benchmark of the explorer implementations.
+
+Runs the same queries through the graph with the 'agent' explorer (LLM tool
+calling loop) and the 'search' explorer (direct search and deterministic
+ranking), with offline fakes simulating the LLM and search latencies, and
+reports the latency and the LLM tokens of each.
+
+Usage:
+    python benchmarks/explorer_bench.py [--queries N] [--llm-latency S]
+        [--search-latency S]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import offline_pipeline  # noqa: E402
+
+from websearch import query  # noqa: E402
+
+
+async def run(explorer: str, queries: int) -> tuple[list[float], list[int]]:
+    """Run queries one after the other.
+
+    Args:
+        explorer: The explorer implementation.
+        queries: The number of queries.
+
+    Returns:
+        tuple[list[float], list[int]]: The latency and the tokens of each query.
+    """
+    latencies, tokens = [], []
+    for i in range(queries):
+        start = time.perf_counter()
+        async for event in query.exec(
+            f"What is the impact of question {i} on the benchmark?",
+            result_limit=3,
+            checkpoint=False,
+            explorer=explorer,
+        ):
+            if "usage" in event:
+                tokens.append(event["usage"]["tokens"])
+        latencies.append(time.perf_counter() - start)
+    return latencies, tokens
+
+
+def main():
+    """Run the benchmark and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with offline_pipeline(
+        llm_latency=args.llm_latency, search_latency=args.search_latency
+    ):
+        for explorer in ("agent", "search"):
+            latencies, tokens = asyncio.run(run(explorer, args.queries))
+            print(
+                f"{explorer:>6}: mean {statistics.mean(latencies):.2f}s, "
+                f"max {max(latencies):.2f}s, "
+                f"{statistics.mean(tokens):.0f} LLM tokens per query"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Offline fakes for the benchmarks.
+
+Replaces the LLM agents with deterministic function models, the web search
+with a generator of synthetic results and the page fetch with a generator of
+synthetic pages, so the pipeline can be benchmarked without an LLM server, the
+Brave Search API or a browser.
+"""
+
+import asyncio
+import contextlib
+import random
+import zlib
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+import websearch.nodes.explorer as explorer_node
+import websearch.tools.directanswer as directanswer
+import websearch.tools.fetchcoordinator as fetchcoordinator
+import websearch.tools.websearch as websearch_tool
+from websearch.agents.explorer import explorerAgent
+from websearch.agents.querygen import querygenAgent
+from websearch.agents.syntetizer import syntetizerAgent
+from websearch.warmup import warmup_settings
+
+WORDS = (
+    "carbon footprint phone manufacturing emissions battery display chip "
+    "recycling lifetime energy grid transport packaging report device"
+).split()
+
+
+def result_model(result: dict, *, latency: float = 0.0) -> FunctionModel:
+    """Create a model that immediately returns a structured result.
+
+    Args:
+        result: The arguments of the result tool call.
+        latency: Simulated response time in seconds.
+
+    Returns:
+        FunctionModel: The fake model.
+    """
+
+    async def respond(messages, info):
+        await asyncio.sleep(latency)
+        return ModelResponse(parts=[ToolCallPart(info.result_tools[0].name, result)])
+
+    return FunctionModel(function=respond)
+
+
+def searching_model(result: dict, *, latency: float = 0.0) -> FunctionModel:
+    """Create a model that calls the websearch tool before returning a result.
+
+    Like the explorer agent, it takes two round trips, and the second one
+    receives the search results in its prompt.
+
+    Args:
+        result: The arguments of the result tool call.
+        latency: Simulated response time of each round trip in seconds.
+
+    Returns:
+        FunctionModel: The fake model.
+    """
+
+    async def respond(messages, info):
+        await asyncio.sleep(latency)
+        if any(isinstance(part, ToolReturnPart) for part in messages[-1].parts):
+            return ModelResponse(
+                parts=[ToolCallPart(info.result_tools[0].name, result)]
+            )
+        query = messages[-1].parts[-1].content.split(":", 1)[-1][:60]
+        return ModelResponse(parts=[ToolCallPart("websearch", {"query": query})])
+
+    return FunctionModel(function=respond)
+
+
+def fake_results(query: str, count: int) -> dict:
+    """Generate deterministic web search results.
+
+    Args:
+        query: The search query.
+        count: The number of results.
+
+    Returns:
+        dict: A search response with `count` web results.
+    """
+    return {
+        "web": {
+            "results": [
+                {
+                    "url": f"https://example{i}.com/{zlib.crc32(query.encode()) % 1000}",
+                    "title": fake_text(f"{query}title{i}", 40),
+                    "description": fake_text(f"{query}{i}", 200),
+                    "extra_snippets": [fake_text(f"{query}extra{i}", 150)],
+                }
+                for i in range(count)
+            ]
+        }
+    }
+
+
+def fake_text(seed: str, size: int) -> str:
+    """Generate a deterministic page text.
+
+    Args:
+        seed: Seed of the generator, e.g. the page url.
+        size: Approximate size of the text in characters.
+
+    Returns:
+        str: The text.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return "\n".join(sentences)
+
+
+@contextlib.contextmanager
+def offline_pipeline(
+    *,
+    pages_per_branch: int = 3,
+    page_size: int = 20_000,
+    llm_latency: float = 0.0,
+    fetch_latency: float = 0.0,
+    search_latency: float = 0.0,
+):
+    """Run the graph against fake agents, a fake search and a fake page fetch.
+
+    Args:
+        pages_per_branch: Number of pages returned by each explorer.
+        page_size: Size of each fetched page text in characters.
+        llm_latency: Simulated latency of every LLM call in seconds.
+        fetch_latency: Simulated latency of every page fetch in seconds.
+        search_latency: Simulated latency of every web search in seconds.
+    """
+
+    async def fetch(url, **kwargs):
+        await asyncio.sleep(fetch_latency)
+        return {"url": url, "text": fake_text(url, page_size), "truncated": False}
+
+    async def search(query, limit_results=3):
+        await asyncio.sleep(search_latency)
+        return {"data": fake_results(query, limit_results), "error": None}
+
+    explorer_result = {
+        "pages": [
+            {
+                "url": f"https://example{i}.com/page",
+                "category": "article",
+                "content": fake_text(f"content{i}", 500),
+            }
+            for i in range(pages_per_branch)
+        ]
+    }
+    patched = [
+        (fetchcoordinator, "navigate_link", fetch),
+        (explorer_node, "search", search),
+        (directanswer, "search", search),
+        (websearch_tool, "search", search),
+        (warmup_settings, "enabled", False),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patched]
+    for module, name, value in patched:
+        setattr(module, name, value)
+    try:
+        with (
+            querygenAgent.override(
+                model=result_model(
+                    {"queries": ["query one", "query two", "query three"]},
+                    latency=llm_latency,
+                )
+            ),
+            explorerAgent.override(
+                model=searching_model(explorer_result, latency=llm_latency)
+            ),
+            syntetizerAgent.override(
+                model=result_model(
+                    {"answer": "answer", "sources": [], "error": None},
+                    latency=llm_latency,
+                )
+            ),
+        ):
+            yield
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
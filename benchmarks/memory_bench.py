@@ -0,0 +1,93 @@
+"""Memory benchmark of concurrent queries.
+
+Runs concurrent queries through the graph with offline fakes and reports the
+resident memory growth per query and the size of the checkpoints kept by the
+checkpointer. Page texts live in the content store and checkpoints only carry
+their handles.
+
+Usage:
+    python benchmarks/memory_bench.py [--queries N] [--page-size CHARS]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import offline_pipeline  # noqa: E402
+
+from websearch import query  # noqa: E402
+from websearch.graph import graph  # noqa: E402
+
+
+def rss_bytes() -> int:
+    """Get the resident set size of the process.
+
+    Returns:
+        int: The resident memory in bytes.
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def payload_bytes(obj) -> int:
+    """Sum the size of the serialized payloads held by a checkpointer.
+
+    Args:
+        obj: The checkpointer storage, or a part of it.
+
+    Returns:
+        int: The number of bytes.
+    """
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(payload_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(payload_bytes(v) for v in obj)
+    return 0
+
+
+async def run(queries: int) -> None:
+    """Run concurrent queries to completion.
+
+    Args:
+        queries: The number of concurrent queries.
+    """
+
+    async def one(i):
+        async for _ in query.exec(f"question {i}", fetch_pages=True):
+            pass
+
+    await asyncio.gather(*(one(i) for i in range(queries)))
+
+
+def main():
+    """Run the benchmark and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with offline_pipeline(page_size=args.page_size):
+        asyncio.run(run(1))  # warm up imports and caches
+        before = rss_bytes()
+        asyncio.run(run(args.queries))
+        after = rss_bytes()
+
+    saver = graph.checkpointer
+    checkpoints = sum(
+        payload_bytes(getattr(saver, name, None))
+        for name in ("storage", "writes", "blobs")
+    )
+    print(f"queries: {args.queries}, page size: {args.page_size} chars")
+    print(f"RSS growth per query: {(after - before) / args.queries / 1024:.1f} KiB")
+    print(
+        f"checkpoint bytes per query: {checkpoints / (args.queries + 1) / 1024:.1f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
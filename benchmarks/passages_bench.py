@@ -0,0 +1,56 @@
+"""Benchmark of the passage ranking stage.
+
+Measures the page tokens sent to the syntetizer with and without passage
+ranking, and the time spent ranking, over a fixture of pre-fetched pages.
+
+Usage:
+    python benchmarks/passages_bench.py [fixture.json] [--top-k N]
+"""
+
+import argparse
+import json
+import pathlib
+import time
+
+from websearch.records import PageRecord
+from websearch.retrieval.passages import page_text, rank_passages
+from websearch.tokens import estimate_tokens
+
+FIXTURE = pathlib.Path(__file__).parent / "fixtures" / "pages.json"
+
+
+def main():
+    """Run the benchmark and print a report per question."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("fixture", nargs="?", default=FIXTURE, type=pathlib.Path)
+    parser.add_argument("--top-k", type=int, default=None)
+    args = parser.parse_args()
+
+    total_before = total_after = 0
+    for case in json.loads(args.fixture.read_text()):
+        queries = [case["question"], *case.get("queries", [])]
+        pages = [PageRecord.create(**page) for page in case["pages"]]
+        start = time.perf_counter()
+        passages = rank_passages(pages, queries, top_k=args.top_k)
+        elapsed = time.perf_counter() - start
+
+        before = sum(estimate_tokens(page_text(p)) for p in pages)
+        after = sum(estimate_tokens(p.text) for p in passages)
+        total_before += before
+        total_after += after
+        print(
+            f"{case['question'][:60]!r}: {before} -> {after} tokens "
+            f"({100 * (before - after) / max(before, 1):.0f}% saved) "
+            f"in {elapsed * 1000:.1f} ms"
+        )
+        for p in passages[:3]:
+            print(f"    {p.score:5.2f} {p.url} {p.text[:70]!r}")
+
+    print(
+        f"total: {total_before} -> {total_after} tokens "
+        f"({100 * (total_before - total_after) / max(total_before, 1):.0f}% saved)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Load test of the HTTP server.
+
+Starts the server in-process on a free port, with offline fakes simulating the
+LLM, search and fetch latencies, and sends queries from concurrent clients
+over real HTTP connections. Reports the latency to the first event and to the
+answer, the throughput and the runs refused by the admission control.
+
+Usage:
+    python benchmarks/server_bench.py [--clients N] [--queries N]
+        [--max-concurrent N] [--llm-latency S] [--search-latency S]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fakes import offline_pipeline  # noqa: E402
+
+from websearch.server import ServerSettings, create_app  # noqa: E402
+
+
+async def client(
+    http: httpx.AsyncClient, queries: list[str], stats: dict[str, list]
+) -> None:
+    """Send queries one after the other, retrying refused ones.
+
+    Args:
+        http: The HTTP client.
+        queries: The questions to send.
+        stats: Where to record the latencies and the refusals.
+    """
+    for question in queries:
+        while True:
+            start = time.perf_counter()
+            first = None
+            body = {"question": question, "checkpoint": False, "explorer": "search"}
+            async with http.stream("POST", "/query", json=body) as response:
+                if response.status_code == 429:
+                    stats["refused"].append(1)
+                    await asyncio.sleep(0.05)
+                    continue
+                async for line in response.aiter_lines():
+                    if first is None and line.startswith("event:"):
+                        first = time.perf_counter() - start
+            stats["first_event"].append(first)
+            stats["total"].append(time.perf_counter() - start)
+            break
+
+
+async def run(args) -> dict[str, list]:
+    """Serve the application and load it with the clients.
+
+    Args:
+        args: The command line arguments.
+
+    Returns:
+        dict[str, list]: The recorded latencies and refusals.
+    """
+    app = create_app(settings=ServerSettings(SERVER_MAX_CONCURRENT=args.max_concurrent))
+    server = uvicorn.Server(uvicorn.Config(app, port=0, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    stats = {"first_event": [], "total": [], "refused": []}
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+    ) as http:
+        await asyncio.gather(
+            *(
+                client(
+                    http,
+                    [
+                        f"Question {c}-{i} for the load test?"
+                        for i in range(args.queries)
+                    ],
+                    stats,
+                )
+                for c in range(args.clients)
+            )
+        )
+
+    server.should_exit = True
+    await serving
+    return stats
+
+
+def main():
+    """Run the load test and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with offline_pipeline(
+        llm_latency=args.llm_latency, search_latency=args.search_latency
+    ):
+        start = time.perf_counter()
+        stats = asyncio.run(run(args))
+        elapsed = time.perf_counter() - start
+
+    total = sorted(stats["total"])
+    print(f"{len(total)} runs by {args.clients} clients in {elapsed:.2f}s")
+    print(f"throughput:  {len(total) / elapsed:.1f} runs/s")
+    print(f"first event: p50 {statistics.median(stats['first_event']):.3f}s")
+    print(
+        f"answer:      p50 {statistics.median(total):.3f}s"
+        f"  p95 {total[int(len(total) * 0.95) - 1]:.3f}s"
+    )
+    print(f"refused:     {len(stats['refused'])} (429)")
+
+
+if __name__ == "__main__":
+    main()
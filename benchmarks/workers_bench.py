@@ -0,0 +1,105 @@
+"""Scaling benchmark of the worker pool.
+
+Runs the same batch of queries through pools of 1 to N worker processes, with
+offline fakes for the LLM and the search, and a page fetch that parses a
+synthetic HTML page with the real extractor, so the runs are CPU-bound like
+page-heavy runs are. Reports the throughput and the speedup of each pool size.
+
+Usage:
+    python benchmarks/workers_bench.py [--max-workers N] [--queries N]
+        [--concurrency N] [--page-size CHARS]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import fake_text, offline_pipeline  # noqa: E402
+
+from websearch.workers import WorkerPool, WorkerSettings  # noqa: E402
+
+_fakes = contextlib.ExitStack()
+
+
+def install_fakes(page_size: int, llm_latency: float) -> None:
+    """Replace the pipeline with offline fakes, in a worker process.
+
+    Args:
+        page_size: Size of the text of each fetched page in characters.
+        llm_latency: Simulated latency of every LLM call in seconds.
+    """
+    import websearch.tools.fetchcoordinator as fetchcoordinator
+    from websearch.tools.navigatelinks import extract_page_text
+
+    async def fetch(url, **kwargs):
+        paragraphs = fake_text(url, page_size).split("\n")
+        html = "<main class='main'>" + "".join(
+            f"<div><p>{p}</p><span>{p[:40]}</span></div>" for p in paragraphs
+        )
+        return {"url": url, "text": extract_page_text(html), "truncated": False}
+
+    _fakes.enter_context(offline_pipeline(llm_latency=llm_latency))
+    fetchcoordinator.navigate_link = fetch
+
+
+async def run(workers: int, args) -> float:
+    """Run the batch of queries through a pool.
+
+    Args:
+        workers: The number of worker processes.
+        args: The command line arguments.
+
+    Returns:
+        float: The seconds the batch took.
+    """
+    initializer = functools.partial(install_fakes, args.page_size, args.llm_latency)
+    settings = WorkerSettings(WORKER_SHARED_BROWSER=False)
+    async with WorkerPool(workers, initializer=initializer, settings=settings) as pool:
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def one(i: int) -> None:
+            async with slots:
+                async for _ in pool.exec(
+                    f"Question {workers}-{i} of the scaling benchmark?",
+                    checkpoint=False,
+                    fetch_pages=True,
+                    explorer="search",
+                ):
+                    pass
+
+        # Warm up every worker before timing.
+        await asyncio.gather(*(one(-i - 1) for i in range(workers)))
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.queries)))
+        return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--page-size", type=int, default=5_000)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>7} {'seconds':>8} {'runs/s':>7} {'speedup':>8}")
+    for workers in range(1, args.max_workers + 1):
+        elapsed = asyncio.run(run(workers, args))
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>7} {elapsed:>8.2f} {args.queries / elapsed:>7.1f}"
+            f" {baseline / elapsed:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -43,7 +43,7 @@ class Response(BaseModel):
 
 
 chunkanalyzerAgent = Agent(
-    model=ctx.get_model_provider(),
+    model=ctx.get_model_provider("chunkanalyzer"),
     system_prompt=syste_prompt.text(),
     result_type=Response,
     result_retries=3,
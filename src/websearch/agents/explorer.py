@@ -63,7 +63,7 @@ class Response(BaseModel):
 
 
 explorerAgent = Agent(
-    model=ctx.get_model_provider(),
+    model=ctx.get_model_provider("explorer"),
     system_prompt=system_prompt.text(),
     tools=[WebSearchTool],
     result_type=Response,
@@ -17,7 +17,7 @@ syste_prompt = SystemPrompt(
     instructions=[
         "Read the user's question",
         "Define the main topic of the question",
-        "Generate 3 queries that are relevant for answering the question",
+        "Generate the requested number of queries that are relevant for answering the question",
         "If the question is not clear, return an error message",
     ],
     dontdo=[
@@ -42,7 +42,7 @@ class Response(BaseModel):
 
 
 querygenAgent = Agent(
-    model=ctx.get_model_provider(),
+    model=ctx.get_model_provider("querygen"),
     system_prompt=syste_prompt.text(),
     result_type=Response,
     result_retries=3,
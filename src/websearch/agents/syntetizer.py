@@ -46,7 +46,7 @@ class Response(BaseModel):
 
 
 syntetizerAgent = Agent(
-    model=ctx.get_model_provider(),
+    model=ctx.get_model_provider("syntetizer"),
     system_prompt=syste_prompt.text(),
     result_type=Response,
     result_retries=3,
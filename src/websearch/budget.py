@@ -0,0 +1,214 @@
+"""Run budgets.
+
+This module provides the budget bounding the work of a graph run: wall-clock
+time, LLM tokens, web searches and page fetches. The budget is held by the run
+context, charged by the nodes and tools as they work, and checked before new
+work is started. Work served from a cache is not charged.
+
+The wall-clock limit is the deadline of the run: agent runs, searches and
+fetches are awaited at most until it, and the answer is then written from the
+evidence gathered so far.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+from pydantic import Field
+from pydantic_ai.usage import Usage
+from pydantic_settings import BaseSettings
+
+from websearch.metrics import metrics
+
+
+class ResearchSettings(BaseSettings):
+    """Configuration of the deep research mode.
+
+    Attributes:
+        max_rounds: Maximum number of search and synthesis rounds.
+        max_seconds: Default wall-clock budget of a run, in seconds.
+        max_tokens: Default LLM token budget of a run.
+        max_searches: Default number of web searches of a run.
+        max_fetches: Default number of page fetches of a run.
+    """
+
+    max_rounds: int = Field(alias="RESEARCH_MAX_ROUNDS", default=3)
+    max_seconds: float = Field(alias="RESEARCH_MAX_SECONDS", default=180.0)
+    max_tokens: int = Field(alias="RESEARCH_MAX_TOKENS", default=100_000)
+    max_searches: int = Field(alias="RESEARCH_MAX_SEARCHES", default=15)
+    max_fetches: int = Field(alias="RESEARCH_MAX_FETCHES", default=30)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+research_settings = ResearchSettings()
+
+
+class DeadlineSettings(BaseSettings):
+    """Configuration of the run deadlines.
+
+    Attributes:
+        run_seconds: Default deadline of a run, in seconds, 0 for none.
+        synthesis_reserve: Seconds before the deadline at which the searches,
+            fetches and other agent runs stop, kept for writing the answer.
+            At most a quarter of the deadline is reserved.
+    """
+
+    run_seconds: float = Field(alias="RUN_DEADLINE", default=300.0)
+    synthesis_reserve: float = Field(alias="RUN_SYNTHESIS_RESERVE", default=15.0)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+deadline_settings = DeadlineSettings()
+
+
+@dataclass
+class Budget:
+    """Limits and usage of a run.
+
+    A limit of None means unlimited.
+
+    Attributes:
+        max_seconds: Wall-clock time of the run, in seconds.
+        max_tokens: LLM tokens, prompt and completion.
+        max_searches: Web searches not served from the cache.
+        max_fetches: Page fetches not shared with an earlier fetch of the run.
+        started_at: Monotonic time at which the budget started.
+        tokens: LLM tokens used.
+        searches: Web searches done.
+        fetches: Page fetches done.
+    """
+
+    max_seconds: float | None = None
+    max_tokens: int | None = None
+    max_searches: int | None = None
+    max_fetches: int | None = None
+    started_at: float = field(default_factory=time.monotonic)
+    tokens: int = 0
+    searches: int = 0
+    fetches: int = 0
+
+    @classmethod
+    def from_settings(cls, settings: ResearchSettings = research_settings) -> "Budget":
+        """Create the default budget of a deep research run.
+
+        Args:
+            settings: The deep research configuration.
+
+        Returns:
+            Budget: A new budget.
+        """
+        return cls(
+            max_seconds=settings.max_seconds,
+            max_tokens=settings.max_tokens,
+            max_searches=settings.max_searches,
+            max_fetches=settings.max_fetches,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the budget started."""
+        return time.monotonic() - self.started_at
+
+    @property
+    def remaining_seconds(self) -> float | None:
+        """Seconds left before the deadline, None if unlimited."""
+        if self.max_seconds is None:
+            return None
+        return max(self.max_seconds - self.elapsed, 0.0)
+
+    def time_left(
+        self, *, synthesis: bool = False, settings: DeadlineSettings = deadline_settings
+    ) -> float | None:
+        """Get the time work may still take.
+
+        Args:
+            synthesis: Whether the work is the synthesis of the answer, which
+                may use the time reserved for it.
+            settings: The deadline configuration.
+
+        Returns:
+            float | None: Seconds left, None if the run has no deadline.
+        """
+        remaining = self.remaining_seconds
+        if remaining is None or synthesis:
+            return remaining
+        reserve = min(settings.synthesis_reserve, self.max_seconds / 4)
+        return max(remaining - reserve, 0.0)
+
+    @property
+    def remaining_searches(self) -> int | None:
+        """Web searches left, None if unlimited."""
+        if self.max_searches is None:
+            return None
+        return max(self.max_searches - self.searches, 0)
+
+    def exhausted(self) -> str | None:
+        """Check whether any limit is reached.
+
+        Returns:
+            str | None: The name of the first limit reached, None if none is.
+        """
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            return "time"
+        if self.max_tokens is not None and self.tokens >= self.max_tokens:
+            return "tokens"
+        if self.max_searches is not None and self.searches >= self.max_searches:
+            return "searches"
+        if self.max_fetches is not None and self.fetches >= self.max_fetches:
+            return "fetches"
+        return None
+
+    def charge_usage(self, usage: Usage) -> None:
+        """Charge the tokens of an agent run.
+
+        Args:
+            usage: The usage of the agent run.
+        """
+        tokens = usage.total_tokens or 0
+        self.tokens += tokens
+        metrics.incr("llm.tokens", tokens)
+
+    def try_search(self) -> bool:
+        """Charge a web search if the budget allows it.
+
+        Returns:
+            bool: False if the search must not be done.
+        """
+        if self._out_of_time() or self.remaining_searches == 0:
+            return False
+        self.searches += 1
+        return True
+
+    def try_fetch(self) -> bool:
+        """Charge a page fetch if the budget allows it.
+
+        Returns:
+            bool: False if the fetch must not be done.
+        """
+        if self._out_of_time():
+            return False
+        if self.max_fetches is not None and self.fetches >= self.max_fetches:
+            return False
+        self.fetches += 1
+        return True
+
+    def to_dict(self) -> dict:
+        """Summarize the usage of the budget.
+
+        Returns:
+            dict: The elapsed seconds, tokens, searches and fetches used.
+        """
+        return {
+            "seconds": round(self.elapsed, 3),
+            "tokens": self.tokens,
+            "searches": self.searches,
+            "fetches": self.fetches,
+        }
+
+    def _out_of_time(self) -> bool:
+        return self.max_seconds is not None and self.elapsed >= self.max_seconds
@@ -0,0 +1,436 @@
+"""Administration of the disk cache.
+
+This module provides tools to inspect and manage the `iocache` store, as
+functions and as the `websearch-cache` command:
+
+- `stats`: entries and bytes per namespace (search, pages, llm, robots,
+  browser).
+- `purge`: remove entries by namespace, by domain or by age.
+- `warm`: run searches and fetch pages ahead of the queries needing them, or
+  warm everything the runs of anticipated questions need with the `warming`
+  job.
+- `export_cache` / `import_cache`: ship a warm cache to a new node.
+
+Entries without a tag, e.g. those stored before the tags were introduced,
+belong to the 'other' namespace. Domains are matched against the URLs in the
+keys, so a domain purge removes the fetched pages, robots.txt files and browser
+storage of the domain, not the searches that returned it.
+
+Usage:
+    websearch-cache stats
+    websearch-cache purge --namespace pages --domain example.com
+    websearch-cache purge --older-than 7d
+    websearch-cache warm --queries queries.txt --urls urls.txt
+    websearch-cache warm --questions questions.txt
+    websearch-cache export warm.cache --namespace search
+    websearch-cache import warm.cache
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import pickle
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+import diskcache
+
+from websearch import iocache
+from websearch.root_logger import root_logger
+from websearch.urls import url_host
+
+logger = root_logger.getChild(__name__)
+
+AGE_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+@dataclass
+class Entry:
+    """A cache entry, without its value.
+
+    Attributes:
+        key: The key of the entry.
+        tag: The tag of the entry, None if untagged.
+        store_time: When the entry was stored, as a Unix timestamp.
+        expire_time: When the entry expires, None if never.
+        size: Size of the stored value in bytes.
+    """
+
+    key: Any
+    tag: str | None
+    store_time: float
+    expire_time: float | None
+    size: int
+
+    @property
+    def namespace(self) -> str:
+        """The namespace of the entry's tag."""
+        return namespace_of(self.tag)
+
+
+def namespace_of(tag: str | None) -> str:
+    """Get the namespace of a tag.
+
+    Args:
+        tag: The tag of an entry.
+
+    Returns:
+        str: The namespace, 'other' for unknown tags.
+    """
+    for namespace, tags in iocache.NAMESPACES.items():
+        if tag in tags:
+            return namespace
+    return "other"
+
+
+def parse_age(age: str | float) -> float:
+    """Parse an age in seconds, or with a unit, e.g. '90s', '12h' or '7d'.
+
+    Args:
+        age: The age.
+
+    Returns:
+        float: The age in seconds.
+
+    Raises:
+        ValueError: If the age is not a number with an optional unit.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(age))
+    if not match:
+        raise ValueError(f"Invalid age: {age!r}")
+    return float(match[1]) * AGE_UNITS.get(match[2], 1)
+
+
+def entries(cache: diskcache.FanoutCache | None = None) -> Iterator[Entry]:
+    """Iterate over the entries of the cache, expired ones included.
+
+    Args:
+        cache: The cache. Defaults to the `iocache` store.
+
+    Yields:
+        Entry: Every entry of every shard.
+    """
+    cache = iocache.cache if cache is None else cache
+    for row in _rows(cache):
+        yield Entry(*row)
+
+
+def _rows(cache: diskcache.FanoutCache) -> Iterator[tuple]:
+    # diskcache has no public API listing the entries with their tag, times
+    # and size: this is the only place reading its internals, as of diskcache
+    # 5.6. The version is pinned below 6, and missing internals fail loudly.
+    try:
+        shards = [(shard._sql, shard._disk) for shard in cache._shards]
+    except AttributeError as e:
+        raise RuntimeError(
+            f"Unsupported diskcache version {diskcache.__version__}: {e}"
+        ) from e
+    for sql, disk in shards:
+        rows = sql(
+            "SELECT key, raw, tag, store_time, expire_time,"
+            " size + COALESCE(length(value), 0) FROM Cache"
+        ).fetchall()
+        for key, raw, *fields in rows:
+            yield (disk.get(key, raw), *fields)
+
+
+def _key_urls(key: Any) -> Iterator[str]:
+    if isinstance(key, str):
+        if key.startswith(("http://", "https://")):
+            yield key
+    elif isinstance(key, tuple):
+        for part in key:
+            yield from _key_urls(part)
+
+
+def _matches_domain(key: Any, domain: str) -> bool:
+    domain = domain.lower().lstrip(".")
+    return any(
+        host == domain or host.endswith(f".{domain}")
+        for host in map(url_host, _key_urls(key))
+    )
+
+
+def stats(cache: diskcache.FanoutCache | None = None) -> dict[str, dict]:
+    """Count the entries and bytes of each namespace.
+
+    Args:
+        cache: The cache. Defaults to the `iocache` store.
+
+    Returns:
+        dict[str, dict]: The 'entries', 'expired' entries and 'bytes' of each
+            namespace, and of the whole cache under 'total', with its on-disk
+            'volume'.
+    """
+    cache = iocache.cache if cache is None else cache
+    now = time.time()
+    counts = {
+        namespace: {"entries": 0, "expired": 0, "bytes": 0}
+        for namespace in [*iocache.NAMESPACES, "other", "total"]
+    }
+    for entry in entries(cache):
+        for namespace in (entry.namespace, "total"):
+            counts[namespace]["entries"] += 1
+            counts[namespace]["bytes"] += entry.size
+            if entry.expire_time is not None and entry.expire_time <= now:
+                counts[namespace]["expired"] += 1
+    counts["total"]["volume"] = cache.volume()
+    return counts
+
+
+def purge(
+    *,
+    namespace: str | None = None,
+    domain: str | None = None,
+    older_than: float | None = None,
+    cache: diskcache.FanoutCache | None = None,
+) -> int:
+    """Remove the entries matching every given criterion.
+
+    Args:
+        namespace: Remove the entries of this namespace.
+        domain: Remove the entries of this domain and its subdomains.
+        older_than: Remove the entries stored more than these seconds ago.
+        cache: The cache. Defaults to the `iocache` store.
+
+    Returns:
+        int: The number of entries removed.
+
+    Raises:
+        ValueError: If no criterion is given or the namespace is unknown.
+    """
+    cache = iocache.cache if cache is None else cache
+    if namespace is None and domain is None and older_than is None:
+        raise ValueError("Give a namespace, a domain or an age to purge")
+    if namespace is not None and namespace not in [*iocache.NAMESPACES, "other"]:
+        raise ValueError(f"Unknown namespace: {namespace}")
+
+    if domain is None and older_than is None and namespace in iocache.NAMESPACES:
+        removed = sum(cache.evict(tag) for tag in iocache.NAMESPACES[namespace])
+    else:
+        cutoff = None if older_than is None else time.time() - older_than
+        removed = sum(
+            cache.delete(entry.key)
+            for entry in list(entries(cache))
+            if (namespace is None or entry.namespace == namespace)
+            and (domain is None or _matches_domain(entry.key, domain))
+            and (cutoff is None or entry.store_time < cutoff)
+        )
+    logger.info(f"🧹 Purged {removed} cache entries")
+    return removed
+
+
+async def warm(
+    *,
+    queries: list[str] = (),
+    urls: list[str] = (),
+    count: int | None = None,
+    concurrency: int = 4,
+) -> dict[str, int]:
+    """Fill the cache with searches and pages before they are needed.
+
+    Args:
+        queries: The search queries to run.
+        urls: The pages to fetch.
+        count: Results per search. Defaults to the `EXPLORER_SEARCH_COUNT`
+            setting, the count of the search explorer.
+        concurrency: Maximum number of searches and fetches in flight.
+
+    Returns:
+        dict[str, int]: The number of 'searches' and 'pages' now cached.
+    """
+    # Imported here so that the other commands do not build the agents.
+    from websearch.nodes.explorer import explorer_settings
+    from websearch.tools.bravesearch.client import BraveSearchClient
+    from websearch.tools.navigatelinks import navigate_link
+
+    if count is None:
+        count = explorer_settings.search_count
+    client = BraveSearchClient()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def search(query: str) -> bool:
+        async with slots:
+            result = await asyncio.to_thread(client.search, query, count)
+            return not result["error"]
+
+    async def fetch(url: str) -> bool:
+        async with slots:
+            return await navigate_link(url) is not None
+
+    searched = await asyncio.gather(*map(search, queries))
+    fetched = await asyncio.gather(*map(fetch, urls))
+    return {"searches": sum(searched), "pages": sum(fetched)}
+
+
+def export_cache(
+    path: str,
+    *,
+    namespaces: list[str] | None = None,
+    cache: diskcache.FanoutCache | None = None,
+) -> int:
+    """Write the live entries of the cache to a file.
+
+    Args:
+        path: The file to write, gzipped pickles.
+        namespaces: The namespaces to export. Defaults to all.
+        cache: The cache. Defaults to the `iocache` store.
+
+    Returns:
+        int: The number of entries exported.
+    """
+    cache = iocache.cache if cache is None else cache
+    exported = 0
+    with gzip.open(path, "wb") as f:
+        for entry in entries(cache):
+            if namespaces and entry.namespace not in namespaces:
+                continue
+            value, expire_time, tag = cache.get(
+                entry.key, default=None, expire_time=True, tag=True
+            )
+            if value is None:
+                continue
+            pickle.dump((entry.key, value, expire_time, tag), f)
+            exported += 1
+    logger.info(f"📦 Exported {exported} cache entries to {path}")
+    return exported
+
+
+def import_cache(path: str, *, cache: diskcache.FanoutCache | None = None) -> int:
+    """Load the entries exported by `export_cache`, skipping expired ones.
+
+    The file is unpickled: only import files you trust.
+
+    Args:
+        path: The exported file.
+        cache: The cache. Defaults to the `iocache` store.
+
+    Returns:
+        int: The number of entries imported.
+    """
+    cache = iocache.cache if cache is None else cache
+    imported = 0
+    with gzip.open(path, "rb") as f:
+        while True:
+            try:
+                key, value, expire_time, tag = pickle.load(f)
+            except EOFError:
+                break
+            expire = None if expire_time is None else expire_time - time.time()
+            if expire is not None and expire <= 0:
+                continue
+            cache.set(key, value, expire=expire, tag=tag)
+            imported += 1
+    logger.info(f"📦 Imported {imported} cache entries from {path}")
+    return imported
+
+
+def _read_lines(path: str | None) -> list[str]:
+    if not path:
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _read_questions(path: str | None) -> tuple[list[str], dict[str, list[str]]]:
+    questions, queries = [], {}
+    for line in _read_lines(path):
+        question, *question_queries = [part.strip() for part in line.split("\t")]
+        questions.append(question)
+        if question_queries:
+            queries[question] = [q for q in question_queries if q]
+    return questions, queries
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the cache administration command.
+
+    Args:
+        argv: The command line arguments. Defaults to `sys.argv`.
+    """
+    parser = argparse.ArgumentParser(
+        prog="websearch-cache", description="Manage the websearch disk cache."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="show the entries and size per namespace")
+
+    purge_parser = commands.add_parser("purge", help="remove entries")
+    purge_parser.add_argument("--namespace", choices=[*iocache.NAMESPACES, "other"])
+    purge_parser.add_argument("--domain")
+    purge_parser.add_argument("--older-than", type=parse_age, metavar="AGE")
+    purge_parser.add_argument("--all", action="store_true", help="clear the cache")
+
+    warm_parser = commands.add_parser("warm", help="cache searches and pages")
+    warm_parser.add_argument(
+        "--questions",
+        metavar="FILE",
+        help="one question per line, optionally followed by its queries, tab separated",
+    )
+    warm_parser.add_argument("--explorer", choices=["agent", "search"])
+    warm_parser.add_argument("--queries", metavar="FILE", help="one query per line")
+    warm_parser.add_argument("--urls", metavar="FILE", help="one url per line")
+    warm_parser.add_argument("--count", type=int)
+    warm_parser.add_argument("--concurrency", type=int, default=4)
+
+    export_parser = commands.add_parser("export", help="write entries to a file")
+    export_parser.add_argument("path")
+    export_parser.add_argument(
+        "--namespace", action="append", choices=[*iocache.NAMESPACES, "other"]
+    )
+
+    import_parser = commands.add_parser("import", help="load an exported file")
+    import_parser.add_argument("path")
+
+    args = parser.parse_args(argv)
+    if args.command == "stats":
+        result = stats()
+    elif args.command == "purge":
+        if args.all:
+            result = {"removed": iocache.cache.clear()}
+        else:
+            try:
+                result = {
+                    "removed": purge(
+                        namespace=args.namespace,
+                        domain=args.domain,
+                        older_than=args.older_than,
+                    )
+                }
+            except ValueError as e:
+                parser.error(str(e))
+    elif args.command == "warm":
+        result = asyncio.run(
+            warm(
+                queries=_read_lines(args.queries),
+                urls=_read_lines(args.urls),
+                count=args.count,
+                concurrency=args.concurrency,
+            )
+        )
+        if args.questions:
+            from websearch.warming import warm_questions, warming_settings
+
+            questions, queries = _read_questions(args.questions)
+            result["warming"] = asyncio.run(
+                warm_questions(
+                    questions,
+                    queries=queries,
+                    explorer=args.explorer,
+                    settings=warming_settings.model_copy(
+                        update={"concurrency": args.concurrency}
+                    ),
+                )
+            )
+    elif args.command == "export":
+        result = {"exported": export_cache(args.path, namespaces=args.namespace)}
+    else:
+        result = {"imported": import_cache(args.path)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Checkpointers for the web search graph.
+
+This module provides the checkpointers the graph can run with. The default is
+an in-memory saver bounded by number of threads, idle time and size, so a
+long-running process does not keep every run's checkpoints forever. Runs that
+must survive a restart can use a SQLite saver instead, and fire-and-forget
+queries can run without any checkpointer.
+"""
+
+import pathlib
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Literal
+
+from langgraph.checkpoint.memory import InMemorySaver
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+
+class CheckpointSettings(BaseSettings):
+    """Configuration of the graph checkpointer.
+
+    Attributes:
+        backend: Where checkpoints are kept: 'memory', 'sqlite' or 'none'.
+        max_threads: Maximum number of runs kept in memory.
+        ttl: Seconds after its last use a run is evicted from memory.
+        max_bytes: Maximum size of the checkpoints kept in memory.
+        sqlite_path: Path of the SQLite database of the 'sqlite' backend.
+    """
+
+    backend: Literal["memory", "sqlite", "none"] = Field(
+        alias="CHECKPOINT_BACKEND", default="memory"
+    )
+    max_threads: int = Field(alias="CHECKPOINT_MAX_THREADS", default=128)
+    ttl: float = Field(alias="CHECKPOINT_TTL", default=60 * 60)
+    max_bytes: int = Field(alias="CHECKPOINT_MAX_BYTES", default=128 * 2**20)
+    sqlite_path: pathlib.Path = Field(
+        alias="CHECKPOINT_SQLITE_PATH",
+        default=pathlib.Path().home()
+        / ".cache"
+        / "websearch-agent"
+        / "checkpoints.sqlite",
+    )
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+checkpoint_settings = CheckpointSettings()
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer evicting whole runs.
+
+    Runs (threads) are evicted least recently used first when there are more
+    than `max_threads` of them or their checkpoints take more than
+    `max_bytes`, and when they have not been used for `ttl` seconds.
+
+    Args:
+        max_threads: Maximum number of runs kept.
+        ttl: Seconds after its last use a run is evicted.
+        max_bytes: Maximum size of the serialized checkpoints kept.
+    """
+
+    def __init__(self, *, max_threads: int, ttl: float, max_bytes: int, **kwargs):
+        """Initialize the checkpointer.
+
+        Args:
+            max_threads: Maximum number of runs kept.
+            ttl: Seconds after its last use a run is evicted.
+            max_bytes: Maximum size of the serialized checkpoints kept.
+            **kwargs: Arguments passed to `InMemorySaver`.
+        """
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        # thread_id -> [last access time, size in bytes], least recent first
+        self._threads: OrderedDict[str, list] = OrderedDict()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Save a checkpoint and evict runs over the limits."""
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        added = _payload_size(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])
+        added += sum(
+            _payload_size(self.blobs.get((thread_id, checkpoint_ns, k, v)))
+            for k, v in new_versions.items()
+        )
+        self._touch(thread_id, added)
+        self._evict()
+        return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        """Save pending writes and evict runs over the limits."""
+        key = (
+            config["configurable"]["thread_id"],
+            config["configurable"]["checkpoint_ns"],
+            config["configurable"]["checkpoint_id"],
+        )
+        before = _payload_size(self.writes.get(key))
+        super().put_writes(config, writes, task_id, task_path)
+        self._touch(key[0], _payload_size(self.writes.get(key)) - before)
+        self._evict()
+
+    def get_tuple(self, config):
+        """Get a checkpoint, marking its run as recently used."""
+        self._evict()
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self._threads:
+            self._touch(thread_id, 0)
+        return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        """List checkpoints, after evicting the expired runs."""
+        self._evict()
+        return super().list(config, filter=filter, before=before, limit=limit)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all the checkpoints and writes of a run.
+
+        Args:
+            thread_id: The id of the run.
+        """
+        self.storage.pop(thread_id, None)
+        for key in [k for k in self.writes if k[0] == thread_id]:
+            del self.writes[key]
+        for key in [k for k in self.blobs if k[0] == thread_id]:
+            del self.blobs[key]
+        _, size = self._threads.pop(thread_id, (0, 0))
+        self.size -= size
+
+    def _touch(self, thread_id: str, added: int) -> None:
+        entry = self._threads.setdefault(thread_id, [0.0, 0])
+        entry[0] = time.monotonic()
+        entry[1] += added
+        self.size += added
+        self._threads.move_to_end(thread_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._threads:
+            thread_id, (last_access, _) = next(iter(self._threads.items()))
+            over_limit = (
+                len(self._threads) > self.max_threads or self.size > self.max_bytes
+            )
+            if not over_limit and now - last_access < self.ttl:
+                break
+            if len(self._threads) == 1 and now - last_access < self.ttl:
+                # Never evict the only, still active, run for being too large.
+                break
+            logger.debug(f"Evicting checkpoints of run {thread_id}")
+            self.delete_thread(thread_id)
+
+
+def _payload_size(obj: Any) -> int:
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(_payload_size(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_payload_size(v) for v in obj)
+    return 0
+
+
+memory_saver = BoundedMemorySaver(
+    max_threads=checkpoint_settings.max_threads,
+    ttl=checkpoint_settings.ttl,
+    max_bytes=checkpoint_settings.max_bytes,
+)
+"""The in-memory checkpointer shared by the runs of the process."""
+
+
+@asynccontextmanager
+async def open_checkpointer(
+    backend: Literal["memory", "sqlite", "none"] | None = None,
+):
+    """Open the checkpointer of a backend.
+
+    Args:
+        backend: The backend to use. Defaults to the `CHECKPOINT_BACKEND` setting.
+
+    Yields:
+        BaseCheckpointSaver | None: The checkpointer, None for the 'none' backend.
+
+    Raises:
+        ImportError: If the 'sqlite' backend is used without the `sqlite` extra.
+    """
+    backend = backend or checkpoint_settings.backend
+
+    if backend == "none":
+        yield None
+    elif backend == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError as e:
+            raise ImportError(
+                "The sqlite checkpoint backend requires the 'sqlite' extra: "
+                "pip install websearch[sqlite]"
+            ) from e
+
+        checkpoint_settings.sqlite_path.parent.mkdir(parents=True, exist_ok=True)
+        async with AsyncSqliteSaver.from_conn_string(
+            str(checkpoint_settings.sqlite_path)
+        ) as saver:
+            yield saver
+    else:
+        yield memory_saver
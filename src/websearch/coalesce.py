@@ -0,0 +1,238 @@
+"""Coalescing of identical concurrent queries.
+
+Under burst traffic many users ask the same question at once. This module
+provides a layer in front of `query.exec` running the graph once per distinct
+question: callers asking a question already in flight subscribe to its run,
+receive the events they missed, then the live events. Questions are compared
+after normalization, so trivially different wordings share a run, and with
+the same options, since those change the run.
+
+Completed runs are kept in a short-lived answer cache and replayed to the
+callers asking the same question shortly after. Runs whose final answer is
+partial, cut by their deadline, are not kept.
+
+Resumed runs (with a `thread_id`) are never coalesced. A shared run uses the
+budget of the caller that started it.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch import query
+from websearch.metrics import metrics
+from websearch.planner import normalize_question
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+Executor = Callable[..., AsyncIterator[dict[str, Any]]]
+
+
+class CoalesceSettings(BaseSettings):
+    """Configuration of the query coalescing.
+
+    Attributes:
+        enabled: Whether identical concurrent queries share a run.
+        answer_ttl: Seconds a completed run is replayed to new callers.
+        answer_cache_size: Maximum number of completed runs kept.
+    """
+
+    enabled: bool = Field(alias="COALESCE_ENABLED", default=True)
+    answer_ttl: float = Field(alias="ANSWER_CACHE_TTL", default=60.0)
+    answer_cache_size: int = Field(alias="ANSWER_CACHE_SIZE", default=256)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+coalesce_settings = CoalesceSettings()
+
+
+class SharedRun:
+    """A run recording its events for any number of subscribers.
+
+    The run is cancelled when its last subscriber leaves before the end.
+
+    Args:
+        events: The events of the run.
+    """
+
+    def __init__(self, events: AsyncIterator[dict[str, Any]]):
+        """Start the run.
+
+        Args:
+            events: The events of the run.
+        """
+        self.events: list[dict[str, Any]] = []
+        self.error: Exception | None = None
+        self.done = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._produce(events))
+
+    async def _produce(self, events: AsyncIterator[dict[str, Any]]) -> None:
+        try:
+            async with contextlib.aclosing(events):
+                async for event in events:
+                    self.events.append(event)
+                    self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over the events of the run, from the first one.
+
+        Yields:
+            dict[str, Any]: A copy of each event.
+
+        Raises:
+            Exception: The error the run failed with.
+        """
+        self.subscribers += 1
+        try:
+            i = 0
+            while True:
+                while i < len(self.events):
+                    yield dict(self.events[i])
+                    i += 1
+                if self.done:
+                    break
+                await self._changed.wait()
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done:
+                logger.info("🔀 Last subscriber left, cancelling the shared run")
+                self.task.cancel()
+
+
+class Coalescer:
+    """Share the runs of identical queries.
+
+    Args:
+        executor: The function running a query and yielding its events.
+        settings: The coalescing configuration.
+    """
+
+    def __init__(
+        self,
+        executor: Executor = query.exec,
+        settings: CoalesceSettings = coalesce_settings,
+    ):
+        """Initialize the coalescer.
+
+        Args:
+            executor: The function running a query and yielding its events.
+            settings: The coalescing configuration.
+        """
+        self.executor = executor
+        self.settings = settings
+        self._loop = None
+        self._runs: dict[tuple, SharedRun] = {}
+        # key -> (expiry time, events), oldest first
+        self._answers: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+
+    def _bind(self) -> None:
+        # Runs belong to one event loop: start afresh when used from a new one.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._runs = {}
+
+    @staticmethod
+    def key(question: str, options: dict[str, Any]) -> tuple:
+        """Get the key identifying the run of a query.
+
+        Args:
+            question: The user question.
+            options: The options of the run, except its budget.
+
+        Returns:
+            tuple: The normalized question and the options.
+        """
+        return (normalize_question(question), tuple(sorted(options.items())))
+
+    async def exec(self, question: str, **options) -> AsyncIterator[dict[str, Any]]:
+        """Execute a query, sharing the run of an identical query.
+
+        Args:
+            question: The user question.
+            **options: The options of `query.exec`.
+
+        Yields:
+            dict[str, Any]: The events of `query.exec`.
+        """
+        if not self.settings.enabled or options.get("thread_id"):
+            async for event in self.executor(question, **options):
+                yield event
+            return
+
+        self._bind()
+        key = self.key(question, {k: v for k, v in options.items() if k != "budget"})
+
+        run = self._runs.get(key)
+        if run is not None and run.task.done():
+            # Its done callback may not have run yet.
+            self._finish(key, run)
+
+        cached = self._answers.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            metrics.incr("coalesce.cache_hits")
+            for event in cached[1]:
+                yield dict(event)
+            return
+
+        run = self._runs.get(key)
+        # A run cancelled by its last subscriber stays in `_runs` until it
+        # is done: start a new run instead of joining it.
+        if run is None or run.task.cancelling():
+            run = SharedRun(self.executor(question, **options))
+            self._runs[key] = run
+            run.task.add_done_callback(lambda _: self._finish(key, run))
+            metrics.incr("coalesce.runs")
+        else:
+            logger.info(f"🔀 Joining the run of {question!r}")
+            metrics.incr("coalesce.joined")
+
+        # Leave the run as soon as the caller does.
+        async with contextlib.aclosing(run.subscribe()) as events:
+            async for event in events:
+                yield event
+
+    def _finish(self, key: tuple, run: SharedRun) -> None:
+        if self._runs.get(key) is not run:
+            return
+        del self._runs[key]
+        if run.error is not None or run.task.cancelled():
+            return
+        answers = [event for event in run.events if "answer" in event]
+        if not answers or answers[-1].get("path") == "partial":
+            return
+
+        now = time.monotonic()
+        self._answers[key] = (now + self.settings.answer_ttl, run.events)
+        self._answers.move_to_end(key)
+        while self._answers and (
+            len(self._answers) > self.settings.answer_cache_size
+            or next(iter(self._answers.values()))[0] <= now
+        ):
+            self._answers.popitem(last=False)
+
+
+coalescer = Coalescer()
+"""The coalescer of the process."""
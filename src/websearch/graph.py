@@ -4,25 +4,43 @@ This module provides a graph for web search operations. It defines the nodes and
 for the web search graph and compiles it into a graph object.
 """
 
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import END, START, StateGraph
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph import START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 
+from websearch.checkpoint import memory_saver
 from websearch.nodes.explorer import explorer
+from websearch.nodes.gapfinder import gapfinder, research_router
 from websearch.nodes.querygen import query_gen_router, querygen
+from websearch.nodes.recall import recall
 from websearch.nodes.syntetizer import syntetizer
 from websearch.state import GraphState
 
-memory = MemorySaver()
-
 builder = StateGraph(GraphState)
 
+builder.add_node("recall", recall)
 builder.add_node("querygen", querygen)
 builder.add_node("explorer", explorer)
 builder.add_node("syntetizer", syntetizer)
+builder.add_node("gapfinder", gapfinder)
 
-builder.add_edge(START, "querygen")
+builder.add_edge(START, "recall")
 builder.add_conditional_edges("querygen", query_gen_router)
 builder.add_edge("explorer", "syntetizer")
-builder.add_edge("syntetizer", END)
+builder.add_conditional_edges("syntetizer", research_router)
+
+graph = builder.compile(checkpointer=memory_saver)
+
+
+def with_checkpointer(checkpointer: BaseCheckpointSaver | None) -> CompiledStateGraph:
+    """Get the compiled graph using another checkpointer.
+
+    Args:
+        checkpointer: The checkpointer to use, None to run without checkpoints.
 
-graph = builder.compile(checkpointer=memory)
+    Returns:
+        CompiledStateGraph: The graph, sharing everything else with `graph`.
+    """
+    if checkpointer is memory_saver:
+        return graph
+    return graph.copy(update={"checkpointer": checkpointer})
@@ -3,13 +3,69 @@
 This module provides disk-based caching functionality to store and retrieve
 web search results, reducing unnecessary network requests and improving
 performance by caching previous search results.
+
+Entries are tagged by kind, and the tags are grouped in namespaces, e.g. the
+'pages' namespace holds the fetched pages and the page texts, so they can be
+inspected and purged together with the `cacheadmin` tools.
 """
 
 import pathlib
+from typing import Literal
 
 import diskcache
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+NAMESPACES = {
+    "search": ("search",),
+    "pages": ("pages", "content"),
+    "llm": ("llm", "plans"),
+    "robots": ("robots",),
+    "browser": ("storage",),
+}
+"""The tags of the cache entries by namespace."""
+
+
+class CacheSettings(BaseSettings):
+    """Configuration of the disk cache.
+
+    Attributes:
+        directory: Directory of the cache, shared by the processes using it.
+        shards: Number of shards, each a SQLite database with its own lock.
+            Changing it on an existing cache hides the entries of the removed
+            shards.
+        size_limit: Approximate maximum size of the cache in bytes.
+        eviction_policy: Which entries are evicted over the size limit.
+        llm_ttl: Seconds the queries generated by the LLM for a question are
+            cached, 0 to disable. The queries stored by the `warming` job are
+            used either way.
+    """
+
+    directory: pathlib.Path = Field(
+        alias="CACHE_DIRECTORY",
+        default=pathlib.Path().home() / ".cache" / "websearch-agent",
+    )
+    shards: int = Field(alias="CACHE_SHARDS", default=8)
+    size_limit: int = Field(alias="CACHE_SIZE_LIMIT", default=2**30)
+    eviction_policy: Literal[
+        "least-recently-stored",
+        "least-recently-used",
+        "least-frequently-used",
+        "none",
+    ] = Field(alias="CACHE_EVICTION_POLICY", default="least-recently-stored")
+    llm_ttl: float = Field(alias="LLM_CACHE_TTL", default=0)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+cache_settings = CacheSettings()
 
 # Create a persistent cache in the user's home directory
 cache = diskcache.FanoutCache(
-    directory=pathlib.Path().home() / ".cache" / "websearch-agent"
+    directory=str(cache_settings.directory),
+    shards=cache_settings.shards,
+    size_limit=cache_settings.size_limit,
+    eviction_policy=cache_settings.eviction_policy,
 )
@@ -0,0 +1,59 @@
+"""Per-agent model metrics.
+
+This module provides a model wrapper recording, for every LLM request, the
+latency, tokens and estimated cost under the name of the agent that made it,
+and the requests and errors of each underlying model. With a fallback chain
+the metrics show which model actually served each agent.
+"""
+
+import time
+from dataclasses import dataclass
+
+from pydantic_ai.models import Model
+from pydantic_ai.models.wrapper import WrapperModel
+
+from websearch.metrics import metrics
+
+
+@dataclass(init=False)
+class MeteredModel(WrapperModel):
+    """Model recording the metrics of its requests.
+
+    Args:
+        wrapped: The model to meter.
+        agent: The name of the agent using the model.
+        price: Cost of a million tokens in USD.
+    """
+
+    agent: str
+    price: float
+
+    def __init__(self, wrapped: Model, *, agent: str, price: float = 0.0):
+        """Wrap a model.
+
+        Args:
+            wrapped: The model to meter.
+            agent: The name of the agent using the model.
+            price: Cost of a million tokens in USD.
+        """
+        super().__init__(wrapped)
+        self.agent = agent
+        self.price = price
+
+    async def request(self, *args, **kwargs):
+        """Make a request to the wrapped model and record its metrics."""
+        start = time.monotonic()
+        try:
+            response, usage = await self.wrapped.request(*args, **kwargs)
+        except Exception:
+            metrics.incr(f"llm.{self.agent}.errors")
+            metrics.incr(f"llm.model.{self.model_name}.errors")
+            raise
+
+        tokens = usage.total_tokens or 0
+        metrics.observe(f"llm.{self.agent}.seconds", time.monotonic() - start)
+        metrics.incr(f"llm.{self.agent}.requests")
+        metrics.incr(f"llm.{self.agent}.tokens", tokens)
+        metrics.incr(f"llm.{self.agent}.cost_usd", tokens * self.price / 1_000_000)
+        metrics.incr(f"llm.model.{self.model_name}.requests")
+        return response, usage
@@ -0,0 +1,107 @@
+"""Process wide metrics.
+
+This module provides a minimal in-process metrics registry with counters and
+timing observations, used to measure the effect of the fetch and LLM
+optimizations without an external monitoring system.
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+
+@dataclass
+class Observation:
+    """Summary of the values observed for a metric.
+
+    Attributes:
+        count: Number of observations.
+        total: Sum of the observed values.
+        max: Largest observed value.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        """The mean of the observed values."""
+        return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+    """Thread safe registry of counters and observations."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+        self._observations: dict[str, Observation] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter.
+
+        Args:
+            name: The name of the counter.
+            value: The amount to add.
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a value, such as a latency or a size.
+
+        Args:
+            name: The name of the metric.
+            value: The observed value.
+        """
+        with self._lock:
+            obs = self._observations.setdefault(name, Observation())
+            obs.count += 1
+            obs.total += value
+            obs.max = max(obs.max, value)
+
+    def counter(self, name: str) -> float:
+        """Get the value of a counter.
+
+        Args:
+            name: The name of the counter.
+
+        Returns:
+            float: The value of the counter, 0 if never incremented.
+        """
+        with self._lock:
+            return self._counters[name]
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """Get the current value of the metrics.
+
+        Args:
+            prefix: Only include the metrics whose name starts with this prefix.
+
+        Returns:
+            dict: Counters by name, and observations as dicts with count, total,
+                mean and max.
+        """
+        with self._lock:
+            snapshot = {k: v for k, v in self._counters.items() if k.startswith(prefix)}
+            for name, obs in self._observations.items():
+                if name.startswith(prefix):
+                    snapshot[name] = {
+                        "count": obs.count,
+                        "total": obs.total,
+                        "mean": obs.mean,
+                        "max": obs.max,
+                    }
+            return snapshot
+
+    def reset(self) -> None:
+        """Clear all the metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+
+metrics = Metrics()
+"""The metrics registry of the process."""
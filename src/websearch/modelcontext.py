@@ -2,15 +2,24 @@
 
 This module provides configuration and context management for different LLM providers,
 currently supporting Ollama and TogetherAI integrations.
+
+Each agent can use its own model, for example a small local model for the query
+generation and a larger one for the synthesis, and fall back to other models,
+possibly of another provider, when its model errors or times out.
 """
 
 from typing import Literal
 
+from openai import APIConnectionError
 from pydantic import Field
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.models import Model, cached_async_http_client
+from pydantic_ai.models.fallback import FallbackModel
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_settings import BaseSettings
 
+from websearch.meteredmodel import MeteredModel
 from websearch.root_logger import root_logger
 
 logger = root_logger.getChild(__name__)
@@ -27,6 +36,10 @@ ollama_allowed_models = [
     "llama3.1:8b-instruct-q4_1",
 ]
 
+Provider = Literal["ollama", "together"]
+
+PROVIDERS = ("ollama", "together")
+
 
 class AppContext(BaseSettings):
     """Application context configuration for LLM providers.
@@ -42,6 +55,18 @@ class AppContext(BaseSettings):
         ollama_model: Model name to use with Ollama.
         togetherai_model: Model name to use with TogetherAI.
         stream_response: Whether to stream model responses.
+        querygen_model: Model of the query generator agent.
+        explorer_model: Model of the explorer agent.
+        syntetizer_model: Model of the syntetizer agent.
+        chunkanalyzer_model: Model of the chunk analyzer agent.
+        model_fallbacks: Models tried, in order, when the model of an agent fails.
+        model_timeout: Seconds after which a model request fails.
+        model_prices: Cost of a million tokens in USD, by model name.
+
+    The agent models and the fallbacks are comma separated lists of models. A
+    model is a name of the configured provider, or a name prefixed with its
+    provider, e.g. 'ollama:qwen2.5:3b,together:meta-llama/Llama-3.3-70B'. Agents
+    without a model use the model of the configured provider.
     """
 
     provider: Literal["ollama", "together"] = Field(alias="PROVIDER")
@@ -55,26 +80,115 @@ class AppContext(BaseSettings):
         alias="TOGETHERAI_MODEL", default="meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
     )
     stream_response: bool = Field(alias="STREAM_RESPONSE", default=False)
+    querygen_model: str | None = Field(alias="QUERYGEN_MODEL", default=None)
+    explorer_model: str | None = Field(alias="EXPLORER_MODEL", default=None)
+    syntetizer_model: str | None = Field(alias="SYNTETIZER_MODEL", default=None)
+    chunkanalyzer_model: str | None = Field(alias="CHUNKANALYZER_MODEL", default=None)
+    model_fallbacks: str | None = Field(alias="MODEL_FALLBACKS", default=None)
+    model_timeout: float = Field(alias="MODEL_TIMEOUT", default=600.0)
+    model_prices: dict[str, float] = Field(alias="MODEL_PRICES", default={})
     model_config = {
         "env_file": ".env",
         "extra": "allow",
     }
 
-    def get_model_provider(self) -> OpenAIModel:
-        """Get the configured OpenAI-compatible model provider.
+    def get_model_provider(self, agent: str | None = None) -> Model:
+        """Get the configured OpenAI-compatible model of an agent.
+
+        Args:
+            agent: The name of the agent, e.g. 'querygen'. Defaults to the model
+                of the configured provider.
+
+        Returns:
+            Model: The model, with its fallbacks if any, metered under the name
+                of the agent.
+        """
+        models = [
+            MeteredModel(
+                OpenAIModel(
+                    model_name=model,
+                    provider=OpenAIProvider(
+                        api_key=self.provider_api_key(provider),
+                        base_url=self.provider_base_url(provider),
+                        http_client=cached_async_http_client(
+                            provider=provider, timeout=int(self.model_timeout)
+                        ),
+                    ),
+                ),
+                agent=agent or "default",
+                price=self.model_prices.get(model, 0.0),
+            )
+            for provider, model in self.agent_models(agent)
+        ]
+        if len(models) == 1:
+            return models[0]
+        return FallbackModel(*models, fallback_on=(ModelHTTPError, APIConnectionError))
+
+    def agent_models(self, agent: str | None = None) -> list[tuple[Provider, str]]:
+        """Get the models of an agent, followed by the fallback models.
+
+        Args:
+            agent: The name of the agent.
+
+        Returns:
+            list[tuple[Provider, str]]: The provider and name of each model.
+        """
+        spec = getattr(self, f"{agent}_model", None) if agent else None
+        models = self._parse_models(spec) or [(self.provider, self.model)]
+        for model in self._parse_models(self.model_fallbacks):
+            if model not in models:
+                models.append(model)
+        return models
+
+    def ollama_models(self) -> list[str]:
+        """Get the Ollama models used by any agent.
 
         Returns:
-            OpenAIModel: Configured model provider ready for use.
+            list[str]: The model names.
         """
+        models = []
+        for agent in (None, "querygen", "explorer", "syntetizer", "chunkanalyzer"):
+            for provider, model in self.agent_models(agent):
+                if provider == "ollama" and model not in models:
+                    models.append(model)
+        return models
+
+    def _parse_models(self, spec: str | None) -> list[tuple[Provider, str]]:
+        models = []
+        for item in (spec or "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            provider, _, name = item.partition(":")
+            if provider in PROVIDERS:
+                models.append((provider, name))
+            else:
+                models.append((self.provider, item))
+        return models
+
+    def provider_api_key(self, provider: Provider) -> str | None:
+        """Get the API key of a provider.
+
+        Args:
+            provider: The provider.
 
-        def cachable_fn(p: Literal["ollama", "together"]):
-            provider = OpenAIProvider(api_key=self.api_key, base_url=self.base_url)
+        Returns:
+            str | None: The API key for TogetherAI or None for Ollama.
+        """
+        return self.togetherai_api_key if provider == "together" else None
 
-            openai_model = OpenAIModel(model_name=self.model, provider=provider)
+    def provider_base_url(self, provider: Provider) -> str:
+        """Get the base URL of a provider's API.
 
-            return openai_model
+        Args:
+            provider: The provider.
 
-        return cachable_fn(self.provider)
+        Returns:
+            str: The base URL to use for API requests.
+        """
+        if provider == "together":
+            return self.togetherai_base_url
+        return self.ollama_base_url
 
     @property
     def api_key(self) -> str | None:
@@ -83,10 +197,7 @@ class AppContext(BaseSettings):
         Returns:
             str | None: The API key for TogetherAI or None for Ollama.
         """
-        if self.provider == "together":
-            return self.togetherai_api_key
-        elif self.provider == "ollama":
-            return None
+        return self.provider_api_key(self.provider)
 
     @property
     def model(self) -> str:
@@ -111,16 +222,8 @@ class AppContext(BaseSettings):
 
         Returns:
             str: The base URL to use for API requests.
-
-        Raises:
-            ValueError: If an invalid provider is configured.
         """
-        if self.provider == "together":
-            return self.togetherai_base_url
-        elif self.provider == "ollama":
-            return self.ollama_base_url
-        else:
-            raise ValueError(f"Invalid provider: {self.provider}")
+        return self.provider_base_url(self.provider)
 
     def __str__(self) -> str:
         """Get a string representation of the AppContext.
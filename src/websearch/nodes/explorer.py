@@ -1,36 +1,85 @@
 """Explorer node for web search operations.
 
 This module provides a node for exploring the web for the most relevant pages.
+Two implementations are available: the 'agent' explorer lets an LLM search
+the web with a tool and select the pages, the 'search' explorer calls the
+search API directly and selects the results with a deterministic ranker, using
+the LLM only to optionally summarize the fetched pages.
 """
 
-from typing import TypedDict
+import asyncio
+from typing import Literal, TypedDict
 
 from langgraph.types import Command
+from pydantic import Field
+from pydantic_settings import BaseSettings
 
+from websearch.agents.chunkanalyzer import chunkanalyzerAgent
 from websearch.agents.explorer import explorerAgent
+from websearch.metrics import metrics
+from websearch.planner import load
 from websearch.prompts import UserPrompt
+from websearch.records import PageRecord
+from websearch.retrieval.passages import rank_passages
+from websearch.retrieval.snippets import rank_results, result_text
 from websearch.root_logger import root_logger
+from websearch.runcontext import current_run, deadline
+from websearch.tools.directanswer import (
+    StructuredAnswer,
+    fast_path_settings,
+    find_structured_answers,
+    structured_answers,
+)
+from websearch.tools.websearch import search
 
 logger = root_logger.getChild(__name__)
 
 
+class ExplorerSettings(BaseSettings):
+    """Configuration of the explorer.
+
+    Attributes:
+        mode: The default explorer: 'agent' or 'search'.
+        search_count: Number of results requested by the 'search' explorer.
+        summarize: Whether the 'search' explorer summarizes the fetched pages
+            with the LLM.
+    """
+
+    mode: Literal["agent", "search"] = Field(alias="EXPLORER_MODE", default="agent")
+    search_count: int = Field(alias="EXPLORER_SEARCH_COUNT", default=10)
+    summarize: bool = Field(alias="EXPLORER_SUMMARIZE", default=False)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+explorer_settings = ExplorerSettings()
+
+
 class ExplorerState(TypedDict):
     """State for the explorer node.
 
     This class represents the state for the explorer node. It contains the agent
-    query, user query, and result limit.
+    query, user query, result limit, whether to fetch the pages, and which
+    explorer to use.
     """
 
     agent_query: str
     user_query: str
     result_limit: int
+    fetch_pages: bool
+    explorer_mode: Literal["agent", "search"]
 
 
 async def explorer(state: ExplorerState):
     """Explore the web for the most relevant pages.
 
     This function takes the agent query and user query and explores the web for
-    the most relevant pages.
+    the most relevant pages. When the search results hold structured answers
+    matching the agent query, they are used directly, without the explorer
+    agent and without fetching pages. When the agent does not answer before
+    the deadline, the branch contributes no pages.
     """
     agent_query = state["agent_query"]
 
@@ -44,6 +93,15 @@ async def explorer(state: ExplorerState):
 
     result_limit = state.get("result_limit", 5)
 
+    if state.get("explorer_mode", explorer_settings.mode) == "search":
+        return await search_explorer(state)
+
+    if fast_path_settings.enabled:
+        answers = await find_structured_answers(agent_query)
+        if answers:
+            return _fast_path(agent_query, answers[:result_limit])
+        metrics.incr("fastpath.misses")
+
     message = f"""
     In order to answer the user query: {user_query}
     The Agent request to perform the following webserach: {agent_query}
@@ -64,16 +122,211 @@ async def explorer(state: ExplorerState):
 
     logger.log_prompt("Explorer", prompt.text())
 
-    explorer_response = await explorerAgent.run(prompt.text())
+    try:
+        with load.track("llm"):
+            async with deadline():
+                explorer_response = await explorerAgent.run(prompt.text())
+    except TimeoutError:
+        logger.warning(f"⏰ Explorer timed out for '{agent_query}'")
+        metrics.incr("deadline.explorer")
+        return Command(goto="syntetizer", update={"pages": []})
+    current_run().budget.charge_usage(explorer_response.usage())
 
     logger.log_response("Explorer", explorer_response.data.model_dump_json(indent=4))
 
     if explorer_response.data.error:
         return {"error": explorer_response.data.error}
 
+    pages = [
+        PageRecord.create(p.url, category=p.category, content=p.content)
+        for p in explorer_response.data.pages or []
+    ]
+
+    if state.get("fetch_pages"):
+        pages = await fetch_pages(pages)
+
+    return Command(
+        goto="syntetizer",
+        update={
+            "pages": pages,
+        },
+    )
+
+
+async def search_explorer(state: ExplorerState):
+    """Explore the web without the explorer agent.
+
+    This function searches the agent query and selects the results whose title
+    and snippets best match the agent and user queries, weighted by the
+    priors of their domains. The snippets are the content of the pages.
+    """
+    agent_query = state["agent_query"]
+    user_query = state["user_query"]
+    result_limit = state.get("result_limit", 5)
+
+    result = await search(agent_query, explorer_settings.search_count)
+    if result is None:
+        return Command(goto="syntetizer", update={"pages": []})
+    if result["error"]:
+        return {"error": f"Search failed for '{agent_query}': {result['error']}"}
+
+    data = result["data"] or {}
+    if fast_path_settings.enabled:
+        answers = structured_answers(data, agent_query)
+        if answers:
+            return _fast_path(agent_query, answers[:result_limit])
+        metrics.incr("fastpath.misses")
+
+    pages = select_pages(data, agent_query, user_query, result_limit)
+    logger.info(
+        f"🔎 Selected {len(pages)} results for '{agent_query}': "
+        + ", ".join(page.url for page in pages)
+    )
+
+    if state.get("fetch_pages"):
+        pages = await fetch_pages(pages)
+        if explorer_settings.summarize:
+            pages = await asyncio.gather(
+                *(summarize_page(page, user_query) for page in pages)
+            )
+
     return Command(
         goto="syntetizer",
         update={
-            "pages": [p.model_dump() for p in explorer_response.data.pages] or [],
+            "pages": pages,
         },
     )
+
+
+def select_pages(
+    data: dict, agent_query: str, user_query: str, limit: int
+) -> list[PageRecord]:
+    """Select the web results best matching the queries.
+
+    Args:
+        data: The search response, as returned by `BraveSearchClient.search`.
+        agent_query: The search query.
+        user_query: The user question.
+        limit: Maximum number of pages to select.
+
+    Returns:
+        list[PageRecord]: The selected pages, their snippets as content.
+    """
+    ranked = rank_results(
+        (data.get("web") or {}).get("results") or [],
+        [agent_query, user_query],
+        limit=limit,
+    )
+    return [
+        PageRecord.create(
+            r["url"], category=r.get("subtype") or "web", content=result_text(r)
+        )
+        for r in ranked
+    ]
+
+
+def _fast_path(agent_query: str, answers: list[StructuredAnswer]) -> Command:
+    logger.info(
+        f"⚡ Fast path for '{agent_query}': " + ", ".join(a.kind for a in answers)
+    )
+    metrics.incr("fastpath.hits")
+    return Command(
+        goto="syntetizer",
+        update={
+            "pages": [
+                PageRecord.create(a.url, category=a.kind, content=a.text)
+                for a in answers
+            ],
+        },
+    )
+
+
+async def summarize_page(page: PageRecord, user_query: str) -> PageRecord:
+    """Summarize the fetched text of a page for the user query.
+
+    Only the passages of the page most relevant to the query are sent to the
+    chunk analyzer agent.
+
+    Args:
+        page: The page, with its fetched text.
+        user_query: The user query.
+
+    Returns:
+        PageRecord: The page with the summary as content, unchanged if it has
+            no text, the text is not relevant or the deadline is reached.
+    """
+    if not page.text:
+        return page
+    passages = await asyncio.to_thread(rank_passages, [page], [user_query], top_k=3)
+
+    text = "\n...\n".join(p.text for p in passages)
+    prompt = UserPrompt(query=f"User query: {user_query}\n\nChunk:\n{text}")
+    try:
+        with load.track("llm"):
+            async with deadline():
+                response = await chunkanalyzerAgent.run(prompt.text())
+    except TimeoutError:
+        metrics.incr("deadline.summaries")
+        return page
+    current_run().budget.charge_usage(response.usage())
+
+    summary = response.data.response
+    if response.data.error or not summary or summary.lower() == "not relevant":
+        return page
+    return PageRecord.create(
+        page.url,
+        category=page.category,
+        content=summary,
+        text=page.text,
+        truncated=page.truncated,
+        limits=page.limits,
+    )
+
+
+async def fetch_pages(pages: list[PageRecord]) -> list[PageRecord]:
+    """Fetch the full text of the selected pages.
+
+    Fetches go through the run's fetch coordinator, so a page selected by
+    several explorers, or in an earlier research round, is only fetched once
+    and only charged once to the run budget. Pages over the budget, or not
+    fetched before the deadline, are kept without their text.
+
+    Args:
+        pages: The pages selected by the explorer agent.
+
+    Returns:
+        list[PageRecord]: The pages with the fetched text added when available.
+    """
+    run = current_run()
+    futures = {}
+    for page in pages:
+        if page.url in run.fetcher or run.budget.try_fetch():
+            futures[page.url] = run.fetcher.submit(page.url)
+    if len(futures) < len(pages):
+        logger.info(f"💸 Fetch budget exhausted: {len(pages) - len(futures)} skipped")
+
+    # The fetches are shared with the other branches: wait for them without
+    # cancelling them, the run cancels the ones left when it ends.
+    results = {}
+    if futures:
+        done, pending = await asyncio.wait(
+            futures.values(), timeout=run.budget.time_left()
+        )
+        if pending:
+            logger.warning(f"⏰ {len(pending)} page fetches not done by the deadline")
+            metrics.incr("deadline.fetches", len(pending))
+        results = {
+            url: future.result()
+            for url, future in futures.items()
+            if future in done and not future.cancelled()
+        }
+    return [
+        page.with_text(
+            result["text"],
+            truncated=result.get("truncated", False),
+            limits=result.get("limits") or (),
+        )
+        if (result := results.get(page.url)) and result["text"]
+        else page
+        for page in pages
+    ]
@@ -0,0 +1,111 @@
+"""Gap finder node for web search operations.
+
+This module provides the feedback step of the deep research mode. After each
+synthesis it looks for the information still missing from the answer and
+starts another round of explorers with follow-up queries, until the answer is
+complete, the maximum number of rounds is reached or the run budget runs out.
+"""
+
+from typing import Literal
+
+from langgraph.graph import END
+from langgraph.types import Command
+
+from websearch.agents.querygen import querygenAgent
+from websearch.metrics import metrics
+from websearch.nodes.querygen import explorer_sends
+from websearch.planner import load
+from websearch.prompts import UserPrompt
+from websearch.root_logger import root_logger
+from websearch.runcontext import current_run, deadline
+from websearch.state import GraphState
+
+logger = root_logger.getChild(__name__)
+
+
+async def gapfinder(state: GraphState) -> Command[Literal["explorer", "__end__"]]:
+    """Generate follow-up queries for the information missing from the answer.
+
+    This function asks the query generator for the queries needed to complete
+    the current answer and sends the new ones to the explorers. The graph ends
+    when no new query is generated, or none was before the deadline.
+    """
+    run = current_run()
+    searched = state.get("queries", [])
+    message = (
+        f"Query: {state['user_query']}\n\n"
+        f"Current answer: {state.get('answer')}\n\n"
+        "Already searched:\n" + "\n".join(f"- {q}" for q in searched)
+    )
+    prompt = UserPrompt(
+        query=message,
+        steps=[
+            "Read the user query and the current answer",
+            "Find the information needed to answer the query that is missing or uncertain in the current answer",
+            "Generate search queries only for the missing information",
+            "Don't repeat the queries already searched",
+            "Return an empty list of queries if the current answer is complete",
+        ],
+    )
+
+    logger.log_prompt("Gapfinder", prompt.text())
+    try:
+        with load.track("llm"):
+            async with deadline():
+                agent_response = await querygenAgent.run(prompt.text())
+    except TimeoutError:
+        logger.warning("⏰ Gap finding timed out, keeping the current answer")
+        metrics.incr("deadline.gapfinder")
+        return Command(goto=END)
+    run.budget.charge_usage(agent_response.usage())
+
+    if agent_response.data.error:
+        logger.error(f"Gap finding failed: {agent_response.data.error}")
+        return Command(goto=END)
+
+    seen = {q.strip().lower() for q in searched}
+    followups = []
+    for query in agent_response.data.queries or []:
+        if query.strip().lower() not in seen:
+            seen.add(query.strip().lower())
+            followups.append(query)
+
+    # Only start the searches the budget can still pay for.
+    if run.budget.remaining_searches is not None:
+        followups = followups[: run.budget.remaining_searches]
+
+    if not followups:
+        logger.info("🔎 No gaps left in the answer")
+        return Command(goto=END)
+
+    next_round = state.get("round", 1) + 1
+    logger.log_response("Gapfinder", "\n".join(followups))
+    logger.info(f"🔎 Research round {next_round}: {len(followups)} follow-up queries")
+    return Command(
+        goto=explorer_sends(state, followups),
+        update={"queries": followups, "round": next_round},
+    )
+
+
+def research_router(state: GraphState) -> Literal["gapfinder", "__end__"]:
+    """Router after the synthesis.
+
+    This function continues with the gap finder while the run is in deep
+    research mode and has rounds and budget left, and ends the graph otherwise.
+    """
+    if state.get("error") or not state.get("answer"):
+        return END
+
+    current_round = state.get("round", 1)
+    if current_round >= state.get("max_rounds", 1):
+        return END
+
+    exhausted = current_run().budget.exhausted()
+    if exhausted:
+        logger.info(
+            f"💸 Research stopped after round {current_round}: "
+            f"{exhausted} budget exhausted"
+        )
+        return END
+
+    return "gapfinder"
@@ -7,34 +7,94 @@ from typing import Any, Literal
 
 from langgraph.constants import Send
 
+from websearch import iocache
 from websearch.agents.querygen import querygenAgent
+from websearch.metrics import metrics
+from websearch.modelcontext import ctx
+from websearch.planner import load, remember_queries
 from websearch.root_logger import root_logger
+from websearch.runcontext import current_run, deadline
 from websearch.state import GraphState
 
 logger = root_logger.getChild(__name__)
 
+QUERYGEN_SHARE = 0.25
+"""Fraction of the time left to the run that the query generation may take."""
+
 
 async def querygen(state: GraphState) -> Any:
     """Generate queries from a user query.
 
     This function takes the user query and generates queries using the querygenAgent.
+    When the agent does not answer within a quarter of the time left, the user
+    query itself is searched.
     """
     user_query = state["user_query"]
-    message = f"Query: {user_query}\n\n"
-    logger.log_prompt("Querygen", message)
-    agent_response = await querygenAgent.run(message)
-    queries = "\n".join(agent_response.data.queries)
-    logger.log_response("Querygen", queries)
 
-    if agent_response.data.error:
-        return {"error": agent_response.data.error}
+    if state.get("queries"):
+        # The planner reuses the queries of a recent run of the same question.
+        logger.info(f"♻️ Reusing {len(state['queries'])} planned queries")
+        return {}
+
+    num_queries = state.get("num_queries", 3)
+    message = _message(user_query, num_queries)
+
+    # Entries are only stored when LLM caching is enabled or by the warming job.
+    ttl = iocache.cache_settings.llm_ttl
+    key = querygen_cache_key(user_query, num_queries)
+    queries = iocache.cache.get(key)
+    if queries:
+        logger.info(f"💾 Reusing {len(queries)} cached generated queries")
+    else:
+        logger.log_prompt("Querygen", message)
+        try:
+            with load.track("llm"):
+                async with deadline(share=QUERYGEN_SHARE):
+                    agent_response = await querygenAgent.run(message)
+        except TimeoutError:
+            logger.warning("⏰ Query generation timed out, searching the user query")
+            metrics.incr("deadline.querygen")
+            return {"queries": [user_query], "user_query": user_query}
+        current_run().budget.charge_usage(agent_response.usage())
+        queries = (agent_response.data.queries or [])[:num_queries]
+        logger.log_response("Querygen", "\n".join(queries))
+
+        if agent_response.data.error:
+            return {"error": agent_response.data.error}
+        if queries and ttl:
+            iocache.cache.set(key, queries, expire=ttl, tag="llm")
+
+    if queries:
+        remember_queries(user_query, queries)
 
     return {
-        "queries": agent_response.data.queries or [],
+        "queries": queries,
         "user_query": user_query,
     }
 
 
+def _message(user_query: str, num_queries: int) -> str:
+    return f"Query: {user_query}\n\nGenerate {num_queries} queries.\n"
+
+
+def querygen_cache_key(user_query: str, num_queries: int) -> tuple:
+    """Get the cache key of the queries generated for a question.
+
+    Args:
+        user_query: The user question.
+        num_queries: The number of queries asked.
+
+    Returns:
+        tuple: The key, specific to the query generation model.
+    """
+    return (
+        "llm",
+        "querygen",
+        ctx.agent_models("querygen")[0],
+        _message(user_query, num_queries),
+    )
+
+
 def query_gen_router(state: GraphState) -> Literal["explorer", "__end__"]:
     """Router for query generation.
 
@@ -45,6 +105,19 @@ def query_gen_router(state: GraphState) -> Literal["explorer", "__end__"]:
 
     assert state["user_query"]
 
+    return explorer_sends(state, state["queries"])
+
+
+def explorer_sends(state: GraphState, queries: list[str]) -> list[Send]:
+    """Create one explorer branch per search query.
+
+    Args:
+        state: The graph state.
+        queries: The search queries to explore.
+
+    Returns:
+        list[Send]: The explorer branches.
+    """
     return [
         Send(
             "explorer",
@@ -52,7 +125,9 @@ def query_gen_router(state: GraphState) -> Literal["explorer", "__end__"]:
                 "agent_query": query,
                 "user_query": state["user_query"],
                 "result_limit": state["result_limit"],
+                "fetch_pages": state.get("fetch_pages", False),
+                "explorer_mode": state.get("explorer_mode", "agent"),
             },
         )
-        for query in state["queries"]
+        for query in queries
     ]
@@ -0,0 +1,54 @@
+"""Recall node for web search operations.
+
+This module provides a node that answers from the local passage store when it
+already covers the user query, skipping the web search entirely.
+"""
+
+import asyncio
+from typing import Literal
+
+from langgraph.types import Command
+
+from websearch.records import PageRecord
+from websearch.retrieval.passages import group_by_page
+from websearch.retrieval.passagestore import passage_store, passage_store_settings
+from websearch.root_logger import root_logger
+from websearch.state import GraphState
+
+logger = root_logger.getChild(__name__)
+
+
+async def recall(state: GraphState) -> Command[Literal["querygen", "syntetizer"]]:
+    """Retrieve pages from the local passage store.
+
+    This function looks the user query up in the passage store. On a hit the
+    retrieved passages are sent straight to the syntetizer, otherwise the graph
+    continues with the query generation.
+    """
+    if not passage_store_settings.enabled:
+        return Command(goto="querygen")
+
+    try:
+        passages = await asyncio.to_thread(passage_store.recall, state["user_query"])
+    except Exception as e:
+        logger.error(f"Passage store lookup failed: {e}")
+        passages = None
+
+    if not passages:
+        logger.info("📚 Passage store miss")
+        return Command(goto="querygen")
+
+    logger.info(f"📚 Passage store hit: {len(passages)} passages")
+    return Command(
+        goto="syntetizer",
+        update={
+            "pages": [
+                PageRecord.create(
+                    url,
+                    category="cached",
+                    content="\n".join(p.text for p in page_passages),
+                )
+                for url, page_passages in group_by_page(passages).items()
+            ],
+        },
+    )
@@ -3,12 +3,25 @@
 This module provides a node for synthesizing the answer from the pages.
 """
 
+import asyncio
 from typing import Any
 
 from websearch.agents.syntetizer import syntetizerAgent
+from websearch.metrics import metrics
+from websearch.planner import load
 from websearch.prompts import UserPrompt
+from websearch.records import PageRecord
+from websearch.retrieval.passages import (
+    group_by_page,
+    page_text,
+    rank_passages,
+    retrieval_settings,
+)
 from websearch.root_logger import root_logger
+from websearch.runcontext import current_run, deadline
 from websearch.state import GraphState
+from websearch.tokens import estimate_tokens
+from websearch.tools.directanswer import STRUCTURED_CATEGORIES, fast_path_settings
 
 logger = root_logger.getChild(__name__)
 
@@ -17,13 +30,33 @@ async def syntetizer(state: GraphState) -> Any:
     """Synthesize the answer from the pages.
 
     This function takes the user query and the pages and synthesizes the answer.
+    When the pages are only structured answers from the search results and
+    direct answers are enabled, they are returned as the answer without the
+    syntetizer agent. When the agent does not answer before the deadline, the
+    most relevant passages of the pages are returned as a partial answer.
     """
     user_query = state["user_query"]
     pages = state["pages"]
+    path = answer_path(pages)
 
-    pages_content = ""
-    for page in pages:
-        pages_content += f"## Page: {page['url']}: Category: {page['category']}\nContent:\n{page['content']}\n\n"
+    if path == "fast_path" and fast_path_settings.direct:
+        logger.info("⚡ Direct answer from the structured search results")
+        metrics.incr("answers.direct")
+        return {
+            "answer": "\n\n".join(page.content for page in pages),
+            "sources": [page.url for page in pages],
+            "path": "direct",
+        }
+
+    if retrieval_settings.enabled:
+        # The embeddings rerank runs a model: keep it off the event loop.
+        pages_content = await asyncio.to_thread(
+            format_passages, pages, [user_query, *state.get("queries", [])]
+        )
+    else:
+        pages_content = ""
+        for page in pages:
+            pages_content += f"## Page: {page.url}: Category: {page.category}\nContent:\n{page.content}\n\n"
 
     message = f"User query: {user_query}\n Pages: {pages_content}"
     prompt = UserPrompt(
@@ -39,7 +72,15 @@ async def syntetizer(state: GraphState) -> Any:
     )
 
     logger.log_prompt("Syntetizer", message)
-    agent_response = await syntetizerAgent.run(prompt.text())
+    try:
+        with load.track("llm"):
+            async with deadline(synthesis=True):
+                agent_response = await syntetizerAgent.run(prompt.text())
+    except TimeoutError:
+        logger.warning("⏰ Synthesis timed out, answering with the passages found")
+        metrics.incr("answers.partial")
+        return partial_answer(pages, [user_query, *state.get("queries", [])])
+    current_run().budget.charge_usage(agent_response.usage())
     answer = agent_response.data.answer
 
     if answer:
@@ -49,7 +90,80 @@ async def syntetizer(state: GraphState) -> Any:
     if agent_response.data.error:
         return {"error": agent_response.data.error}
 
+    logger.info(f"Answer path: {path}")
+    metrics.incr(f"answers.{path}")
     return {
         "answer": agent_response.data.answer,
         "sources": agent_response.data.sources,
+        "path": path,
     }
+
+
+def answer_path(pages: list[PageRecord]) -> str:
+    """Name the path of the graph that found the evidence of an answer.
+
+    Args:
+        pages: The page records.
+
+    Returns:
+        str: 'fast_path' if the pages are only structured search answers,
+            'recall' if they come from the passage store, 'explorer' otherwise.
+    """
+    categories = {page.category for page in pages}
+    if categories and categories <= STRUCTURED_CATEGORIES:
+        return "fast_path"
+    if "cached" in categories:
+        return "recall"
+    return "explorer"
+
+
+def partial_answer(pages: list[PageRecord], queries: list[str]) -> dict:
+    """Build an answer from the evidence alone, without the syntetizer agent.
+
+    Args:
+        pages: The page records gathered before the deadline.
+        queries: The user query and the generated search queries.
+
+    Returns:
+        dict: The answer, made of the most relevant passages of every page,
+            their URLs as sources, and the 'partial' path.
+    """
+    passages = group_by_page(rank_passages(pages, queries, embeddings=False))
+    if not passages:
+        answer = "No answer was found before the deadline of the search."
+    else:
+        answer = "The search ran out of time. The most relevant passages found:\n\n"
+        answer += "\n\n".join(
+            f"{url}:\n" + "\n...\n".join(p.text for p in page_passages)
+            for url, page_passages in passages.items()
+        )
+    return {"answer": answer, "sources": list(passages), "path": "partial"}
+
+
+def format_passages(pages: list[PageRecord], queries: list[str]) -> str:
+    """Format the most relevant passages of the pages for the syntetizer prompt.
+
+    Args:
+        pages: The page records.
+        queries: The user query and the generated search queries.
+
+    Returns:
+        str: The passages grouped by page.
+    """
+    passages = rank_passages(pages, queries)
+    categories = {page.url: page.category for page in pages}
+
+    pages_content = ""
+    for url, page_passages in group_by_page(passages).items():
+        content = "\n...\n".join(p.text for p in page_passages)
+        pages_content += (
+            f"## Page: {url}: Category: {categories[url]}\nContent:\n{content}\n\n"
+        )
+
+    tokens_before = sum(estimate_tokens(page_text(page)) for page in pages)
+    tokens_after = sum(estimate_tokens(p.text) for p in passages)
+    logger.info(
+        f"Passages: {len(passages)} kept, ~{tokens_after} of ~{tokens_before} "
+        f"page tokens sent ({tokens_before - tokens_after} saved)"
+    )
+    return pages_content
@@ -0,0 +1,294 @@
+"""Adaptive fan-out planning.
+
+This module decides how much work a query gets before the graph starts: the
+number of search queries generated and the number of pages selected per query.
+Complex questions get more branches than simple ones, and the fan-out shrinks
+as the process gets loaded, down to answering from cached searches only, so
+that the tail latency stays bounded when many queries arrive at once.
+
+The load is measured by the LLM calls in flight in the process and the page
+fetches waiting in the fetch scheduler.
+"""
+
+import math
+import re
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch import iocache
+from websearch.metrics import metrics
+from websearch.root_logger import root_logger
+from websearch.tools.fetchscheduler import scheduler
+
+logger = root_logger.getChild(__name__)
+
+COMPARISON_WORDS = {
+    "advantages",
+    "between",
+    "compare",
+    "compared",
+    "comparison",
+    "difference",
+    "differences",
+    "pros",
+    "tradeoffs",
+    "versus",
+    "vs",
+}
+"""Words announcing a question about several subjects."""
+
+ANALYSIS_WORDS = {"explain", "history", "how", "impact", "why"}
+"""Words announcing a question asking for an explanation."""
+
+
+class PlannerSettings(BaseSettings):
+    """Configuration of the planner.
+
+    Attributes:
+        enabled: Whether to adapt the fan-out, otherwise it is static.
+        min_queries: Number of search queries for the simplest questions.
+        max_queries: Number of search queries for the most complex questions.
+        max_results: Number of pages per query for the most complex questions.
+        llm_capacity: LLM calls the model server handles concurrently.
+        plan_ttl: Seconds the queries of a question are remembered, the
+            lifetime of the cached searches.
+    """
+
+    enabled: bool = Field(alias="PLANNER_ENABLED", default=True)
+    min_queries: int = Field(alias="PLANNER_MIN_QUERIES", default=1)
+    max_queries: int = Field(alias="PLANNER_MAX_QUERIES", default=5)
+    max_results: int = Field(alias="PLANNER_MAX_RESULTS", default=5)
+    llm_capacity: int = Field(alias="PLANNER_LLM_CAPACITY", default=4)
+    plan_ttl: int = Field(alias="PLANNER_PLAN_TTL", default=60 * 60 * 24)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+planner_settings = PlannerSettings()
+
+
+class LoadTracker:
+    """Count the operations in flight in the process, by kind."""
+
+    def __init__(self):
+        """Initialize the tracker."""
+        self._in_flight: Counter = Counter()
+
+    def __getitem__(self, kind: str) -> int:
+        """Return the number of operations of a kind in flight."""
+        return self._in_flight[kind]
+
+    @contextmanager
+    def track(self, kind: str):
+        """Count an operation as in flight for the duration of the block.
+
+        Args:
+            kind: The kind of operation, e.g. 'llm'.
+        """
+        self._in_flight[kind] += 1
+        try:
+            yield
+        finally:
+            self._in_flight[kind] -= 1
+
+
+load = LoadTracker()
+"""The load of the process."""
+
+
+@dataclass
+class Plan:
+    """Fan-out of a query.
+
+    Attributes:
+        level: The load level the plan was made for: 'normal', 'busy' or
+            'overloaded'.
+        num_queries: Number of search queries to generate.
+        result_limit: Number of pages to select per query.
+        fetch_pages: Whether to fetch the full text of the pages.
+        max_rounds: Number of research rounds allowed.
+        cache_only: Whether only cached searches may be used.
+        queries: Known queries to reuse instead of generating new ones.
+    """
+
+    level: Literal["normal", "busy", "overloaded"]
+    num_queries: int
+    result_limit: int
+    fetch_pages: bool
+    max_rounds: int
+    cache_only: bool = False
+    queries: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Return the plan as a dictionary."""
+        return asdict(self)
+
+
+def estimate_complexity(question: str) -> float:
+    """Estimate how much evidence a question needs.
+
+    A cheap heuristic on the question text: longer questions, comparisons,
+    questions with several parts and requests for explanations score higher.
+
+    Args:
+        question: The user question.
+
+    Returns:
+        float: The complexity, between 0 and 1.
+    """
+    words = re.findall(r"\w+", question.lower())
+    score = 0.2 + 0.4 * min(len(words) / 20, 1.0)
+    if COMPARISON_WORDS.intersection(words):
+        score += 0.3
+    if ANALYSIS_WORDS.intersection(words):
+        score += 0.1
+    parts = words.count("and") + question.count(",") + question.count(";")
+    parts += max(question.count("?") - 1, 0)
+    score += min(0.1 * parts, 0.3)
+    return min(score, 1.0)
+
+
+def pressure() -> float:
+    """Measure the load of the process.
+
+    Returns:
+        float: The highest ratio of LLM calls to the LLM capacity and of page
+            fetches to the fetch scheduler capacity. 1 means saturated.
+    """
+    return max(
+        load["llm"] / planner_settings.llm_capacity,
+        scheduler.pending / scheduler.settings.max_in_flight,
+    )
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question, so trivially different questions compare equal.
+
+    Args:
+        question: The user question.
+
+    Returns:
+        str: The lowercase words of the question, without punctuation.
+    """
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+
+def _plan_key(question: str) -> tuple[str, str]:
+    return ("plan", normalize_question(question))
+
+
+def known_queries(question: str) -> list[str]:
+    """Get the queries generated for the same question recently.
+
+    Their searches are expected to be in the search cache.
+
+    Args:
+        question: The user question.
+
+    Returns:
+        list[str]: The queries, empty if the question was not seen recently.
+    """
+    return iocache.cache.get(_plan_key(question), default=[])
+
+
+def remember_queries(question: str, queries: list[str]) -> None:
+    """Remember the queries generated for a question.
+
+    Args:
+        question: The user question.
+        queries: The generated queries.
+    """
+    iocache.cache.set(
+        _plan_key(question), queries, expire=planner_settings.plan_ttl, tag="plans"
+    )
+
+
+def plan(
+    question: str,
+    *,
+    result_limit: int | None = None,
+    fetch_pages: bool = False,
+    max_rounds: int = 1,
+    idle: bool = False,
+) -> Plan:
+    """Plan the fan-out of a query.
+
+    Under load the number of queries and pages is halved, page fetches and
+    extra research rounds are dropped, and queries seen recently are reused so
+    their searches are served from the cache. When overloaded, a question seen
+    recently is answered from the cached searches only, and any other question
+    gets a single query.
+
+    Args:
+        question: The user question.
+        result_limit: Number of pages per query requested by the caller, planned
+            when None.
+        fetch_pages: Whether the caller asked to fetch the pages.
+        max_rounds: Number of research rounds asked by the caller.
+        idle: Plan as if the process were not loaded, e.g. to warm the
+            caches for the plan of a later run.
+
+    Returns:
+        Plan: The plan.
+    """
+    settings = planner_settings
+    if not settings.enabled:
+        return Plan(
+            level="normal",
+            num_queries=3,
+            result_limit=result_limit or 1,
+            fetch_pages=fetch_pages,
+            max_rounds=max_rounds,
+        )
+
+    complexity = estimate_complexity(question)
+    num_queries = settings.min_queries + round(
+        complexity * (settings.max_queries - settings.min_queries)
+    )
+    planned_results = 1 + round(complexity * (settings.max_results - 1))
+
+    load_pressure = 0.0 if idle else pressure()
+    if load_pressure < 1:
+        result = Plan(
+            level="normal",
+            num_queries=num_queries,
+            result_limit=result_limit or planned_results,
+            fetch_pages=fetch_pages,
+            max_rounds=max_rounds,
+        )
+    else:
+        known = known_queries(question)
+        if load_pressure < 2:
+            result = Plan(
+                level="busy",
+                num_queries=len(known) or math.ceil(num_queries / 2),
+                result_limit=result_limit or math.ceil(planned_results / 2),
+                fetch_pages=False,
+                max_rounds=1,
+                queries=known,
+            )
+        else:
+            result = Plan(
+                level="overloaded",
+                num_queries=len(known) or 1,
+                result_limit=result_limit or 1,
+                fetch_pages=False,
+                max_rounds=1,
+                cache_only=bool(known),
+                queries=known,
+            )
+
+    metrics.incr(f"planner.{result.level}")
+    logger.info(
+        f"🧭 Plan ({result.level}, complexity {complexity:.2f}, "
+        f"pressure {load_pressure:.2f}): {result.num_queries} queries, "
+        f"{result.result_limit} pages each"
+    )
+    return result
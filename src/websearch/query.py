@@ -19,48 +19,197 @@ Example:
     ```
 """
 
-import uuid
-from typing import Any, AsyncIterator, Dict
+import dataclasses
+from typing import Any, AsyncIterator, Dict, Literal
 
-from websearch.graph import graph
+from langgraph.graph.state import CompiledStateGraph
+
+from websearch.budget import Budget, deadline_settings, research_settings
+from websearch.checkpoint import open_checkpointer
+from websearch.graph import with_checkpointer
+from websearch.nodes.explorer import explorer_settings
+from websearch.planner import normalize_question, plan
+from websearch.root_logger import root_logger
+from websearch.runcontext import RunContext, reset_run, set_run
 from websearch.state import GraphState
+from websearch.warmup import warmer
+
+logger = root_logger.getChild(__name__)
 
 
 async def exec(
     question: str,
     *,
-    result_limit: int = 1,
+    result_limit: int | None = None,
+    fetch_pages: bool = False,
+    checkpoint: bool = True,
+    thread_id: str | None = None,
+    deep_research: bool = False,
+    budget: Budget | None = None,
+    explorer: Literal["agent", "search"] | None = None,
+    timeout: float | None = None,
 ) -> AsyncIterator[Dict[str, Any]]:
     """Execute a web search query and stream the results.
 
     This function processes the given question through a graph-based search system
     and asynchronously yields results as they become available.
 
+    A run that failed part way can be resumed by calling this function again with
+    the `thread_id` it yielded first. The run restarts from its last checkpoint:
+    nodes that already completed, including finished explorer branches, are not
+    executed again. Use the 'sqlite' checkpoint backend to resume across restarts.
+
+    The number of search queries and of pages per query are planned from the
+    complexity of the question and the load of the process. Under load the
+    fan-out shrinks, and page fetches and research rounds are dropped.
+
+    In deep research mode every answer is followed by a gap finding step that
+    generates follow-up queries for the missing information and starts another
+    round of explorers, until the answer is complete or the `RESEARCH_MAX_ROUNDS`
+    rounds or the budget are used up. Searches served from the cache and pages
+    already fetched in the run are not charged, so each round only pays for the
+    new evidence. Each round yields an improved answer, the last one is final.
+
+    Every run has a deadline. Agent runs, searches and page fetches are awaited
+    until shortly before it, then abandoned, and the syntetizer answers from the
+    evidence gathered so far. If it cannot finish either, the answer is made of
+    the most relevant passages, with the 'partial' path. Fetches still in flight
+    when the run ends are cancelled and their browser pages closed.
+
     Args:
         question: The search query or question to be processed.
-        result_limit: Maximum number of results to return. Defaults to 1.
+        result_limit: Number of pages selected per search query. Defaults to
+            the number planned from the question complexity and the load.
+        fetch_pages: Whether to fetch the full text of the selected pages.
+            Pages selected by several explorers are fetched once. Defaults to False.
+        checkpoint: Whether to checkpoint the run with the configured backend.
+            Disable it for fire-and-forget queries. Defaults to True.
+        thread_id: The id of the run to resume. A new run is started when it has
+            no checkpoint yet. The question must be the one of the run, and
+            the options of the run are kept.
+        deep_research: Whether to refine the answer over several rounds.
+            Defaults to False.
+        budget: Limits on wall-clock time, LLM tokens, searches and page fetches
+            of the run. Defaults to the `RESEARCH_MAX_*` settings in deep research
+            mode and to no limit otherwise. The run works on a copy, its usage
+            is yielded last.
+        explorer: The explorer implementation. 'agent' lets an LLM search and
+            select the pages, 'search' selects the search results with a
+            deterministic ranker, without LLM calls. Defaults to the
+            `EXPLORER_MODE` setting.
+        timeout: Deadline of the run in seconds, capped by the wall-clock limit
+            of the budget. The `RUN_DEADLINE` setting applies when neither is
+            given.
 
     Yields:
         Dict containing one of the following result types:
-            - {"answer": str, "sources": list} - Synthesized answer with sources
+            - {"thread_id": str} - The id of the run, always yielded first
+            - {"plan": dict} - The fan-out planned for a new run
+            - {"answer": str, "sources": list, "path": str} - Synthesized answer
+              with sources, and the path of the graph that answered: 'direct',
+              'fast_path', 'recall', 'explorer' or 'partial'
             - {"query": str} - Generated search query
+            - {"queries": list, "round": int} - Follow-up queries of a research round
             - {"links": list} - Found links
             - {"pages": list} - Navigation pages
+            - {"usage": dict} - The budget used by the run, yielded last
+
+    Raises:
+        ValueError: If a run is resumed without checkpointing, or with another
+            question than its own.
     """
+    if thread_id and not checkpoint:
+        raise ValueError("Resuming a run requires checkpointing")
+
+    warmer.touch()
+
+    if budget is None:
+        budget = Budget.from_settings() if deep_research else Budget()
+    else:
+        # The run adjusts and charges its budget: leave the caller's untouched,
+        # it may be shared by several runs.
+        budget = dataclasses.replace(budget)
+    deadlines = [seconds for seconds in (budget.max_seconds, timeout) if seconds]
+    if deadlines:
+        budget.max_seconds = min(deadlines)
+    elif deadline_settings.run_seconds:
+        budget.max_seconds = deadline_settings.run_seconds
+
+    fanout = plan(
+        question,
+        result_limit=result_limit,
+        fetch_pages=fetch_pages,
+        max_rounds=research_settings.max_rounds if deep_research else 1,
+    )
+    if fanout.cache_only:
+        budget.max_searches = 0
+
+    run = (
+        RunContext(run_id=thread_id, budget=budget)
+        if thread_id
+        else RunContext(budget=budget)
+    )
     config = {
-        "thread_id": str(uuid.uuid4()),
-        "timeout": 1000,
+        "configurable": {"thread_id": run.run_id},
         "max_concurrency": 10,
     }
 
     state = GraphState(
-        result_limit=result_limit,
+        result_limit=fanout.result_limit,
+        num_queries=fanout.num_queries,
+        fetch_pages=fanout.fetch_pages,
+        explorer_mode=explorer or explorer_settings.mode,
+        max_rounds=fanout.max_rounds,
+        round=1,
         user_query=question,
+        queries=fanout.queries,
     )
 
+    token = set_run(run)
+    try:
+        async with open_checkpointer(None if checkpoint else "none") as saver:
+            graph = with_checkpointer(saver)
+            yield {"thread_id": run.run_id}
+
+            snapshot = await graph.aget_state(config) if thread_id else None
+            if snapshot and snapshot.created_at:
+                resumed = snapshot.values.get("user_query", "")
+                if normalize_question(resumed) != normalize_question(question):
+                    raise ValueError(
+                        f"Run {thread_id} answers another question: {resumed!r}"
+                    )
+                if not snapshot.next:
+                    logger.info(f"Run {thread_id} already completed")
+                    yield {
+                        "answer": snapshot.values.get("answer"),
+                        "sources": snapshot.values.get("sources"),
+                        "path": snapshot.values.get("path"),
+                    }
+                    return
+                logger.info(f"Resuming run {thread_id} at {', '.join(snapshot.next)}")
+                state = None
+            else:
+                yield {"plan": fanout.to_dict()}
+
+            async for msg in _stream(graph, state, config):
+                yield msg
+
+            logger.info(f"💸 Run usage: {run.budget.to_dict()}")
+            yield {"usage": run.budget.to_dict()}
+    finally:
+        # Also on cancellation: abandoned fetches close their browser pages.
+        run.fetcher.cancel()
+        reset_run(token)
+
+
+async def _stream(
+    graph: CompiledStateGraph, state: GraphState | None, config: dict
+) -> AsyncIterator[Dict[str, Any]]:
     async for msg in graph.astream(state, config):
         syntetizer_result = msg.get("syntetizer")
         querygen_result = msg.get("querygen")
+        recall_result = msg.get("recall")
+        gapfinder_result = msg.get("gapfinder")
         linksfinder_result = msg.get("linksfinder")
         linknav_result = msg.get("linknav")
 
@@ -68,6 +217,16 @@ async def exec(
             yield {
                 "answer": syntetizer_result.get("answer"),
                 "sources": syntetizer_result.get("sources"),
+                "path": syntetizer_result.get("path"),
+            }
+        elif recall_result:
+            yield {
+                "pages": [p.to_dict() for p in recall_result.get("pages") or []],
+            }
+        elif gapfinder_result:
+            yield {
+                "queries": gapfinder_result.get("queries"),
+                "round": gapfinder_result.get("round"),
             }
         elif querygen_result:
             yield {
@@ -0,0 +1,249 @@
+"""Compact page records.
+
+This module defines the typed records held in the graph state for the pages
+found by the explorers. The text of a page is not stored in the record itself
+but in a content store shared by the process, addressed by the hash of the
+text. Graph checkpoints therefore only copy small handles at every step, and
+identical texts found by several branches or runs are stored once.
+"""
+
+import dataclasses
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch import iocache
+
+
+class ContentStoreSettings(BaseSettings):
+    """Configuration of the content store.
+
+    Attributes:
+        memory_bytes: Size of the in-memory cache of texts, in bytes.
+        expire: Seconds a text is kept in the disk cache.
+    """
+
+    memory_bytes: int = Field(alias="CONTENT_STORE_MEMORY_BYTES", default=64 * 2**20)
+    expire: int = Field(alias="CONTENT_STORE_EXPIRE", default=60 * 60 * 24 * 7)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+content_store_settings = ContentStoreSettings()
+
+
+class ContentStore:
+    """Content addressed store of texts.
+
+    Texts are kept in a bounded in-memory LRU cache in front of the disk cache,
+    so handles stay resolvable across processes and after a restart.
+
+    Args:
+        memory_bytes: Size of the in-memory cache, in bytes.
+        expire: Seconds a text is kept in the disk cache.
+    """
+
+    def __init__(self, *, memory_bytes: int, expire: int):
+        """Initialize the store.
+
+        Args:
+            memory_bytes: Size of the in-memory cache, in bytes.
+            expire: Seconds a text is kept in the disk cache.
+        """
+        self.memory_bytes = memory_bytes
+        self.expire = expire
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._size = 0
+
+    @staticmethod
+    def key(ref: str) -> tuple[str, str]:
+        """Get the disk cache key of a handle.
+
+        Args:
+            ref: The handle of the text.
+
+        Returns:
+            tuple[str, str]: The key under which the text is stored.
+        """
+        return ("content", ref)
+
+    def put(self, text: str) -> str:
+        """Store a text.
+
+        Args:
+            text: The text to store.
+
+        Returns:
+            str: The handle of the text.
+        """
+        ref = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        with self._lock:
+            known = ref in self._memory
+            self._remember(ref, text)
+        if not known:
+            iocache.cache.set(self.key(ref), text, expire=self.expire, tag="content")
+        return ref
+
+    def get(self, ref: str) -> str:
+        """Get a text by its handle.
+
+        Args:
+            ref: The handle of the text.
+
+        Returns:
+            str: The text, empty if it expired from the store.
+        """
+        with self._lock:
+            text = self._memory.get(ref)
+            if text is not None:
+                self._memory.move_to_end(ref)
+                return text
+
+        text = iocache.cache.get(self.key(ref), default="")
+        if text:
+            with self._lock:
+                self._remember(ref, text)
+        return text
+
+    def _remember(self, ref: str, text: str) -> None:
+        if ref in self._memory:
+            self._memory.move_to_end(ref)
+            return
+        self._memory[ref] = text
+        self._size += len(text)
+        while self._size > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._size -= len(evicted)
+
+
+content_store = ContentStore(
+    memory_bytes=content_store_settings.memory_bytes,
+    expire=content_store_settings.expire,
+)
+"""The content store of the process."""
+
+
+@dataclass(slots=True, frozen=True)
+class PageRecord:
+    """A page found while answering a query.
+
+    Attributes:
+        url: The url of the page.
+        category: The category of the page, for example 'news' or 'article'.
+        content_ref: Handle of the content selected by the explorer.
+        text_ref: Handle of the fetched text of the page, if fetched.
+        truncated: Whether the fetched text was cut at the extraction budget.
+        limits: The resource budgets of the page hit while fetching its text,
+            e.g. 'bytes', 'html', 'time' or 'rss'.
+    """
+
+    url: str
+    category: str = ""
+    content_ref: str | None = None
+    text_ref: str | None = None
+    truncated: bool = False
+    limits: tuple[str, ...] = ()
+
+    @classmethod
+    def create(
+        cls,
+        url: str,
+        *,
+        category: str = "",
+        content: str | None = None,
+        text: str | None = None,
+        truncated: bool = False,
+        limits: tuple[str, ...] = (),
+    ) -> "PageRecord":
+        """Create a record, storing its texts in the content store.
+
+        Args:
+            url: The url of the page.
+            category: The category of the page.
+            content: The content selected by the explorer.
+            text: The fetched text of the page.
+            truncated: Whether the fetched text was truncated.
+            limits: The resource budgets hit while fetching the text.
+
+        Returns:
+            PageRecord: The record.
+        """
+        return cls(
+            url=url,
+            category=category,
+            content_ref=content_store.put(content) if content else None,
+            text_ref=content_store.put(text) if text else None,
+            truncated=truncated,
+            limits=tuple(limits),
+        )
+
+    @property
+    def content(self) -> str:
+        """The content selected by the explorer."""
+        return content_store.get(self.content_ref) if self.content_ref else ""
+
+    @property
+    def text(self) -> str:
+        """The fetched text of the page."""
+        return content_store.get(self.text_ref) if self.text_ref else ""
+
+    def with_text(
+        self, text: str, *, truncated: bool = False, limits: tuple[str, ...] = ()
+    ) -> "PageRecord":
+        """Get a copy of the record with a fetched text.
+
+        Args:
+            text: The fetched text of the page.
+            truncated: Whether the text was truncated.
+            limits: The resource budgets hit while fetching the text.
+
+        Returns:
+            PageRecord: The new record.
+        """
+        return dataclasses.replace(
+            self,
+            text_ref=content_store.put(text),
+            truncated=truncated,
+            limits=tuple(limits),
+        )
+
+    def merge(self, other: "PageRecord") -> "PageRecord":
+        """Complete the record with the fields it lacks from another record.
+
+        Args:
+            other: Another record of the same page.
+
+        Returns:
+            PageRecord: The completed record.
+        """
+        return dataclasses.replace(
+            self,
+            category=self.category or other.category,
+            content_ref=self.content_ref or other.content_ref,
+            text_ref=self.text_ref or other.text_ref,
+            truncated=self.truncated if self.text_ref else other.truncated,
+            limits=self.limits if self.text_ref else other.limits,
+        )
+
+    def to_dict(self) -> dict:
+        """Resolve the record into a plain dictionary.
+
+        Returns:
+            dict: The url, category, content, text, truncated and limits
+                fields.
+        """
+        return {
+            "url": self.url,
+            "category": self.category,
+            "content": self.content,
+            "text": self.text,
+            "truncated": self.truncated,
+            "limits": list(self.limits),
+        }
@@ -0,0 +1,12 @@
+from .bm25 import BM25Index, tokenize
+from .passages import Passage, rank_passages, split_passages
+from .snippets import rank_results
+
+__all__ = [
+    "BM25Index",
+    "Passage",
+    "rank_passages",
+    "rank_results",
+    "split_passages",
+    "tokenize",
+]
@@ -0,0 +1,130 @@
+"""In-memory BM25 index.
+
+This module provides a small Okapi BM25 implementation used to score passages
+and search snippets against queries without any external service.
+"""
+
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "are",
+    "as",
+    "at",
+    "be",
+    "by",
+    "for",
+    "from",
+    "how",
+    "in",
+    "is",
+    "it",
+    "of",
+    "on",
+    "or",
+    "that",
+    "the",
+    "this",
+    "to",
+    "was",
+    "what",
+    "when",
+    "where",
+    "which",
+    "who",
+    "why",
+    "with",
+}
+"""Words ignored when tokenizing documents and queries."""
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a text into lowercase terms, dropping stopwords.
+
+    Args:
+        text: The text to tokenize.
+
+    Returns:
+        list[str]: The terms of the text.
+    """
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 index over a fixed list of documents.
+
+    Args:
+        documents: The documents to index.
+        k1: Term frequency saturation parameter.
+        b: Document length normalization parameter.
+    """
+
+    def __init__(self, documents: list[str], *, k1: float = 1.5, b: float = 0.75):
+        """Build the index.
+
+        Args:
+            documents: The documents to index.
+            k1: Term frequency saturation parameter.
+            b: Document length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(d)) for d in documents]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if documents else 0.0
+
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self.term_freqs)
+
+    def score(self, query: str) -> list[float]:
+        """Score every document against a query.
+
+        Args:
+            query: The query text.
+
+        Returns:
+            list[float]: The score of each document, in index order.
+        """
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        scores = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+    def score_many(self, queries: list[str]) -> list[float]:
+        """Score every document against several queries, keeping the best score.
+
+        Args:
+            queries: The query texts.
+
+        Returns:
+            list[float]: The best score of each document, in index order.
+        """
+        best = [0.0] * len(self)
+        for query in queries:
+            for i, score in enumerate(self.score(query)):
+                best[i] = max(best[i], score)
+        return best
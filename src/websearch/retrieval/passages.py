@@ -0,0 +1,221 @@
+"""Passage level relevance ranking.
+
+This module splits page text into passages and ranks them against the user
+query and the generated search queries, so that only the most relevant
+passages are sent to the syntetizer. Passages are scored with BM25 and can be
+optionally reranked with the embedding models shipped with `pymilvus[model]`.
+"""
+
+import re
+from dataclasses import dataclass
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.records import PageRecord
+from websearch.retrieval.bm25 import BM25Index
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+
+class RetrievalSettings(BaseSettings):
+    """Configuration of the passage ranking stage.
+
+    Attributes:
+        enabled: Whether pages are reduced to their top passages before synthesis.
+        top_k: Number of passages forwarded to the syntetizer.
+        passage_chars: Maximum length of a passage in characters.
+        embeddings: Whether to rerank the BM25 candidates with embeddings.
+    """
+
+    enabled: bool = Field(alias="RETRIEVAL_ENABLED", default=True)
+    top_k: int = Field(alias="RETRIEVAL_TOP_K", default=10)
+    passage_chars: int = Field(alias="RETRIEVAL_PASSAGE_CHARS", default=600)
+    embeddings: bool = Field(alias="RETRIEVAL_EMBEDDINGS", default=False)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+retrieval_settings = RetrievalSettings()
+
+
+@dataclass
+class Passage:
+    """A passage of a page.
+
+    Attributes:
+        url: The url of the page the passage comes from.
+        category: The category of the page.
+        text: The text of the passage.
+        score: The relevance score of the passage.
+    """
+
+    url: str
+    category: str
+    text: str
+    score: float = 0.0
+
+
+def split_passages(text: str, *, max_chars: int = 600) -> list[str]:
+    """Split a text into passages of at most `max_chars` characters.
+
+    Paragraphs are packed together until the limit is reached. Paragraphs
+    longer than the limit are split on sentence boundaries.
+
+    Args:
+        text: The text to split.
+        max_chars: The maximum length of a passage.
+
+    Returns:
+        list[str]: The passages of the text.
+    """
+    units = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            units.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while len(sentence) > max_chars:
+                units.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                units.append(sentence)
+
+    passages = []
+    current = ""
+    for unit in units:
+        if current and len(current) + len(unit) + 1 > max_chars:
+            passages.append(current)
+            current = unit
+        else:
+            current = f"{current}\n{unit}" if current else unit
+    if current:
+        passages.append(current)
+    return passages
+
+
+def page_text(page: PageRecord) -> str:
+    """Get the best available text of a page record.
+
+    Args:
+        page: The page record.
+
+    Returns:
+        str: The fetched text of the page if available, else its content.
+    """
+    return page.text or page.content
+
+
+def rank_passages(
+    pages: list[PageRecord],
+    queries: list[str],
+    *,
+    top_k: int | None = None,
+    passage_chars: int | None = None,
+    embeddings: bool | None = None,
+) -> list[Passage]:
+    """Rank the passages of a list of pages against a list of queries.
+
+    Args:
+        pages: The page records to split and rank.
+        queries: The user query and the generated search queries.
+        top_k: Number of passages to return. Defaults to the settings.
+        passage_chars: Maximum passage length. Defaults to the settings.
+        embeddings: Whether to rerank with embeddings. Defaults to the settings.
+
+    Returns:
+        list[Passage]: The top passages, ordered by decreasing relevance.
+    """
+    if top_k is None:
+        top_k = retrieval_settings.top_k
+    passage_chars = passage_chars or retrieval_settings.passage_chars
+    if embeddings is None:
+        embeddings = retrieval_settings.embeddings
+
+    passages = [
+        Passage(url=page.url, category=page.category, text=text)
+        for page in pages
+        for text in split_passages(page_text(page), max_chars=passage_chars)
+    ]
+    if not passages:
+        return []
+
+    index = BM25Index([p.text for p in passages])
+    for passage, score in zip(passages, index.score_many(queries)):
+        passage.score = score
+
+    passages.sort(key=lambda p: p.score, reverse=True)
+
+    if embeddings:
+        candidates = passages[: top_k * 4]
+        passages = rerank_with_embeddings(candidates, queries) + passages[top_k * 4 :]
+
+    return passages[:top_k]
+
+
+_embedding_fn = None
+
+
+def _get_embedding_fn():
+    global _embedding_fn
+    if _embedding_fn is None:
+        from pymilvus import model
+
+        _embedding_fn = model.DefaultEmbeddingFunction()
+    return _embedding_fn
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(y * y for y in b) ** 0.5
+    return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+
+def rerank_with_embeddings(
+    passages: list[Passage], queries: list[str]
+) -> list[Passage]:
+    """Rerank passages by embedding similarity to the queries.
+
+    Falls back to the given order if the embedding model is not available.
+
+    Args:
+        passages: The candidate passages.
+        queries: The queries to compare against.
+
+    Returns:
+        list[Passage]: The passages ordered by decreasing similarity.
+    """
+    try:
+        embedding_fn = _get_embedding_fn()
+    except ImportError as e:
+        logger.warning(f"Embedding rerank unavailable, using BM25 only: {e}")
+        return passages
+
+    query_vectors = embedding_fn.encode_queries(queries)
+    passage_vectors = embedding_fn.encode_documents([p.text for p in passages])
+    for passage, vector in zip(passages, passage_vectors):
+        passage.score = max(_cosine(q, vector) for q in query_vectors)
+
+    return sorted(passages, key=lambda p: p.score, reverse=True)
+
+
+def group_by_page(passages: list[Passage]) -> dict[str, list[Passage]]:
+    """Group ranked passages by the page they come from.
+
+    Args:
+        passages: The ranked passages.
+
+    Returns:
+        dict[str, list[Passage]]: Passages by url, pages ordered by best passage.
+    """
+    grouped: dict[str, list[Passage]] = {}
+    for passage in passages:
+        grouped.setdefault(passage.url, []).append(passage)
+    return grouped
@@ -0,0 +1,207 @@
+"""Persistent local index of fetched page passages.
+
+This module keeps the passages of every page fetched by `navigate_link` in a
+Milvus Lite database, together with their url and fetch time. The graph queries
+it before searching the web, so questions on topics that were already explored
+can be answered without calling Brave Search or the browser.
+"""
+
+import pathlib
+import threading
+import time
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.retrieval.passages import Passage, split_passages
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+
+class PassageStoreSettings(BaseSettings):
+    """Configuration of the local passage store.
+
+    Attributes:
+        enabled: Whether fetched pages are indexed and queried before searching.
+        path: Path of the Milvus Lite database file.
+        top_k: Number of passages retrieved for a question.
+        min_score: Minimum cosine similarity for a passage to count as a hit.
+        min_hits: Minimum number of hits to answer from the store.
+        max_age: Passages older than this many seconds are ignored.
+    """
+
+    enabled: bool = Field(alias="PASSAGE_STORE_ENABLED", default=False)
+    path: pathlib.Path = Field(
+        alias="PASSAGE_STORE_PATH",
+        default=pathlib.Path().home() / ".cache" / "websearch-agent" / "passages.db",
+    )
+    top_k: int = Field(alias="PASSAGE_STORE_TOP_K", default=8)
+    min_score: float = Field(alias="PASSAGE_STORE_MIN_SCORE", default=0.6)
+    min_hits: int = Field(alias="PASSAGE_STORE_MIN_HITS", default=3)
+    max_age: int = Field(alias="PASSAGE_STORE_MAX_AGE", default=60 * 60 * 24 * 7)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+passage_store_settings = PassageStoreSettings()
+
+
+class PassageStore:
+    """Milvus Lite backed store of embedded page passages.
+
+    The database and the embedding model are opened lazily on first use. All
+    methods are blocking and should be run in a thread from async code.
+
+    Args:
+        path: Path of the Milvus Lite database file.
+        embedding_fn: A `pymilvus.model` embedding function. Defaults to the
+            `DefaultEmbeddingFunction`.
+        collection: Name of the collection holding the passages.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        embedding_fn=None,
+        collection: str = "passages",
+    ):
+        """Initialize the store without opening it.
+
+        Args:
+            path: Path of the Milvus Lite database file.
+            embedding_fn: A `pymilvus.model` embedding function.
+            collection: Name of the collection holding the passages.
+        """
+        self.path = path
+        self.collection = collection
+        self._embedding_fn = embedding_fn
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def embedding_fn(self):
+        """The embedding function, loaded on first use."""
+        if self._embedding_fn is None:
+            from pymilvus import model
+
+            self._embedding_fn = model.DefaultEmbeddingFunction()
+        return self._embedding_fn
+
+    @property
+    def client(self):
+        """The Milvus Lite client, opened on first use."""
+        with self._lock:
+            if self._client is None:
+                from pymilvus import MilvusClient
+
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                client = MilvusClient(str(self.path))
+                if not client.has_collection(self.collection):
+                    client.create_collection(
+                        self.collection,
+                        dimension=self.embedding_fn.dim,
+                        metric_type="COSINE",
+                        auto_id=True,
+                    )
+                self._client = client
+        return self._client
+
+    def add(self, url: str, text: str, *, fetched_at: float | None = None) -> int:
+        """Index the passages of a page, replacing any previous version.
+
+        Args:
+            url: The url of the page.
+            text: The extracted text of the page.
+            fetched_at: The fetch time as a UNIX timestamp. Defaults to now.
+
+        Returns:
+            int: The number of indexed passages.
+        """
+        passages = split_passages(text)
+        if not passages:
+            return 0
+
+        fetched_at = int(fetched_at or time.time())
+        vectors = self.embedding_fn.encode_documents(passages)
+
+        self.client.delete(self.collection, filter=f"url == {_quote(url)}")
+        self.client.insert(
+            self.collection,
+            [
+                {
+                    "vector": list(vector),
+                    "url": url,
+                    "text": passage,
+                    "fetched_at": fetched_at,
+                }
+                for passage, vector in zip(passages, vectors)
+            ],
+        )
+        logger.info(f"📚 Indexed {len(passages)} passages of {url}")
+        return len(passages)
+
+    def search(
+        self, query: str, *, top_k: int | None = None, max_age: int | None = None
+    ) -> list[Passage]:
+        """Retrieve the passages most similar to a query.
+
+        Args:
+            query: The query text.
+            top_k: Number of passages to return. Defaults to the settings.
+            max_age: Ignore passages older than this many seconds.
+                Defaults to the settings.
+
+        Returns:
+            list[Passage]: The passages, scored by cosine similarity.
+        """
+        if top_k is None:
+            top_k = passage_store_settings.top_k
+        if max_age is None:
+            max_age = passage_store_settings.max_age
+        if not top_k:
+            return []
+
+        [vector] = self.embedding_fn.encode_queries([query])
+        [hits] = self.client.search(
+            self.collection,
+            data=[list(vector)],
+            limit=top_k,
+            filter=f"fetched_at >= {int(time.time()) - max_age}",
+            output_fields=["url", "text"],
+        )
+        return [
+            Passage(
+                url=hit["entity"]["url"],
+                category="cached",
+                text=hit["entity"]["text"],
+                score=hit["distance"],
+            )
+            for hit in hits
+        ]
+
+    def recall(self, query: str) -> list[Passage] | None:
+        """Retrieve passages for a query if the store covers it well enough.
+
+        Args:
+            query: The query text.
+
+        Returns:
+            list[Passage] | None: The relevant passages, or None on a miss.
+        """
+        hits = [
+            p for p in self.search(query) if p.score >= passage_store_settings.min_score
+        ]
+        if len(hits) < passage_store_settings.min_hits:
+            return None
+        return hits
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+passage_store = PassageStore(passage_store_settings.path)
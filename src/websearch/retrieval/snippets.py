@@ -0,0 +1,123 @@
+"""Deterministic ranking of search results.
+
+This module selects the most relevant results of a web search without an LLM:
+the title and snippets of every result are scored with BM25 against the
+queries, weighted by a configurable prior on the result's domain. Results
+without any matching term keep the order of the search engine.
+"""
+
+import html
+import re
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.retrieval.bm25 import BM25Index
+from websearch.urls import url_host
+
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+class SnippetSettings(BaseSettings):
+    """Configuration of the search result ranking.
+
+    Attributes:
+        domain_priors: Weight of the results of a domain and its subdomains.
+            Domains not listed weigh 1.
+    """
+
+    domain_priors: dict[str, float] = Field(
+        alias="SEARCH_DOMAIN_PRIORS",
+        default={
+            "wikipedia.org": 1.3,
+            "github.com": 1.1,
+            "stackoverflow.com": 1.1,
+            "reddit.com": 0.9,
+            "quora.com": 0.7,
+            "pinterest.com": 0.5,
+        },
+    )
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+snippet_settings = SnippetSettings()
+
+
+def domain_prior(url: str, priors: dict[str, float] | None = None) -> float:
+    """Get the prior weight of a URL's domain.
+
+    Args:
+        url: The URL of the result.
+        priors: Weight by domain. Defaults to the `SEARCH_DOMAIN_PRIORS` setting.
+
+    Returns:
+        float: The weight of the closest listed parent domain, 1 if none.
+    """
+    if priors is None:
+        priors = snippet_settings.domain_priors
+    labels = url_host(url).split(".")
+    for i in range(len(labels)):
+        prior = priors.get(".".join(labels[i:]))
+        if prior is not None:
+            return prior
+    return 1.0
+
+
+def clean_snippet(text: str) -> str:
+    """Remove the markup of a search snippet.
+
+    Args:
+        text: The snippet, with highlighting tags and HTML entities.
+
+    Returns:
+        str: The plain text.
+    """
+    return html.unescape(TAG_RE.sub("", text or "")).strip()
+
+
+def result_text(result: dict) -> str:
+    """Get the text of a search result: its title and snippets.
+
+    Args:
+        result: A web result of the search response.
+
+    Returns:
+        str: The plain text of the result.
+    """
+    parts = [result.get("title"), result.get("description")]
+    parts += result.get("extra_snippets") or []
+    return "\n".join(clean_snippet(p) for p in parts if p)
+
+
+def rank_results(
+    results: list[dict],
+    queries: list[str],
+    *,
+    limit: int,
+    priors: dict[str, float] | None = None,
+) -> list[dict]:
+    """Select the most relevant search results.
+
+    Args:
+        results: The web results of the search response, in engine order.
+        queries: The queries the results should answer.
+        limit: Maximum number of results to return.
+        priors: Weight by domain. Defaults to the `SEARCH_DOMAIN_PRIORS` setting.
+
+    Returns:
+        list[dict]: The best results, best first.
+    """
+    results = [r for r in results if r.get("url")]
+    if not results:
+        return []
+
+    index = BM25Index([result_text(r) for r in results])
+    scores = index.score_many(queries)
+    ranked = sorted(
+        range(len(results)),
+        key=lambda i: (-scores[i] * domain_prior(results[i]["url"], priors), i),
+    )
+    return [results[i] for i in ranked[:limit]]
@@ -0,0 +1,93 @@
+"""Run scoped context.
+
+This module holds the state shared by all the nodes, agents and tools of a
+single graph run, such as the page fetch coordinator and the run budget. The
+context is stored in a context variable set by `query.exec`, so it is visible
+from every task that LangGraph spawns for the run without being serialized in
+the graph state.
+"""
+
+import asyncio
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from websearch.budget import Budget
+from websearch.tools.fetchcoordinator import FetchCoordinator
+
+
+@dataclass
+class RunContext:
+    """State shared by the nodes of a graph run.
+
+    Attributes:
+        run_id: Identifier of the run.
+        fetcher: Coordinator deduplicating the page fetches of the run.
+        budget: Limits and usage of the run, unlimited by default.
+    """
+
+    run_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    fetcher: FetchCoordinator = field(default_factory=FetchCoordinator)
+    budget: Budget = field(default_factory=Budget)
+
+
+_current_run: ContextVar[RunContext | None] = ContextVar("run", default=None)
+
+
+def current_run() -> RunContext:
+    """Get the context of the current run.
+
+    Returns:
+        RunContext: The context set by `query.exec`, or a new context not
+            shared with anything if called outside of a run.
+    """
+    return _current_run.get() or RunContext()
+
+
+def set_run(run: RunContext):
+    """Set the context of the current run.
+
+    Args:
+        run: The run context.
+
+    Returns:
+        Token: The token to pass to `reset_run`.
+    """
+    return _current_run.set(run)
+
+
+def reset_run(token) -> None:
+    """Restore the run context that was current before `set_run`.
+
+    Args:
+        token: The token returned by `set_run`.
+    """
+    _current_run.reset(token)
+
+
+def deadline(*, synthesis: bool = False, share: float = 1.0) -> asyncio.Timeout:
+    """Bound the awaits of a step by the deadline of the current run.
+
+    Steps other than the synthesis stop `RUN_SYNTHESIS_RESERVE` seconds before
+    the deadline, so the answer can still be written from their evidence.
+
+    Example:
+        ```python
+        try:
+            async with deadline():
+                response = await agent.run(prompt)
+        except TimeoutError:
+            ...  # degrade
+        ```
+
+    Args:
+        synthesis: Whether the step writes the answer.
+        share: Fraction of the time left the step may take, for the steps
+            with a cheap fallback that must leave time to the next ones.
+
+    Returns:
+        asyncio.Timeout: The async context manager raising `TimeoutError` at the
+            deadline, never expiring if the run has none.
+    """
+    seconds = current_run().budget.time_left(synthesis=synthesis)
+    return asyncio.timeout(None if seconds is None else seconds * share)
@@ -0,0 +1,358 @@
+"""HTTP server streaming web search runs.
+
+This module provides an ASGI application exposing `query.exec` over HTTP, so
+clients share one long-running process instead of each paying for the graph
+compilation, the agents, the browser launch and the cache opens:
+
+- `POST /query` streams the events of a run as Server-Sent Events, one event
+  per result, named after its first key (`thread_id`, `plan`, `query`,
+  `answer`, `usage`, ...). A run answers with the evidence found by its
+  deadline, and is cut with an `error` event if it overruns it.
+- `GET /health` answers as long as the process is alive.
+- `GET /ready` answers 200 once the models are warm and 503 before, so a load
+  balancer routes queries only to warmed instances.
+- `GET /metrics` returns the metrics of the process.
+- `GET /cache` returns the statistics of the disk cache, and
+  `POST /cache/purge` purges it by `namespace`, `domain` and `older_than`,
+  an age like '7d'.
+
+Identical concurrent questions share one run through the `coalescer`. With
+`SERVER_WORKERS` set, runs are dispatched to a pool of worker processes. Runs
+over `SERVER_MAX_CONCURRENT` are refused with 429 rather than queued, so a
+saturated instance sheds load instead of missing every deadline.
+
+The server requires the `server` extra: pip install websearch[server]
+
+Usage:
+    websearch-server
+"""
+
+import asyncio
+import contextlib
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_settings import BaseSettings
+
+try:
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+except ImportError as e:
+    raise ImportError(
+        "The server requires the 'server' extra: pip install websearch[server]"
+    ) from e
+
+from websearch import cacheadmin
+from websearch.budget import Budget
+from websearch.coalesce import coalescer
+from websearch.metrics import metrics
+from websearch.root_logger import root_logger
+from websearch.tools.browserpool import browser_pool
+from websearch.warmup import Warmer, warmer
+from websearch.workers import WorkerPool
+
+logger = root_logger.getChild(__name__)
+
+Executor = Callable[..., AsyncIterator[dict[str, Any]]]
+
+
+class ServerSettings(BaseSettings):
+    """Configuration of the server.
+
+    Attributes:
+        host: The interface to listen on.
+        port: The port to listen on.
+        max_concurrent: Maximum number of runs in flight, more are refused.
+        deadline: Default number of seconds a run may take.
+        max_deadline: Maximum deadline a request may ask for.
+        deadline_grace: Seconds a run may overrun its deadline, to send the
+            partial answer, before it is cut.
+        retry_after: Seconds a refused client is told to wait.
+        workers: Number of worker processes running the queries, 0 to run
+            them in the server process.
+    """
+
+    host: str = Field(alias="SERVER_HOST", default="127.0.0.1")
+    port: int = Field(alias="SERVER_PORT", default=8000)
+    max_concurrent: int = Field(alias="SERVER_MAX_CONCURRENT", default=8)
+    deadline: float = Field(alias="SERVER_DEADLINE", default=120.0)
+    max_deadline: float = Field(alias="SERVER_MAX_DEADLINE", default=600.0)
+    deadline_grace: float = Field(alias="SERVER_DEADLINE_GRACE", default=5.0)
+    retry_after: int = Field(alias="SERVER_RETRY_AFTER", default=5)
+    workers: int = Field(alias="SERVER_WORKERS", default=0)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+server_settings = ServerSettings()
+
+
+class QueryRequest(BaseModel):
+    """Body of a query request.
+
+    Attributes:
+        question: The question to answer.
+        result_limit: Maximum number of results per query.
+        fetch_pages: Whether to fetch the full pages.
+        deep_research: Whether to run follow-up research rounds.
+        explorer: The explorer implementation.
+        thread_id: The id of a run to resume.
+        checkpoint: Whether to checkpoint the run.
+        deadline: Seconds the run may take, capped by the server.
+    """
+
+    question: str = Field(min_length=1)
+    result_limit: int | None = Field(default=None, gt=0)
+    fetch_pages: bool = False
+    deep_research: bool = False
+    explorer: Literal["agent", "search"] | None = None
+    thread_id: str | None = None
+    checkpoint: bool = True
+    deadline: float | None = Field(default=None, gt=0)
+    model_config = {"extra": "forbid"}
+
+
+class Admission:
+    """Count the runs in flight and refuse those over the capacity.
+
+    Args:
+        capacity: Maximum number of runs in flight.
+    """
+
+    def __init__(self, capacity: int):
+        """Initialize the admission control.
+
+        Args:
+            capacity: Maximum number of runs in flight.
+        """
+        self.capacity = capacity
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        """Admit a run if there is capacity left.
+
+        Returns:
+            bool: Whether the run is admitted.
+        """
+        if self.in_flight >= self.capacity:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        """Record the end of an admitted run."""
+        self.in_flight -= 1
+
+
+class AdmittedResponse(StreamingResponse):
+    """A streaming response releasing its admission slot once sent.
+
+    The slot is released even if the body is never iterated, e.g. when the
+    client disconnects before the start of the response.
+
+    Args:
+        content: The events of the run.
+        admission: The admission control that admitted the run.
+        **kwargs: The arguments of `StreamingResponse`.
+    """
+
+    def __init__(self, content, admission: Admission, **kwargs):
+        """Initialize the response.
+
+        Args:
+            content: The events of the run.
+            admission: The admission control that admitted the run.
+            **kwargs: The arguments of `StreamingResponse`.
+        """
+        super().__init__(content, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send) -> None:
+        """Send the response, then release the admission slot."""
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.admission.release()
+
+
+def sse(event: str, data: Any) -> str:
+    """Format a Server-Sent Event.
+
+    Args:
+        event: The name of the event.
+        data: The payload, serialized as JSON.
+
+    Returns:
+        str: The event, terminated by a blank line.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def create_app(
+    *,
+    executor: Executor | None = None,
+    settings: ServerSettings = server_settings,
+    model_warmer: Warmer = warmer,
+) -> Starlette:
+    """Create the server application.
+
+    Args:
+        executor: The function running a query and yielding its events.
+            Defaults to a `WorkerPool` with `SERVER_WORKERS` workers, else to
+            `query.exec` behind the process `coalescer`.
+        settings: The server configuration.
+        model_warmer: The warmer reporting whether the models are ready.
+
+    Returns:
+        Starlette: The ASGI application.
+    """
+    admission = Admission(settings.max_concurrent)
+    pool = (
+        WorkerPool(settings.workers) if executor is None and settings.workers else None
+    )
+    if executor is None:
+        executor = pool.exec if pool else coalescer.exec
+
+    async def stream(body: QueryRequest, deadline: float) -> AsyncIterator[str]:
+        start = time.monotonic()
+        budget = Budget.from_settings() if body.deep_research else Budget()
+        budget.max_seconds = min(budget.max_seconds or deadline, deadline)
+        events = executor(
+            body.question,
+            result_limit=body.result_limit,
+            fetch_pages=body.fetch_pages,
+            checkpoint=body.checkpoint,
+            thread_id=body.thread_id,
+            deep_research=body.deep_research,
+            budget=budget,
+            explorer=body.explorer,
+        )
+        try:
+            async with (
+                asyncio.timeout(deadline + settings.deadline_grace),
+                contextlib.aclosing(events),
+            ):
+                async for event in events:
+                    yield sse(next(iter(event), "message"), event)
+        except TimeoutError:
+            logger.warning(f"⏰ Run cut at its {deadline}s deadline")
+            metrics.incr("server.deadline_exceeded")
+            yield sse("error", {"error": f"Deadline of {deadline}s exceeded"})
+        except Exception as e:
+            logger.error(f"Run failed: {e}")
+            metrics.incr("server.errors")
+            yield sse("error", {"error": str(e)})
+        finally:
+            metrics.observe("server.run_seconds", time.monotonic() - start)
+
+    async def run_query(request: Request):
+        try:
+            body = QueryRequest.model_validate(await request.json())
+        except (ValueError, ValidationError) as e:
+            errors = e.errors() if isinstance(e, ValidationError) else str(e)
+            return JSONResponse({"error": errors}, status_code=400)
+
+        if not admission.try_acquire():
+            metrics.incr("server.rejected")
+            return JSONResponse(
+                {"error": "Too many runs in flight"},
+                status_code=429,
+                headers={"Retry-After": str(settings.retry_after)},
+            )
+
+        metrics.incr("server.admitted")
+        model_warmer.touch()
+        deadline = min(body.deadline or settings.deadline, settings.max_deadline)
+        return AdmittedResponse(
+            stream(body, deadline),
+            admission,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def health(request: Request):
+        return JSONResponse({"status": "ok"})
+
+    async def ready(request: Request):
+        status = {
+            **model_warmer.status(),
+            "in_flight": admission.in_flight,
+            "capacity": admission.capacity,
+        }
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    async def get_metrics(request: Request):
+        return JSONResponse(metrics.snapshot())
+
+    async def cache_stats(request: Request):
+        return JSONResponse(await asyncio.to_thread(cacheadmin.stats))
+
+    async def cache_purge(request: Request):
+        try:
+            criteria = await request.json()
+            older_than = criteria.get("older_than")
+            removed = await asyncio.to_thread(
+                cacheadmin.purge,
+                namespace=criteria.get("namespace"),
+                domain=criteria.get("domain"),
+                older_than=None
+                if older_than is None
+                else cacheadmin.parse_age(older_than),
+            )
+        except (ValueError, AttributeError) as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse({"removed": removed})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        # The dispatcher warms the models in pool mode too: it reports the
+        # readiness, and the workers share the models of the Ollama server.
+        model_warmer.start()
+        if pool:
+            await pool.start()
+        else:
+            await browser_pool.start()
+        try:
+            yield
+        finally:
+            await model_warmer.stop()
+            if pool:
+                await pool.close()
+            else:
+                await browser_pool.close()
+
+    app = Starlette(
+        routes=[
+            Route("/query", run_query, methods=["POST"]),
+            Route("/health", health),
+            Route("/ready", ready),
+            Route("/metrics", get_metrics),
+            Route("/cache", cache_stats),
+            Route("/cache/purge", cache_purge, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.admission = admission
+    return app
+
+
+def main() -> None:
+    """Run the server with uvicorn."""
+    import uvicorn
+
+    uvicorn.run(
+        create_app(),
+        host=server_settings.host,
+        port=server_settings.port,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    main()
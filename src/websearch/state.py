@@ -9,7 +9,31 @@ to process a user query, find relevant information, and generate an answer.
 """
 
 import operator
-from typing import Annotated, TypedDict
+from typing import Annotated, Literal, TypedDict
+
+from websearch.records import PageRecord
+from websearch.urls import normalize_url
+
+
+def merge_pages(left: list[PageRecord], right: list[PageRecord]) -> list[PageRecord]:
+    """Merge two lists of pages, dropping pages already present.
+
+    Pages are identified by their normalized url. When a page is present in
+    both lists the first one is kept, completed with the fields it lacks.
+
+    Args:
+        left: The current pages.
+        right: The new pages.
+
+    Returns:
+        list[PageRecord]: The merged pages, in order of first appearance.
+    """
+    merged = {}
+    for page in [*(left or []), *(right or [])]:
+        key = normalize_url(page.url)
+        existing = merged.get(key)
+        merged[key] = existing.merge(page) if existing else page
+    return list(merged.values())
 
 
 class GraphState(TypedDict):
@@ -21,21 +45,36 @@ class GraphState(TypedDict):
 
     Attributes:
         result_limit: How many links to generate.
+        num_queries: How many search queries to generate.
+        fetch_pages: Whether the explorers fetch the full text of the pages.
+        explorer_mode: The explorer implementation: 'agent' or 'search'.
+        max_rounds: Number of search and synthesis rounds allowed, 1 unless
+            the run is in deep research mode.
+        round: The current search and synthesis round, starting at 1.
         user_query: The original query from the user.
         error: Error message if any occurred during processing.
         queries: List of search queries generated from the user query.
-        pages: List of retrieved web pages and their content.
+        pages: Records of the retrieved web pages. Their content is held by
+            handle in the content store, not inline.
         sources: List of source URLs used to generate the answer.
         answer: The final generated answer to the user's query.
+        path: The path of the graph that answered: 'direct', 'fast_path',
+            'recall' or 'explorer'.
     """
 
     result_limit: int  # How many links to generate
+    num_queries: int
+    fetch_pages: bool
+    explorer_mode: Literal["agent", "search"]
+    max_rounds: int
+    round: int
     user_query: str
     error: Annotated[str | None, lambda x, y: f"{x}\n{y}"]
     queries: Annotated[list[str], operator.add]
-    pages: Annotated[list[dict], operator.add]
+    pages: Annotated[list[PageRecord], merge_pages]
     sources: list[str]
     answer: str
+    path: str
 
 
 # Flow Example
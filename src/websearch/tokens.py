@@ -0,0 +1,33 @@
+"""Token estimation helpers.
+
+This module provides a cheap, dependency free approximation of the number of
+LLM tokens in a piece of text. It is used to enforce token budgets on extracted
+page text and prompts without loading a model specific tokenizer.
+"""
+
+CHARS_PER_TOKEN = 4
+"""Average number of characters per token for English text."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text.
+
+    Args:
+        text: The text to measure.
+
+    Returns:
+        int: The approximate number of tokens.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tokens_to_chars(tokens: int) -> int:
+    """Convert a token budget to an approximate character budget.
+
+    Args:
+        tokens: The number of tokens.
+
+    Returns:
+        int: The approximate number of characters.
+    """
+    return tokens * CHARS_PER_TOKEN
@@ -117,11 +117,43 @@ class Faq(BaseModel):
     results: list[QA]
 
 
+class InfoboxResult(BaseModel):
+    """Represents an entity infobox from Brave Search.
+
+    Attributes:
+        title: Name of the entity.
+        url: URL of the source of the infobox.
+        description: Short description of the entity.
+        long_desc: Longer description of the entity.
+        attributes: Facts about the entity as [name, value] pairs.
+    """
+
+    title: str | None = None
+    url: str | None = None
+    description: str | None = None
+    long_desc: str | None = None
+    attributes: list[list[str | None]] | None = None
+
+    model_config = {"extra": "ignore"}
+
+
+class Infobox(BaseModel):
+    """Container for infobox results from Brave Search.
+
+    Attributes:
+        results: List of infoboxes.
+    """
+
+    results: list[InfoboxResult]
+
+
 class BraveSearchResponse(BaseModel):
     """Represents the complete response from a Brave Search API call.
 
     Attributes:
         discussion: Optional discussion results.
+        faq: Optional FAQ results.
+        infobox: Optional entity infobox.
         locations: Optional location results.
         news: Optional news results.
         videos: Optional video results.
@@ -129,6 +161,8 @@ class BraveSearchResponse(BaseModel):
     """
 
     discussion: Discussion | None = None
+    faq: Faq | None = None
+    infobox: Infobox | None = None
     locations: Locations | None = None
     news: dict | None = None
     videos: dict | None = None
@@ -161,7 +195,7 @@ class BraveSearchClient:
         self.base_url = "https://api.search.brave.com/res/v1/web/search"
         self.api_key = os.getenv("BRAVE_SEARCH_API_KEY")
 
-    @iocache.cache.memoize(expire=60 * 60 * 24)
+    @iocache.cache.memoize(expire=60 * 60 * 24, tag="search")
     def search(self, query: str, count: int = 10) -> Result:
         """Perform a web search using the Brave Search API.
 
@@ -0,0 +1,256 @@
+"""Shared browser for the page fetches.
+
+Launching Chromium takes longer than loading most pages, so a long-running
+process should launch it once and open a fresh, isolated browser context for
+every page instead. This module provides a pool that keeps one browser per
+event loop, launched on first use and relaunched if it crashes or disconnects.
+
+The pool is inactive until started: one-off library calls keep launching a
+browser per page, and the server starts the pool for its lifetime. Worker
+processes share a single browser, the `BrowserService`, by connecting their
+pools to it over the DevTools protocol.
+
+The cookies and local storage of a site, e.g. its consent choice, are saved in
+the disk cache after a page of the site is loaded, and restored in the contexts
+opened for its next pages, so they do not start from a blank browser.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch import iocache
+from websearch.metrics import metrics
+from websearch.root_logger import root_logger
+from websearch.urls import url_host
+
+logger = root_logger.getChild(__name__)
+
+
+class BrowserSettings(BaseSettings):
+    """Configuration of the browser.
+
+    Attributes:
+        headless: Whether to run the browser without a window.
+        cdp_endpoint: DevTools endpoint of a running browser to share instead of
+            launching one, e.g. 'http://127.0.0.1:9222'.
+        service_port: DevTools port of the browser launched by the service.
+        storage_ttl: Seconds the storage state of a site is kept, 0 to open
+            every page with an empty storage.
+    """
+
+    headless: bool = Field(alias="BROWSER_HEADLESS", default=False)
+    cdp_endpoint: str | None = Field(alias="BROWSER_CDP_ENDPOINT", default=None)
+    service_port: int = Field(alias="BROWSER_SERVICE_PORT", default=9222)
+    storage_ttl: float = Field(alias="BROWSER_STORAGE_TTL", default=60 * 60 * 24 * 7)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+browser_settings = BrowserSettings()
+
+
+def _storage_key(url: str) -> tuple[str, str]:
+    parts = urlsplit(url)
+    return ("storage", f"{parts.scheme}://{url_host(url)}")
+
+
+def _matches_host(domain: str, host: str) -> bool:
+    domain = domain.lower().lstrip(".")
+    return host == domain or host.endswith(f".{domain}")
+
+
+def load_storage_state(
+    url: str, settings: BrowserSettings = browser_settings
+) -> dict | None:
+    """Get the storage state saved for the site of a URL.
+
+    Args:
+        url: The url of the page to open.
+        settings: The browser configuration.
+
+    Returns:
+        dict | None: The Playwright storage state, None if none is saved.
+    """
+    if not settings.storage_ttl:
+        return None
+    state = iocache.cache.get(_storage_key(url))
+    metrics.incr("browserpool.storage_hits" if state else "browserpool.storage_misses")
+    return state
+
+
+def save_storage_state(
+    url: str, state: dict, settings: BrowserSettings = browser_settings
+) -> None:
+    """Save the storage state of the site of a URL.
+
+    Only the cookies of the site and the local storage of its origin are kept,
+    not those of the third parties loaded by the page.
+
+    Args:
+        url: The url of the loaded page.
+        state: The storage state of the context of the page.
+        settings: The browser configuration.
+    """
+    if not settings.storage_ttl:
+        return
+    host = url_host(url)
+    origin = _storage_key(url)[1]
+    state = {
+        "cookies": [
+            c for c in state.get("cookies") or [] if _matches_host(c["domain"], host)
+        ],
+        "origins": [o for o in state.get("origins") or [] if o["origin"] == origin],
+    }
+    if state["cookies"] or state["origins"]:
+        iocache.cache.set(
+            _storage_key(url), state, expire=settings.storage_ttl, tag="storage"
+        )
+
+
+class BrowserPool:
+    """Keep a browser running and open isolated pages on it.
+
+    Args:
+        settings: The browser configuration.
+    """
+
+    def __init__(self, settings: BrowserSettings = browser_settings):
+        """Initialize the pool.
+
+        Args:
+            settings: The browser configuration.
+        """
+        self.settings = settings
+        self.active = False
+        self._loop = None
+        self._lock: asyncio.Lock | None = None
+        self._playwright = None
+        self._browser = None
+
+    async def start(self) -> None:
+        """Share one browser between the page fetches from now on."""
+        self.active = True
+
+    def _bind(self) -> None:
+        # A browser belongs to the event loop that launched it: forget it when
+        # the pool is used from a new loop.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._playwright = None
+            self._browser = None
+
+    async def _get_browser(self):
+        self._bind()
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                if self.settings.cdp_endpoint:
+                    logger.info(f"🌐 Connecting to {self.settings.cdp_endpoint}")
+                    self._browser = await self._playwright.chromium.connect_over_cdp(
+                        self.settings.cdp_endpoint
+                    )
+                else:
+                    logger.info("🌐 Launching the shared browser")
+                    self._browser = await self._playwright.chromium.launch(
+                        headless=self.settings.headless
+                    )
+                metrics.incr("browserpool.launches")
+        return self._browser
+
+    @asynccontextmanager
+    async def page(self, storage_state: dict | None = None):
+        """Open a page in a new browser context, closed on exit.
+
+        Args:
+            storage_state: Cookies and local storage to start the context with,
+                as returned by `load_storage_state`.
+
+        Yields:
+            Page: The Playwright page.
+        """
+        if not self.active:
+            async with async_playwright() as pw:
+                browser = await pw.chromium.launch(headless=self.settings.headless)
+                try:
+                    yield await browser.new_page(storage_state=storage_state)
+                finally:
+                    await browser.close()
+            return
+
+        browser = await self._get_browser()
+        context = await browser.new_context(storage_state=storage_state)
+        metrics.incr("browserpool.pages")
+        try:
+            yield await context.new_page()
+        finally:
+            await context.close()
+
+    async def close(self) -> None:
+        """Close the shared browser and go back to a browser per page."""
+        self.active = False
+        browser, playwright = self._browser, self._playwright
+        self._browser = self._playwright = None
+        if browser is not None:
+            await browser.close()
+        if playwright is not None:
+            await playwright.stop()
+
+
+browser_pool = BrowserPool()
+"""The browser pool of the process."""
+
+
+class BrowserService:
+    """A browser other processes connect to over the DevTools protocol.
+
+    Args:
+        settings: The browser configuration.
+    """
+
+    def __init__(self, settings: BrowserSettings = browser_settings):
+        """Initialize the service.
+
+        Args:
+            settings: The browser configuration.
+        """
+        self.settings = settings
+        self._playwright = None
+        self._browser = None
+
+    @property
+    def endpoint(self) -> str:
+        """The DevTools endpoint of the browser."""
+        return f"http://127.0.0.1:{self.settings.service_port}"
+
+    async def start(self) -> str:
+        """Launch the browser.
+
+        Returns:
+            str: The DevTools endpoint to connect to.
+        """
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=self.settings.headless,
+            args=[f"--remote-debugging-port={self.settings.service_port}"],
+        )
+        logger.info(f"🌐 Browser service listening on {self.endpoint}")
+        return self.endpoint
+
+    async def close(self) -> None:
+        """Close the browser."""
+        browser, playwright = self._browser, self._playwright
+        self._browser = self._playwright = None
+        if browser is not None:
+            await browser.close()
+        if playwright is not None:
+            await playwright.stop()
@@ -0,0 +1,157 @@
+"""Dismissal of cookie consent walls.
+
+Many sites cover their content with the dialog of a consent management
+platform until the visitor makes a choice, and some only render the content
+after it. This module finds the dialogs of the common platforms in a page and
+its frames, and clicks the button of the configured choice, or of the other
+choice when the platform has none.
+
+The choice is saved in the cookies and local storage of the site, which the
+browser pool keeps per domain, so a site is usually only dismissed once.
+"""
+
+import asyncio
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.metrics import metrics
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+
+class ConsentSettings(BaseSettings):
+    """Configuration of the consent dismissal.
+
+    Attributes:
+        enabled: Whether to dismiss the consent dialogs.
+        choice: The button to click first: 'reject' or 'accept'.
+        click_timeout: Milliseconds to wait for a button to be clickable.
+        settle_ms: Milliseconds to wait after a dismissal for the dialog to go
+            away and the content to render.
+    """
+
+    enabled: bool = Field(alias="CONSENT_DISMISS", default=True)
+    choice: Literal["reject", "accept"] = Field(
+        alias="CONSENT_CHOICE", default="reject"
+    )
+    click_timeout: int = Field(alias="CONSENT_CLICK_TIMEOUT", default=2000)
+    settle_ms: int = Field(alias="CONSENT_SETTLE_MS", default=500)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+consent_settings = ConsentSettings()
+
+FRAMEWORKS: dict[str, dict[str, str]] = {
+    "onetrust": {
+        "reject": "#onetrust-reject-all-handler",
+        "accept": "#onetrust-accept-btn-handler",
+    },
+    "cookiebot": {
+        "reject": "#CybotCookiebotDialogBodyButtonDecline",
+        "accept": "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
+    },
+    "didomi": {
+        "reject": "#didomi-notice-disagree-button",
+        "accept": "#didomi-notice-agree-button",
+    },
+    "quantcast": {
+        "reject": ".qc-cmp2-summary-buttons button[mode='secondary']",
+        "accept": ".qc-cmp2-summary-buttons button[mode='primary']",
+    },
+    "usercentrics": {
+        "reject": "[data-testid='uc-deny-all-button']",
+        "accept": "[data-testid='uc-accept-all-button']",
+    },
+    "sourcepoint": {
+        "reject": "button.sp_choice_type_13",
+        "accept": "button.sp_choice_type_11",
+    },
+    "trustarc": {
+        "reject": "#truste-consent-required",
+        "accept": "#truste-consent-button",
+    },
+    "osano": {
+        "reject": ".osano-cm-denyAll, .osano-cm-deny",
+        "accept": ".osano-cm-accept-all, .osano-cm-accept",
+    },
+    "cookieyes": {
+        "reject": ".cky-btn-reject",
+        "accept": ".cky-btn-accept",
+    },
+    "complianz": {
+        "reject": ".cmplz-btn.cmplz-deny",
+        "accept": ".cmplz-btn.cmplz-accept",
+    },
+}
+"""Selectors of the buttons of the consent management platforms, by choice."""
+
+_ANY_BUTTON = ", ".join(
+    selector for buttons in FRAMEWORKS.values() for selector in buttons.values()
+)
+
+
+async def _count(frame, selector: str) -> int:
+    try:
+        return await frame.locator(selector).count()
+    except Exception:
+        # Frames can be detached while the page loads.
+        return 0
+
+
+async def _visible(frame, selector: str) -> bool:
+    try:
+        return await frame.locator(selector).first.is_visible()
+    except Exception:
+        return False
+
+
+async def dismiss_consent(
+    page, settings: ConsentSettings = consent_settings
+) -> str | None:
+    """Dismiss the consent dialog of a page, if it has a known one.
+
+    Args:
+        page: The Playwright page, loaded.
+        settings: The consent configuration.
+
+    Returns:
+        str | None: The platform of the dismissed dialog, None if no dialog
+            was found or it could not be dismissed.
+    """
+    if not settings.enabled:
+        return None
+    choices = [settings.choice, "accept" if settings.choice == "reject" else "reject"]
+
+    found = False
+    for frame in page.frames:
+        # One query per frame: most frames have no dialog at all.
+        if not await _count(frame, _ANY_BUTTON):
+            continue
+        found = True
+        for framework, buttons in FRAMEWORKS.items():
+            for choice in choices:
+                if not await _visible(frame, buttons[choice]):
+                    continue
+                try:
+                    await frame.locator(buttons[choice]).first.click(
+                        timeout=settings.click_timeout
+                    )
+                except Exception as e:
+                    logger.debug(f"Consent button of {framework} not clickable: {e}")
+                    continue
+                logger.info(f"🍪 Dismissed the {framework} consent dialog ({choice})")
+                metrics.incr("consent.dismissed")
+                metrics.incr(f"consent.dismissed.{framework}")
+                await asyncio.sleep(settings.settle_ms / 1000)
+                return framework
+
+    if found:
+        logger.warning(f"🍪 Consent dialog not dismissed on {page.url}")
+    metrics.incr("consent.failed" if found else "consent.none")
+    return None
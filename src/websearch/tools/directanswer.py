@@ -0,0 +1,142 @@
+"""Structured answers from the search results.
+
+Brave Search returns, next to the web results, structured answers for many
+questions: FAQ question and answer pairs and entity infoboxes. This module
+extracts the ones that confidently match a query, so the explorer can hand
+them to the syntetizer without running its tool-calling LLM loop or fetching
+any page.
+"""
+
+from dataclasses import dataclass
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.retrieval.bm25 import tokenize
+from websearch.root_logger import root_logger
+from websearch.tools.websearch import search
+
+logger = root_logger.getChild(__name__)
+
+STRUCTURED_CATEGORIES = {"faq", "infobox"}
+"""Page categories of the structured answers."""
+
+
+class FastPathSettings(BaseSettings):
+    """Configuration of the direct answer fast path.
+
+    Attributes:
+        enabled: Whether the explorers look for structured answers first.
+        min_overlap: Share of the query terms a FAQ question must contain, or
+            of the infobox title terms the query must contain, to be used.
+        direct: Whether to return the structured answers as the answer,
+            skipping the syntetizer LLM, when they are the only evidence.
+    """
+
+    enabled: bool = Field(alias="FAST_PATH_ENABLED", default=True)
+    min_overlap: float = Field(alias="FAST_PATH_MIN_OVERLAP", default=0.6)
+    direct: bool = Field(alias="FAST_PATH_DIRECT", default=False)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+fast_path_settings = FastPathSettings()
+
+
+@dataclass
+class StructuredAnswer:
+    """A structured answer found in the search results.
+
+    Attributes:
+        kind: 'faq' or 'infobox'.
+        url: The url of the source of the answer.
+        text: The answer, with its question or entity name.
+        confidence: How well the answer matches the query, between 0 and 1.
+    """
+
+    kind: Literal["faq", "infobox"]
+    url: str
+    text: str
+    confidence: float
+
+
+def _overlap(terms: set[str], other: set[str]) -> float:
+    return len(terms & other) / len(terms) if terms else 0.0
+
+
+def structured_answers(
+    data: dict, query: str, *, min_overlap: float | None = None
+) -> list[StructuredAnswer]:
+    """Extract the structured answers matching a query from a search response.
+
+    Args:
+        data: The search response, as returned by `BraveSearchClient.search`.
+        query: The search query.
+        min_overlap: Minimum confidence of the answers. Defaults to the
+            `FAST_PATH_MIN_OVERLAP` setting.
+
+    Returns:
+        list[StructuredAnswer]: The answers, most confident first.
+    """
+    if min_overlap is None:
+        min_overlap = fast_path_settings.min_overlap
+    query_terms = set(tokenize(query))
+    answers = []
+
+    for qa in (data.get("faq") or {}).get("results") or []:
+        confidence = _overlap(query_terms, set(tokenize(qa["question"])))
+        if confidence >= min_overlap:
+            answers.append(
+                StructuredAnswer(
+                    kind="faq",
+                    url=qa["url"],
+                    text=f"Q: {qa['question']}\nA: {qa['answer']}",
+                    confidence=confidence,
+                )
+            )
+
+    for box in (data.get("infobox") or {}).get("results") or []:
+        if not box.get("title") or not box.get("url"):
+            continue
+        confidence = _overlap(set(tokenize(box["title"])), query_terms)
+        if confidence < min_overlap:
+            continue
+        lines = [box["title"]]
+        lines += [d for d in (box.get("description"), box.get("long_desc")) if d]
+        lines += [
+            f"{attribute[0]}: {attribute[1]}"
+            for attribute in box.get("attributes") or []
+            if len(attribute) >= 2 and attribute[0] and attribute[1]
+        ]
+        answers.append(
+            StructuredAnswer(
+                kind="infobox",
+                url=box["url"],
+                text="\n".join(lines),
+                confidence=confidence,
+            )
+        )
+
+    return sorted(answers, key=lambda a: a.confidence, reverse=True)
+
+
+async def find_structured_answers(query: str) -> list[StructuredAnswer]:
+    """Search a query and keep its confident structured answers.
+
+    The search is made with the default arguments of the websearch tool, so an
+    explorer falling back to its LLM loop finds it in the search cache.
+
+    Args:
+        query: The search query.
+
+    Returns:
+        list[StructuredAnswer]: The answers, empty if there is none or the
+            search failed.
+    """
+    result = await search(query)
+    if not result or result["error"] or not result["data"]:
+        return []
+    return structured_answers(result["data"], query)
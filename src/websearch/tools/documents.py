@@ -0,0 +1,480 @@
+"""Fetch and extraction of non-HTML documents.
+
+Search results often link to PDFs, plain text and JSON resources, which the
+browser is slow to load, or downloads instead of rendering, and which have no
+HTML to extract text from. This module detects them from the URL path, or
+optionally a HEAD request, and fetches them with a plain HTTP client instead.
+Documents not detected up front are recognized by the browser from the type of
+its response:
+
+- PDFs are extracted page by page with `pypdf`, from the first pages on, until
+  the page, character or time budget is met. PDF support requires the 'pdf'
+  extra: pip install websearch[pdf]. Without it, PDFs are left to the browser.
+- Plain text, Markdown and CSV pass through.
+- JSON is flattened into one 'path: value' line per value.
+
+Each kind has its own budget of downloaded bytes and seconds. The type sent by
+the server is checked again on the response, and the body is sniffed, so a
+document served as HTML, e.g. a login page, goes back to the browser.
+"""
+
+import asyncio
+import functools
+import importlib.util
+import io
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Literal
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.metrics import metrics
+from websearch.root_logger import root_logger
+from websearch.tokens import tokens_to_chars
+from websearch.tools.fetchscheduler import scheduler_settings
+
+logger = root_logger.getChild(__name__)
+
+Kind = Literal["pdf", "text", "json"]
+"""The kinds of documents fetched without the browser."""
+
+
+class DocumentSettings(BaseSettings):
+    """Configuration of the document fetch.
+
+    Attributes:
+        enabled: Whether to fetch the non-HTML documents without the browser.
+        head_probe: Whether to send a HEAD request to learn the type of URLs
+            whose path does not tell it. Off by default: it delays nearly
+            every HTML page by a round trip.
+        probe_timeout: Seconds to wait for the HEAD request.
+        pdf_max_bytes: Maximum size of a PDF.
+        pdf_seconds: Time budget to download and extract a PDF.
+        pdf_max_pages: Number of pages extracted from the start of a PDF.
+        text_max_bytes: Maximum size downloaded of a text document.
+        text_seconds: Time budget to download a text document.
+        json_max_bytes: Maximum size of a JSON document.
+        json_seconds: Time budget to download and flatten a JSON document.
+    """
+
+    enabled: bool = Field(alias="DOCUMENT_FETCH", default=True)
+    head_probe: bool = Field(alias="DOCUMENT_HEAD_PROBE", default=False)
+    probe_timeout: float = Field(alias="DOCUMENT_PROBE_TIMEOUT", default=3.0)
+    pdf_max_bytes: int = Field(alias="PDF_MAX_BYTES", default=20 * 2**20)
+    pdf_seconds: float = Field(alias="PDF_SECONDS", default=30.0)
+    pdf_max_pages: int = Field(alias="PDF_MAX_PAGES", default=30)
+    text_max_bytes: int = Field(alias="TEXT_MAX_BYTES", default=2 * 2**20)
+    text_seconds: float = Field(alias="TEXT_SECONDS", default=15.0)
+    json_max_bytes: int = Field(alias="JSON_MAX_BYTES", default=2 * 2**20)
+    json_seconds: float = Field(alias="JSON_SECONDS", default=15.0)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+    def budget(self, kind: Kind) -> "HandlerBudget":
+        """Get the budget of a kind of document.
+
+        Args:
+            kind: The kind of document.
+
+        Returns:
+            HandlerBudget: Its maximum size and time.
+        """
+        return HandlerBudget(
+            max_bytes=getattr(self, f"{kind}_max_bytes"),
+            seconds=getattr(self, f"{kind}_seconds"),
+        )
+
+
+document_settings = DocumentSettings()
+
+
+@dataclass
+class HandlerBudget:
+    """Budget of the fetch and extraction of a document.
+
+    Attributes:
+        max_bytes: Maximum number of bytes downloaded.
+        seconds: Maximum wall-clock time.
+    """
+
+    max_bytes: int
+    seconds: float
+
+
+class NotADocument(Exception):
+    """The response is an HTML page, to load in the browser."""
+
+
+SUFFIXES: dict[str, Kind] = {
+    ".pdf": "pdf",
+    ".txt": "text",
+    ".md": "text",
+    ".csv": "text",
+    ".json": "json",
+}
+"""Kinds of documents by URL path suffix."""
+
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+"""Media types of the pages loaded in the browser."""
+
+
+@functools.cache
+def pdf_support() -> bool:
+    """Check if the PDF documents can be extracted, i.e. `pypdf` is installed.
+
+    Returns:
+        bool: Whether the 'pdf' extra is installed.
+    """
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def kind_from_path(url: str) -> Kind | None:
+    """Guess the kind of document from the suffix of a URL path.
+
+    Args:
+        url: The url.
+
+    Returns:
+        Kind | None: The kind, None for pages and unknown suffixes.
+    """
+    path = urlsplit(url).path.lower()
+    for suffix, kind in SUFFIXES.items():
+        if path.endswith(suffix):
+            return kind
+    return None
+
+
+def kind_from_content_type(content_type: str | None) -> Kind | None:
+    """Get the kind of document from a Content-Type header.
+
+    Args:
+        content_type: The header value, e.g. 'application/pdf'.
+
+    Returns:
+        Kind | None: The kind, None for HTML and unsupported types.
+    """
+    media_type = _media_type(content_type)
+    if media_type == "application/pdf":
+        return "pdf"
+    if media_type == "application/json" or media_type.endswith("+json"):
+        return "json"
+    if media_type in ("text/plain", "text/markdown", "text/csv"):
+        return "text"
+    return None
+
+
+def _media_type(content_type: str | None) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def sniff(body: bytes) -> Kind | Literal["html"] | None:
+    """Guess the kind of a document from its first bytes.
+
+    Args:
+        body: The start of the document.
+
+    Returns:
+        Kind | Literal['html'] | None: The kind, None if unknown.
+    """
+    head = body[:512].lstrip().lower()
+    if head.startswith(b"%pdf-"):
+        return "pdf"
+    if head.startswith((b"<!doctype html", b"<html")):
+        return "html"
+    if head.startswith((b"{", b"[")):
+        return "json"
+    return None
+
+
+def _client(timeout: float | None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=timeout,
+        headers={"User-Agent": scheduler_settings.user_agent},
+    )
+
+
+async def detect_kind(
+    url: str, settings: DocumentSettings = document_settings
+) -> Kind | None:
+    """Detect whether a URL is a document to fetch without the browser.
+
+    Args:
+        url: The url.
+        settings: The document configuration.
+
+    Returns:
+        Kind | None: The kind of document, None for pages, unknown types and
+            PDFs when the 'pdf' extra is not installed.
+    """
+    if not settings.enabled:
+        return None
+    kind = kind_from_path(url)
+    if not kind and settings.head_probe:
+        kind = await _probe(url, settings)
+    if kind == "pdf" and not pdf_support():
+        logger.debug(f"No PDF support, opening {url} in the browser")
+        return None
+    return kind
+
+
+async def _probe(url: str, settings: DocumentSettings) -> Kind | None:
+    try:
+        async with _client(settings.probe_timeout) as client:
+            response = await client.head(url)
+    except httpx.HTTPError as e:
+        logger.debug(f"HEAD {url} failed: {e}")
+        return None
+    if not response.is_success:
+        return None
+    return kind_from_content_type(response.headers.get("content-type"))
+
+
+async def _download(url: str, max_bytes: int) -> tuple[bytes, httpx.Response, bool]:
+    async with _client(None) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    return b"".join(chunks)[:max_bytes], response, True
+            return b"".join(chunks), response, False
+
+
+async def fetch_document(
+    url: str,
+    kind: Kind,
+    *,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    settings: DocumentSettings = document_settings,
+) -> dict | None:
+    """Fetch a document and extract its text, within the budget of its kind.
+
+    Args:
+        url: The url of the document.
+        kind: The kind detected by `detect_kind`.
+        max_chars: Character budget for the text.
+        max_tokens: Token budget for the text.
+        settings: The document configuration.
+
+    Returns:
+        dict | None: The 'url', 'text', 'truncated', 'content_type' and
+            'limits' of the document, as returned by `navigate_link`, None if
+            it failed.
+
+    Raises:
+        NotADocument: If the response is an HTML page, by its type or body.
+    """
+    budget = settings.budget(kind)
+    start = time.monotonic()
+    try:
+        async with asyncio.timeout(budget.seconds):
+            body, response, cut = await _download(url, budget.max_bytes)
+    except (httpx.HTTPError, TimeoutError) as e:
+        logger.error(f"Error fetching {url}: {e!r}")
+        metrics.incr(f"documents.{kind}.errors")
+        return None
+
+    content_type = response.headers.get("content-type")
+    sniffed = sniff(body)
+    if sniffed == "html" or _media_type(content_type) in HTML_TYPES:
+        raise NotADocument(url)
+    kind = kind_from_content_type(content_type) or sniffed or kind
+    logger.info(f"📄 Fetched {kind} document {url}: {len(body)} bytes")
+    return await extract_document(
+        url,
+        body,
+        kind,
+        encoding=response.encoding,
+        cut=cut,
+        max_chars=max_chars,
+        max_tokens=max_tokens,
+        deadline=start + budget.seconds,
+        settings=settings,
+    )
+
+
+async def extract_document(
+    url: str,
+    body: bytes,
+    kind: Kind,
+    *,
+    encoding: str | None = None,
+    cut: bool = False,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    deadline: float | None = None,
+    settings: DocumentSettings = document_settings,
+) -> dict | None:
+    """Extract the text of a downloaded document.
+
+    Args:
+        url: The url of the document.
+        body: The document.
+        kind: The kind of document.
+        encoding: The text encoding of the document. Defaults to UTF-8.
+        cut: Whether the body was cut at the byte budget.
+        max_chars: Character budget for the text.
+        max_tokens: Token budget for the text.
+        deadline: Monotonic time at which to stop extracting. Defaults to the
+            time budget of the kind from now.
+        settings: The document configuration.
+
+    Returns:
+        dict | None: The 'url', 'text', 'truncated', 'content_type' and
+            'limits' of the document, None if it could not be extracted.
+    """
+    budget = settings.budget(kind)
+    start = time.monotonic()
+    deadline = deadline or start + budget.seconds
+    metrics.incr(f"documents.{kind}")
+    metrics.incr(f"documents.{kind}.bytes", len(body))
+    if len(body) > budget.max_bytes:
+        body, cut = body[: budget.max_bytes], True
+    if cut and kind != "text":
+        # Truncated PDF and JSON documents cannot be parsed.
+        logger.warning(f"📄 {url} is over the {budget.max_bytes} bytes budget")
+        metrics.incr(f"documents.{kind}.too_large")
+        return None
+
+    max_chars = _char_budget(max_chars, max_tokens)
+    encoding = encoding or "utf-8"
+    try:
+        if kind == "pdf":
+            text, truncated = await asyncio.to_thread(
+                extract_pdf,
+                body,
+                max_pages=settings.pdf_max_pages,
+                max_chars=max_chars,
+                deadline=deadline,
+            )
+        elif kind == "json":
+            text, truncated = await asyncio.to_thread(
+                flatten_json,
+                body.decode(encoding),
+                max_chars=max_chars,
+                deadline=deadline,
+            )
+        else:
+            text, truncated = body.decode(encoding, "replace"), cut
+    except Exception as e:
+        logger.error(f"Error extracting the {kind} document {url}: {e}")
+        metrics.incr(f"documents.{kind}.errors")
+        return None
+
+    text = re.sub(r"[ \t]+", " ", text).strip()
+    if max_chars is not None and len(text) > max_chars:
+        text, truncated = text[:max_chars], True
+    metrics.observe(f"documents.{kind}.seconds", time.monotonic() - start)
+    return {
+        "url": url,
+        "text": text,
+        "truncated": truncated,
+        "content_type": kind,
+        "limits": ["bytes"] if cut else [],
+    }
+
+
+def _char_budget(max_chars: int | None, max_tokens: int | None) -> int | None:
+    budgets = [max_chars] if max_chars is not None else []
+    if max_tokens is not None:
+        budgets.append(tokens_to_chars(max_tokens))
+    return min(budgets, default=None)
+
+
+def extract_pdf(
+    data: bytes,
+    *,
+    max_pages: int,
+    max_chars: int | None = None,
+    deadline: float | None = None,
+) -> tuple[str, bool]:
+    """Extract the text of the first pages of a PDF.
+
+    Pages are extracted one at a time, and the extraction stops at the page or
+    character budget, or at the deadline, whichever comes first.
+
+    Args:
+        data: The PDF file.
+        max_pages: Maximum number of pages extracted.
+        max_chars: Character budget for the text.
+        deadline: Monotonic time at which to stop extracting.
+
+    Returns:
+        tuple[str, bool]: The text, and whether it was cut before the end of
+            the document.
+
+    Raises:
+        ImportError: If `pypdf` is not installed.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError(
+            "PDF documents require the 'pdf' extra: pip install websearch[pdf]"
+        ) from e
+
+    reader = PdfReader(io.BytesIO(data))
+    pages, size = [], 0
+    for number, page in enumerate(reader.pages):
+        if number >= max_pages or (deadline and time.monotonic() >= deadline):
+            return "\n\n".join(pages), True
+        text = page.extract_text() or ""
+        pages.append(text)
+        size += len(text)
+        if max_chars is not None and size >= max_chars:
+            return "\n\n".join(pages), number + 1 < len(reader.pages)
+    return "\n\n".join(pages), False
+
+
+def flatten_json(
+    text: str, *, max_chars: int | None = None, deadline: float | None = None
+) -> tuple[str, bool]:
+    """Flatten a JSON document into one 'path: value' line per value.
+
+    The flattening stops at the character budget or at the deadline, whichever
+    comes first.
+
+    Args:
+        text: The JSON document.
+        max_chars: Character budget for the text.
+        deadline: Monotonic time at which to stop flattening.
+
+    Returns:
+        tuple[str, bool]: The lines, and whether they were cut before the end
+            of the document.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+
+    def walk(value, path: str):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield from walk(item, f"{path}.{key}" if path else str(key))
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                yield from walk(item, f"{path}[{i}]")
+        elif value is not None and value != "":
+            yield f"{path or '$'}: {value}"
+
+    lines, size = [], 0
+    for line in walk(json.loads(text), ""):
+        if max_chars is not None and size >= max_chars:
+            return "\n".join(lines), True
+        if deadline and time.monotonic() >= deadline:
+            return "\n".join(lines), True
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines), False
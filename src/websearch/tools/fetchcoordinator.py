@@ -0,0 +1,80 @@
+"""Per-run page fetch coordination.
+
+The explorer branches of a graph run often select the same pages. This module
+provides a coordinator that makes sure every page is fetched only once per run:
+concurrent requests for the same normalized URL await a single in-flight fetch,
+and later requests reuse its result.
+"""
+
+import asyncio
+
+from websearch.root_logger import root_logger
+from websearch.tools.navigatelinks import navigate_link
+from websearch.urls import normalize_url
+
+logger = root_logger.getChild(__name__)
+
+
+class FetchCoordinator:
+    """Deduplicate page fetches by normalized URL.
+
+    Args:
+        fetch_fn: Coroutine function fetching a page. Defaults to `navigate_link`.
+    """
+
+    def __init__(self, fetch_fn=None):
+        """Initialize the coordinator.
+
+        Args:
+            fetch_fn: Coroutine function fetching a page.
+        """
+        self.fetch_fn = fetch_fn or navigate_link
+        self._fetches: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        """Return the number of distinct pages requested."""
+        return len(self._fetches)
+
+    def __contains__(self, url: str) -> bool:
+        """Return whether a page was already requested in the run."""
+        return normalize_url(url) in self._fetches
+
+    async def fetch(self, url: str) -> dict | None:
+        """Fetch a page, sharing the fetch with any other request for it.
+
+        Args:
+            url: The url of the page.
+
+        Returns:
+            dict | None: The page returned by the fetch function, or None if it
+                failed.
+        """
+        # Shield the shared fetch so that a cancelled branch does not cancel it
+        # for the other branches awaiting it.
+        return await asyncio.shield(self.submit(url))
+
+    def submit(self, url: str) -> asyncio.Future:
+        """Start fetching a page, unless it was already requested.
+
+        Unlike `fetch`, the page is registered before returning, so a check of
+        `url in coordinator` right after sees it.
+
+        Args:
+            url: The url of the page.
+
+        Returns:
+            asyncio.Future: The shared fetch of the page.
+        """
+        key = normalize_url(url)
+        future = self._fetches.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.fetch_fn(url))
+            self._fetches[key] = future
+        else:
+            logger.info(f"♻️ Reusing fetch of {url}")
+        return future
+
+    def cancel(self) -> None:
+        """Cancel the fetches still in flight."""
+        for future in self._fetches.values():
+            future.cancel()
@@ -0,0 +1,277 @@
+"""Per-host politeness scheduler for page fetches.
+
+This module provides the scheduler shared by every `navigate_link` call in the
+process. It caps the number of fetches in flight globally and per host, spaces
+the requests to the same host by a minimum interval (or the robots.txt
+crawl-delay when larger), and opens a circuit breaker on hosts whose recent
+fetches mostly failed, so they are skipped instead of timing out again.
+"""
+
+import asyncio
+import time
+import urllib.robotparser
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+import requests
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch import iocache
+from websearch.root_logger import root_logger
+from websearch.urls import url_host
+
+logger = root_logger.getChild(__name__)
+
+
+class SchedulerSettings(BaseSettings):
+    """Configuration of the fetch scheduler.
+
+    Attributes:
+        max_in_flight: Maximum number of fetches in flight in the process.
+        per_host: Maximum number of concurrent fetches to the same host.
+        min_interval: Minimum number of seconds between two requests to a host.
+        breaker_window: Number of recent fetches considered per host.
+        breaker_min_requests: Fetches needed before the breaker can open.
+        breaker_error_rate: Error rate at which the breaker opens.
+        breaker_cooldown: Seconds a host is skipped once its breaker opens.
+        respect_robots: Whether to honor the robots.txt crawl-delay.
+        robots_ttl: Seconds a robots.txt file is cached.
+        user_agent: User agent matched against the robots.txt rules.
+    """
+
+    max_in_flight: int = Field(alias="FETCH_MAX_IN_FLIGHT", default=8)
+    per_host: int = Field(alias="FETCH_PER_HOST_CONCURRENCY", default=2)
+    min_interval: float = Field(alias="FETCH_MIN_INTERVAL", default=1.0)
+    breaker_window: int = Field(alias="FETCH_BREAKER_WINDOW", default=20)
+    breaker_min_requests: int = Field(alias="FETCH_BREAKER_MIN_REQUESTS", default=4)
+    breaker_error_rate: float = Field(alias="FETCH_BREAKER_ERROR_RATE", default=0.5)
+    breaker_cooldown: float = Field(alias="FETCH_BREAKER_COOLDOWN", default=300.0)
+    respect_robots: bool = Field(alias="FETCH_RESPECT_ROBOTS", default=True)
+    robots_ttl: int = Field(alias="FETCH_ROBOTS_TTL", default=60 * 60 * 24)
+    user_agent: str = Field(alias="FETCH_USER_AGENT", default="websearch-agent")
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+scheduler_settings = SchedulerSettings()
+
+
+@iocache.cache.memoize(expire=scheduler_settings.robots_ttl, tag="robots")
+def fetch_robots(origin: str) -> str:
+    """Download the robots.txt of a site.
+
+    Args:
+        origin: The scheme and host of the site, e.g. "https://example.com".
+
+    Returns:
+        str: The content of the robots.txt, empty if it is missing.
+    """
+    try:
+        response = requests.get(f"{origin}/robots.txt", timeout=5)
+        return response.text if response.ok else ""
+    except requests.exceptions.RequestException:
+        return ""
+
+
+@dataclass
+class HostState:
+    """Scheduling state of a host.
+
+    Attributes:
+        semaphore: Limits the concurrent fetches to the host.
+        lock: Serializes the spacing of the requests to the host.
+        next_start: Earliest time the next request may start.
+        outcomes: Success of the most recent fetches.
+        opened_at: Time the circuit breaker opened, None if closed.
+        trial: Ticket of the half-open breaker's trial fetch, None if none.
+        crawl_delay: The robots.txt crawl-delay, None if not known yet.
+    """
+
+    semaphore: asyncio.Semaphore
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_start: float = 0.0
+    outcomes: deque = field(default_factory=deque)
+    opened_at: float | None = None
+    trial: object | None = None
+    crawl_delay: float | None = None
+
+
+class FetchScheduler:
+    """Schedule page fetches politely across hosts.
+
+    Args:
+        settings: The scheduler configuration.
+    """
+
+    def __init__(self, settings: SchedulerSettings = scheduler_settings):
+        """Initialize the scheduler.
+
+        Args:
+            settings: The scheduler configuration.
+        """
+        self.settings = settings
+        self._loop = None
+        self._hosts: dict[str, HostState] = {}
+        self._in_flight: asyncio.Semaphore | None = None
+        # Fetches waiting for a turn or in flight, a measure of the load.
+        self.pending = 0
+
+    def _bind(self) -> None:
+        # asyncio primitives belong to one event loop: start afresh when the
+        # scheduler is used from a new loop.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._in_flight = asyncio.Semaphore(self.settings.max_in_flight)
+            for state in self._hosts.values():
+                state.semaphore = asyncio.Semaphore(self.settings.per_host)
+                state.lock = asyncio.Lock()
+
+    def _host(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = HostState(
+                semaphore=asyncio.Semaphore(self.settings.per_host),
+                outcomes=deque(maxlen=self.settings.breaker_window),
+            )
+            self._hosts[host] = state
+        return state
+
+    def allow(self, url: str) -> object | None:
+        """Check if a URL may be fetched, i.e. its host's breaker is not open.
+
+        After the cooldown the breaker is half-open: a single trial fetch is
+        allowed, and its outcome decides whether the breaker closes or opens
+        again. The caller must `record` the outcome of an allowed fetch, or
+        `abandon` it, with the returned ticket.
+
+        Args:
+            url: The URL to fetch.
+
+        Returns:
+            object | None: The ticket of the fetch, None if the host is
+                currently skipped.
+        """
+        ticket = object()
+        state = self._hosts.get(url_host(url))
+        if state is None or state.opened_at is None:
+            return ticket
+        if state.trial is not None:
+            return None
+        if time.monotonic() - state.opened_at < self.settings.breaker_cooldown:
+            return None
+        state.trial = ticket
+        return ticket
+
+    def abandon(self, url: str, ticket: object | None = None) -> None:
+        """Forget an allowed fetch that ended without an outcome.
+
+        A cancelled trial fetch lets the next fetch of the host be the trial.
+
+        Args:
+            url: The URL whose fetch was cancelled.
+            ticket: The ticket returned by `allow` for the fetch.
+        """
+        state = self._hosts.get(url_host(url))
+        if state is not None and ticket is not None and state.trial is ticket:
+            state.trial = None
+
+    def record(self, url: str, ok: bool, ticket: object | None = None) -> None:
+        """Record the outcome of a fetch and update the host's breaker.
+
+        While the breaker is open, only the outcome of the trial fetch counts:
+        fetches started before the breaker opened are ignored.
+
+        Args:
+            url: The fetched URL.
+            ok: Whether the fetch succeeded.
+            ticket: The ticket returned by `allow` for the fetch.
+        """
+        host = url_host(url)
+        state = self._host(host)
+
+        if state.opened_at is not None:
+            if ticket is None or state.trial is not ticket:
+                return
+            # Half-open trial: a single outcome decides.
+            state.trial = None
+            if ok:
+                state.opened_at = None
+                state.outcomes.clear()
+                logger.info(f"🔌 Circuit closed for {host}")
+            else:
+                state.opened_at = time.monotonic()
+            return
+
+        state.outcomes.append(ok)
+        failures = state.outcomes.count(False)
+        if (
+            len(state.outcomes) >= self.settings.breaker_min_requests
+            and failures / len(state.outcomes) >= self.settings.breaker_error_rate
+        ):
+            state.opened_at = time.monotonic()
+            logger.warning(
+                f"🔌 Circuit open for {host}: {failures}/{len(state.outcomes)} "
+                "recent fetches failed"
+            )
+
+    async def crawl_delay(self, url: str) -> float:
+        """Get the robots.txt crawl-delay of a URL's host.
+
+        Args:
+            url: The URL to fetch.
+
+        Returns:
+            float: The crawl-delay in seconds, 0 if none.
+        """
+        if not self.settings.respect_robots:
+            return 0.0
+
+        state = self._host(url_host(url))
+        if state.crawl_delay is None:
+            scheme = url.split("://", 1)[0]
+            robots = await asyncio.to_thread(
+                fetch_robots, f"{scheme}://{url_host(url)}"
+            )
+            parser = urllib.robotparser.RobotFileParser()
+            parser.parse(robots.splitlines())
+            state.crawl_delay = float(
+                parser.crawl_delay(self.settings.user_agent) or 0.0
+            )
+        return state.crawl_delay
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Wait for a turn to fetch a URL.
+
+        Waits for a free slot for the host, the spacing since the previous
+        request to the host, and a free global slot, in that order.
+
+        Args:
+            url: The URL to fetch.
+        """
+        self._bind()
+        self.pending += 1
+        try:
+            delay = max(self.settings.min_interval, await self.crawl_delay(url))
+            state = self._host(url_host(url))
+
+            async with state.semaphore:
+                async with state.lock:
+                    wait = state.next_start - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    state.next_start = time.monotonic() + delay
+
+                async with self._in_flight:
+                    yield
+        finally:
+            self.pending -= 1
+
+
+scheduler = FetchScheduler()
+"""The scheduler shared by all the page fetches of the process."""
@@ -0,0 +1,202 @@
+"""Incremental HTML text extraction.
+
+This module provides a streaming alternative to parsing a whole page with
+BeautifulSoup. The HTML is fed to an incremental parser chunk by chunk and text
+blocks are yielded as soon as the element containing them is closed, so the
+caller can stop reading once enough text has been collected.
+"""
+
+from collections import deque
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Iterator
+
+from websearch.tokens import tokens_to_chars
+
+SKIP_TAGS = {
+    "head",
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "nav",
+    "footer",
+    "form",
+    "button",
+}
+"""HTML tags whose text is never part of the page content."""
+
+BLOCK_TAGS = {
+    "p",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "li",
+    "dd",
+    "dt",
+    "td",
+    "th",
+    "pre",
+    "blockquote",
+    "figcaption",
+    "div",
+    "section",
+    "article",
+    "main",
+    "table",
+    "ul",
+    "ol",
+}
+"""HTML tags that delimit a text block."""
+
+CHUNK_SIZE = 64 * 1024
+"""Number of characters fed to the parser at a time."""
+
+
+class TextBlockParser(HTMLParser):
+    """Incremental HTML parser collecting text blocks.
+
+    Text is buffered until a block tag opens or closes, at which point the
+    buffered text is normalized and queued in `blocks`. Text inside tags listed
+    in `SKIP_TAGS` is discarded.
+    """
+
+    def __init__(self, *, min_block_length: int = 20):
+        """Initialize the parser.
+
+        Args:
+            min_block_length: Blocks shorter than this are discarded.
+        """
+        super().__init__(convert_charrefs=True)
+        self.min_block_length = min_block_length
+        self.blocks: deque[str] = deque()
+        self._buffer: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        """Handle an opening tag."""
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+        elif tag == "br":
+            self._buffer.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        """Handle a closing tag."""
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data: str) -> None:
+        """Handle text data."""
+        if not self._skip_depth:
+            self._buffer.append(data)
+
+    def close(self) -> None:
+        """Flush the parser and the pending text block."""
+        super().close()
+        self._flush()
+
+    def _flush(self) -> None:
+        text = " ".join("".join(self._buffer).split())
+        self._buffer.clear()
+        if len(text) >= self.min_block_length:
+            self.blocks.append(text)
+
+
+def iter_chunks(content: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Split a string into chunks without copying it as a whole.
+
+    Args:
+        content: The string to split.
+        size: The size of each chunk.
+
+    Yields:
+        str: The consecutive chunks of the string.
+    """
+    for i in range(0, len(content), size):
+        yield content[i : i + size]
+
+
+def iter_text_blocks(
+    chunks: Iterable[str], *, min_block_length: int = 20
+) -> Iterator[str]:
+    """Parse HTML incrementally and yield its text blocks.
+
+    Parsing stops as soon as the generator is closed, so the remaining chunks
+    are never read.
+
+    Args:
+        chunks: The HTML document, in chunks.
+        min_block_length: Blocks shorter than this are discarded.
+
+    Yields:
+        str: The normalized text of each block, in document order.
+    """
+    parser = TextBlockParser(min_block_length=min_block_length)
+    for chunk in chunks:
+        parser.feed(chunk)
+        while parser.blocks:
+            yield parser.blocks.popleft()
+    parser.close()
+    while parser.blocks:
+        yield parser.blocks.popleft()
+
+
+def extract_text(
+    chunks: Iterable[str],
+    *,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    min_block_length: int = 20,
+    stop: Callable[[], bool] | None = None,
+) -> tuple[str, bool]:
+    """Extract the text of an HTML document up to a budget.
+
+    Repeated blocks (menus, cookie banners, related links) are skipped and do
+    not count against the budget.
+
+    Args:
+        chunks: The HTML document, in chunks.
+        max_chars: Stop once this many characters have been collected.
+        max_tokens: Stop once this many tokens have been collected.
+        min_block_length: Blocks shorter than this are discarded.
+        stop: Called after every block, stops the extraction when it returns
+            True, e.g. when the time budget of the page is spent.
+
+    Returns:
+        tuple[str, bool]: The extracted text and whether it was truncated.
+    """
+    budgets = [b for b in (max_chars, max_tokens and tokens_to_chars(max_tokens)) if b]
+    budget = min(budgets) if budgets else None
+
+    seen = set()
+    collected: list[str] = []
+    size = 0
+    truncated = False
+
+    blocks = iter_text_blocks(chunks, min_block_length=min_block_length)
+    for block in blocks:
+        if block in seen:
+            continue
+        seen.add(block)
+
+        if budget is not None and size + len(block) > budget:
+            collected.append(block[: max(0, budget - size)])
+            truncated = True
+            break
+
+        collected.append(block)
+        size += len(block) + 1
+        if stop is not None and stop():
+            truncated = True
+            break
+
+    blocks.close()
+    return "\n".join(collected).strip(), truncated
@@ -6,16 +6,70 @@ resources, navigates to URLs, extracts relevant text content, and cleans the tex
 by removing repetitive content.
 """
 
+import asyncio
 import re
+import time
+from typing import Callable
 
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
+from pydantic import Field
 from pydantic_ai import Tool
+from pydantic_settings import BaseSettings
 
+from websearch import iocache
+from websearch.metrics import metrics
+from websearch.retrieval.passagestore import passage_store, passage_store_settings
 from websearch.root_logger import root_logger
+from websearch.tools.browserpool import (
+    browser_pool,
+    load_storage_state,
+    save_storage_state,
+)
+from websearch.tools.consent import dismiss_consent
+from websearch.tools.documents import (
+    NotADocument,
+    detect_kind,
+    document_settings,
+    extract_document,
+    fetch_document,
+    kind_from_content_type,
+    pdf_support,
+)
+from websearch.tools.fetchscheduler import scheduler
+from websearch.tools.htmlstream import extract_text, iter_chunks
+from websearch.tools.pagebudget import (
+    TRANSIENT_LIMITS,
+    PageBudget,
+    response_body_size,
+)
+from websearch.tools.requestfilter import request_filter
+from websearch.urls import normalize_url
 
 logger = root_logger.getChild(__name__)
 
+
+class ExtractionSettings(BaseSettings):
+    """Configuration of the page text extraction.
+
+    Attributes:
+        stream: Whether to use the incremental extractor instead of BeautifulSoup.
+        max_chars: Character budget for the extracted text in streaming mode.
+        max_tokens: Token budget for the extracted text in streaming mode.
+        cache_ttl: Seconds the extracted pages are cached, 0 to disable.
+    """
+
+    stream: bool = Field(alias="STREAM_EXTRACTION", default=False)
+    max_chars: int | None = Field(alias="EXTRACTION_MAX_CHARS", default=None)
+    max_tokens: int | None = Field(alias="EXTRACTION_MAX_TOKENS", default=None)
+    cache_ttl: float = Field(alias="PAGE_CACHE_TTL", default=60 * 60 * 24)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+extraction_settings = ExtractionSettings()
+
 # block pages by resource type. e.g. image, stylesheet
 BLOCK_RESOURCE_TYPES = [
     "beacon",
@@ -34,114 +88,399 @@ BLOCK_RESOURCE_TYPES = [
 """List of resource types to block during web navigation to improve performance and reduce bandwidth."""
 
 
-# we can also block popular 3rd party resources like tracking:
-BLOCK_RESOURCE_NAMES = [
-    "adzerk",
-    "analytics",
-    "cdn.api.twitter",
-    "doubleclick",
-    "exelator",
-    "facebook",
-    "fontawesome",
-    "google",
-    "google-analytics",
-    "googletagmanager",
-]
-"""List of domain/resource names to block during web navigation, primarily targeting trackers and analytics."""
-
 MAIN_CONTENT_TAGS = ["article", "main", "div", "section"]
 """HTML tags that typically contain the main content of a webpage."""
 
 CONTENT_TAGS = ["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "span", "div"]
 """HTML tags that contain meaningful text content to be extracted."""
 
+PAGE_HTML_SCRIPT = """(limit) => {
+    const html = document.documentElement.outerHTML;
+    return [html.length, limit ? html.slice(0, limit) : html];
+}"""
+"""Script getting the length of the HTML of a page and its start within a limit."""
+
+STOP_CHECK_INTERVAL = 1024
+"""Number of positions `clean_text` scans between two budget checks."""
 
-async def intercept_route(route) -> None:
-    """Intercept and filter network requests based on resource types and domains.
+
+async def intercept_route(
+    route, page_url: str | None = None, budget: PageBudget | None = None
+) -> None:
+    """Intercept and filter network requests based on resource types and rules.
+
+    Requests are blocked by resource type first, then by the compiled
+    `request_filter` rules, which block ad and tracker hosts for every resource
+    type including scripts, but never the navigation of the page itself. Once
+    the page has loaded its budget of bytes, all its requests are blocked.
 
     Args:
         route: The route object representing the intercepted network request.
+        page_url: The url of the page making the request.
+        budget: The resource budget of the page.
     """
-    if route.request.resource_type in BLOCK_RESOURCE_TYPES:
-        logger.info(
-            f"🚫 Blocking {route.request.resource_type} resource: {route.request.url}"
-        )
+    request = route.request
+    if budget is not None and budget.bytes_exceeded:
+        logger.debug(f"🚫 Blocking {request.url}: the page is over its byte budget")
+        metrics.incr("requestfilter.blocked_requests")
+        metrics.incr("requestfilter.blocked_requests.budget")
         await route.abort()
-    elif any(name in route.request.url for name in BLOCK_RESOURCE_NAMES):
-        logger.info(f"🚫 Blocking {route.request.url} resource: {route.request.url}")
+        return
+
+    if request.resource_type in BLOCK_RESOURCE_TYPES:
+        logger.debug(f"🚫 Blocking {request.resource_type} resource: {request.url}")
+        metrics.incr("requestfilter.blocked_requests")
+        metrics.incr(f"requestfilter.blocked_requests.{request.resource_type}")
+        await route.abort()
+        return
+
+    resource_type = request.resource_type
+    if resource_type == "document":
+        if request.is_navigation_request() and request.frame.parent_frame is None:
+            # The page itself, even on a listed host: the search selected it.
+            metrics.incr("requestfilter.allowed_requests")
+            await route.continue_()
+            return
+        resource_type = "subdocument"
+
+    match = request_filter.match(request.url, resource_type, page_url)
+    if match.blocked:
+        logger.debug(f"🚫 Blocking {request.url} by rule {match.rule}")
+        metrics.incr("requestfilter.blocked_requests")
+        metrics.incr("requestfilter.blocked_requests.rule")
         await route.abort()
     else:
+        metrics.incr("requestfilter.allowed_requests")
         await route.continue_()
 
 
-async def navigate_link(url: str) -> dict | None:
+async def count_loaded_bytes(request) -> None:
+    """Count the body bytes received for a request of a page.
+
+    Args:
+        request: The finished Playwright request.
+    """
+    metrics.incr("requestfilter.loaded_bytes", await response_body_size(request))
+
+
+async def navigate_link(
+    url: str,
+    *,
+    stream: bool | None = None,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+) -> dict | None:
     """Navigate the link and return the text of the page.
 
+    In streaming mode the page is parsed incrementally and extraction stops as
+    soon as the character or token budget is met, instead of parsing and
+    cleaning the whole document.
+
+    Fetches are scheduled by the process wide `scheduler`, which limits the
+    concurrency and request rate per host and skips hosts that keep failing,
+    and pages are opened by the process wide `browser_pool`. Extracted pages
+    are cached for `PAGE_CACHE_TTL` seconds, unless their extraction was cut
+    by the CPU time or memory budgets.
+
+    Pages are opened with the cookies and local storage saved for their site,
+    and consent dialogs are dismissed before the text is extracted. PDF, text
+    and JSON documents are fetched without the browser by the `documents`
+    handlers.
+
     Args:
         url: The url of the link to navigate.
+        stream: Whether to use the streaming extractor. Defaults to the
+            `STREAM_EXTRACTION` setting.
+        max_chars: Character budget for the text in streaming mode.
+        max_tokens: Token budget for the text in streaming mode.
 
     Returns:
         dict: A dictionary containing the text of the page with keys:
             - url: The url of the page
             - text: The text of the page
-        None: If navigation fails.
+            - truncated: Whether the text was cut at the budget
+            - content_type: The kind of document, for non-HTML documents
+            - limits: The resource budgets of the page that were hit
+        None: If navigation fails or the host is skipped.
+    """
+    if stream is None:
+        stream = extraction_settings.stream
+    if max_chars is None:
+        max_chars = extraction_settings.max_chars
+    if max_tokens is None:
+        max_tokens = extraction_settings.max_tokens
+
+    key = page_cache_key(url, stream=stream, max_chars=max_chars, max_tokens=max_tokens)
+    if extraction_settings.cache_ttl:
+        cached = iocache.cache.get(key)
+        if cached is not None:
+            logger.info(f"💾 Page served from the cache: {url}")
+            metrics.incr("navigate.cache_hits")
+            return cached
+
+    ticket = scheduler.allow(url)
+    if ticket is None:
+        logger.warning(f"⏭️ Skipping {url}: too many recent failures on this host")
+        return None
+
+    try:
+        async with scheduler.slot(url):
+            result = await _fetch(
+                url, stream=stream, max_chars=max_chars, max_tokens=max_tokens
+            )
+    except BaseException:
+        # Cancelled, e.g. at the deadline of the run: no outcome to record.
+        scheduler.abandon(url, ticket)
+        raise
+
+    scheduler.record(url, result is not None, ticket)
+    if result is not None and passage_store_settings.enabled:
+        await index_page(url, result["text"])
+    if (
+        result is not None
+        and extraction_settings.cache_ttl
+        # A page cut by a busy process may be complete at the next fetch.
+        and not TRANSIENT_LIMITS.intersection(result.get("limits") or ())
+    ):
+        iocache.cache.set(
+            key, result, expire=extraction_settings.cache_ttl, tag="pages"
+        )
+    return result
+
+
+def page_cache_key(
+    url: str, *, stream: bool, max_chars: int | None, max_tokens: int | None
+) -> tuple:
+    """Get the disk cache key of an extracted page.
+
+    Args:
+        url: The url of the page.
+        stream: Whether the page was extracted in streaming mode.
+        max_chars: Character budget of the extraction.
+        max_tokens: Token budget of the extraction.
+
+    Returns:
+        tuple: The key, starting with 'page' and the normalized url.
     """
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=False)
+    return ("page", normalize_url(url), stream, max_chars, max_tokens)
+
+
+async def _fetch(
+    url: str,
+    *,
+    stream: bool,
+    max_chars: int | None,
+    max_tokens: int | None,
+) -> dict | None:
+    kind = await detect_kind(url)
+    if kind:
         try:
-            page = await browser.new_page()
-            await page.route("**/*", intercept_route)
+            return await fetch_document(
+                url, kind, max_chars=max_chars, max_tokens=max_tokens
+            )
+        except NotADocument:
+            logger.info(f"📄 {url} is an HTML page, opening it in the browser")
+    return await _navigate(
+        url, stream=stream, max_chars=max_chars, max_tokens=max_tokens
+    )
+
+
+async def _navigate(
+    url: str,
+    *,
+    stream: bool,
+    max_chars: int | None,
+    max_tokens: int | None,
+) -> dict | None:
+    storage_state = load_storage_state(url)
+    # Loads and empty pages are measured with and without a saved storage.
+    storage = "stored" if storage_state else "fresh"
+    budget = PageBudget()
+    async with browser_pool.page(storage_state=storage_state) as page:
+        try:
+            await page.route("**/*", lambda route: intercept_route(route, url, budget))
+            page.on("requestfinished", count_loaded_bytes)
+            page.on("requestfinished", budget.count_request)
             # @cache.memoize(expire=60 * 60 * 24 * 30)
 
             logger.info(f"🚀 Exploring {url}")
-            await page.goto(url, wait_until="domcontentloaded", timeout=40000)
+            start = time.monotonic()
+            response = await page.goto(
+                url, wait_until="domcontentloaded", timeout=40000
+            )
+            load_seconds = time.monotonic() - start
+            metrics.observe("navigate.load_seconds", load_seconds)
+            metrics.observe(f"navigate.load_seconds.{storage}", load_seconds)
+
+            # A document the probe missed, e.g. on a server not answering HEAD.
+            kind = kind_from_content_type(
+                response.headers.get("content-type") if response else None
+            )
+            if kind and document_settings.enabled and (kind != "pdf" or pdf_support()):
+                return await extract_document(
+                    url,
+                    await response.body(),
+                    kind,
+                    max_chars=max_chars,
+                    max_tokens=max_tokens,
+                )
+
             await page.wait_for_timeout(2000)
+            await dismiss_consent(page)
             logger.info(f"Page title: {await page.title()}")
-            content = await page.content()
-            soup = BeautifulSoup(content, "html.parser")
-            text = ""
-            # Extract text from relevant content elements
-
-            # Try to focus on main content areas first
-            main_content = soup.find_all(
-                MAIN_CONTENT_TAGS,
-                class_=lambda c: c
-                and any(x in str(c).lower() for x in MAIN_CONTENT_TAGS),
+            # Only the HTML within the budget leaves the browser.
+            length, content = await page.evaluate(
+                PAGE_HTML_SCRIPT, budget.settings.max_html_chars
             )
-
-            if main_content:
-                # Extract from identified main content areas
-                for section in main_content:
-                    for tag in CONTENT_TAGS:
-                        for element in section.find_all(tag):
-                            if element.get_text().strip():
-                                text += "\n" + element.get_text().strip()
-            else:
-                # Fallback to extracting from the whole page
-                for tag in CONTENT_TAGS:
-                    for element in soup.find_all(tag):
-                        if element.get_text().strip():
-                            text += "\n" + element.get_text().strip()
-            # Remove excessive whitespace and normalize
-            text = re.sub(r"\n+", "\n", text).strip()
-            text = clean_text(text)
-            print("--- TEXT ---")
-            print(text)
-            print("--- END TEXT ---")
-            logger.info(f"💠 Text extracted: {len(text)} characters")
+            content = budget.cap_html(content, length)
+            save_storage_state(url, await page.context.storage_state())
+
+            text, truncated = await asyncio.to_thread(
+                extract_html,
+                content,
+                budget,
+                stream=stream,
+                max_chars=max_chars,
+                max_tokens=max_tokens,
+            )
+            logger.debug(f"Text of {url}:\n{text}")
+
+            logger.info(
+                f"💠 Text extracted: {len(text)} characters"
+                + (" (truncated)" if truncated else "")
+                + (
+                    f", over budget: {', '.join(budget.violations)}"
+                    if budget.violations
+                    else ""
+                )
+            )
+            metrics.incr(f"navigate.pages.{storage}")
+            if not text.strip():
+                metrics.incr(f"navigate.empty_pages.{storage}")
             return {
                 "url": url,
                 "text": text,
+                "truncated": truncated,
+                "limits": budget.violations,
             }
         except Exception as e:
+            if (
+                "Download is starting" in str(e)
+                and document_settings.enabled
+                and pdf_support()
+            ):
+                # The browser downloads the documents it cannot display, PDFs.
+                try:
+                    return await fetch_document(
+                        url, "pdf", max_chars=max_chars, max_tokens=max_tokens
+                    )
+                except NotADocument:
+                    pass
             logger.error(f"Error navigating to {url}: {e}")
             return None
-        finally:
-            await browser.close()
+
+
+def extract_html(
+    content: str,
+    budget: PageBudget,
+    *,
+    stream: bool,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+) -> tuple[str, bool]:
+    """Extract the text of the HTML of a page within the budget of the page.
+
+    The extraction and cleaning stop cooperatively once the CPU time or memory
+    budget is exceeded, keeping the text extracted so far. Run it in a thread,
+    the CPU time is measured on the calling thread.
+
+    Args:
+        content: The HTML document.
+        budget: The resource budget of the page.
+        stream: Whether to use the streaming extractor.
+        max_chars: Character budget for the text in streaming mode.
+        max_tokens: Token budget for the text in streaming mode.
+
+    Returns:
+        tuple[str, bool]: The text, and whether it is incomplete.
+    """
+    budget.start_extraction()
+    if stream:
+        text, truncated = extract_text(
+            iter_chunks(content),
+            max_chars=max_chars,
+            max_tokens=max_tokens,
+            stop=budget.exhausted,
+        )
+        text = clean_text(text, stop=budget.exhausted)
+    else:
+        text, truncated = extract_page_text(content, stop=budget.exhausted), False
+    metrics.observe("navigate.extraction_seconds", budget.extraction_seconds)
+    incomplete = {"html", "time", "rss"}.intersection(budget.violations)
+    return text, truncated or bool(incomplete)
+
+
+async def index_page(url: str, text: str) -> None:
+    """Add the passages of a fetched page to the local passage store.
+
+    Args:
+        url: The url of the page.
+        text: The extracted text of the page.
+    """
+    try:
+        await asyncio.to_thread(passage_store.add, url, text)
+    except Exception as e:
+        logger.error(f"Error indexing {url}: {e}")
+
+
+def extract_page_text(content: str, *, stop: Callable[[], bool] | None = None) -> str:
+    """Extract and clean the text of a whole HTML document with BeautifulSoup.
+
+    Args:
+        content: The HTML document.
+        stop: Called between elements, stops the extraction with the text
+            collected so far when it returns True.
+
+    Returns:
+        str: The cleaned text of the page.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    text = ""
+    # Extract text from relevant content elements
+
+    # Try to focus on main content areas first
+    main_content = soup.find_all(
+        MAIN_CONTENT_TAGS,
+        class_=lambda c: c and any(x in str(c).lower() for x in MAIN_CONTENT_TAGS),
+    )
+
+    # Extract from identified main content areas, or fallback to the whole page
+    parts = _content_parts(main_content or [soup], stop)
+    text = "\n" + "\n".join(parts) if parts else ""
+    # Remove excessive whitespace and normalize
+    text = re.sub(r"\n+", "\n", text).strip()
+    return clean_text(text, stop=stop)
+
+
+def _content_parts(sections, stop: Callable[[], bool] | None) -> list[str]:
+    # Returns at the first stop, without walking the remaining tags and sections.
+    parts = []
+    for section in sections:
+        for tag in CONTENT_TAGS:
+            for element in section.find_all(tag):
+                if stop is not None and stop():
+                    return parts
+                if element.get_text().strip():
+                    parts.append(element.get_text().strip())
+    return parts
 
 
 def clean_text(
-    text: str, *, min_length_segment: int = 20, min_occurrences_segment: int = 2
+    text: str,
+    *,
+    min_length_segment: int = 20,
+    min_occurrences_segment: int = 2,
+    stop: Callable[[], bool] | None = None,
 ) -> str:
     """Remove repeated text segments (phrases, paragraphs, etc.) that occur multiple times.
 
@@ -154,6 +493,8 @@ def clean_text(
         text: The input text to process.
         min_length_segment: Minimum length of text segment to consider for removal. Default is 20.
         min_occurrences_segment: Minimum number of occurrences required for removal. Default is 2.
+        stop: Called periodically while looking for repeated blocks, returns
+            the text cleaned so far when it returns True.
 
     Returns:
         str: The processed text with repeated content removed.
@@ -219,9 +560,13 @@ def clean_text(
     result_text = " ".join(result)
 
     # Look for repeating blocks (paragraphs or groups of questions)
+    steps = 0
     for block_size in range(100, min_length_segment, -20):  # Try different block sizes
         i = 0
         while i <= len(result_text) - block_size:
+            steps += 1
+            if stop is not None and steps % STOP_CHECK_INTERVAL == 0 and stop():
+                return result_text
             block = result_text[i : i + block_size]
             if len(block) >= min_length_segment:
                 # Count occurrences of this block in the remaining text
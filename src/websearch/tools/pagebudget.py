@@ -0,0 +1,186 @@
+"""Resource budgets of a page fetch.
+
+A single pathological page, e.g. an infinite scroll or a giant table, can hold
+megabytes of HTML and cost seconds of parsing. This module bounds the work of
+every page:
+
+- 'bytes': the body bytes of the responses loaded by the page, as received,
+  whether chunked or compressed, after which its other requests are aborted,
+- 'html': the length of the HTML handed to the extractor, cut beyond it,
+- 'time': the CPU time of the extraction and cleaning,
+- 'rss': the resident memory of the process during the extraction.
+
+The extraction checks the budget cooperatively and stops with the text it has
+collected so far. The limits hit are recorded on the page and in the
+`navigate.budget.<limit>` metrics. Pages cut by the transient 'time' and 'rss'
+limits are not cached.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.metrics import metrics
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+
+class PageBudgetSettings(BaseSettings):
+    """Configuration of the page budgets, 0 disables a limit.
+
+    Attributes:
+        max_bytes: Bytes of the responses loaded by a page.
+        max_html_chars: Characters of HTML passed to the extractor.
+        extraction_seconds: CPU seconds of the extraction of a page.
+        max_rss_mb: Resident memory of the process, in MiB, above which
+            extractions stop.
+    """
+
+    max_bytes: int = Field(alias="PAGE_MAX_BYTES", default=16 * 2**20)
+    max_html_chars: int = Field(alias="PAGE_MAX_HTML_CHARS", default=2_000_000)
+    extraction_seconds: float = Field(alias="PAGE_EXTRACTION_SECONDS", default=5.0)
+    max_rss_mb: int = Field(alias="PAGE_MAX_RSS_MB", default=4096)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+page_budget_settings = PageBudgetSettings()
+
+TRANSIENT_LIMITS = frozenset({"time", "rss"})
+"""Limits hit because of the load of the process rather than of the page."""
+
+RSS_CHECK_INTERVAL = 16
+"""Number of budget checks between two reads of the resident memory."""
+
+
+def rss_bytes() -> int:
+    """Get the resident memory of the process.
+
+    Returns:
+        int: The current resident set size in bytes on Linux, the peak one
+            elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def response_body_size(request) -> int:
+    """Get the size of the response body received for a request.
+
+    Args:
+        request: The finished Playwright request.
+
+    Returns:
+        int: The body bytes as received, 0 if unknown, e.g. the page closed.
+    """
+    try:
+        sizes = await request.sizes()
+    except Exception as e:
+        logger.debug(f"No sizes for {request.url}: {e}")
+        return 0
+    return max(sizes.get("responseBodySize", 0), 0)
+
+
+@dataclass
+class PageBudget:
+    """Budget and usage of the fetch of a page.
+
+    Attributes:
+        settings: The page budget configuration.
+        loaded_bytes: Bytes of the responses loaded by the page.
+        violations: The limits hit, in order.
+    """
+
+    settings: PageBudgetSettings = field(default_factory=lambda: page_budget_settings)
+    loaded_bytes: int = 0
+    violations: list[str] = field(default_factory=list)
+    _cpu_start: float | None = field(default=None, init=False, repr=False)
+    _checks: int = field(default=0, init=False, repr=False)
+
+    def exceed(self, limit: str) -> None:
+        """Record that a limit was hit.
+
+        Args:
+            limit: The limit: 'bytes', 'html', 'time' or 'rss'.
+        """
+        if limit not in self.violations:
+            self.violations.append(limit)
+            metrics.incr(f"navigate.budget.{limit}")
+
+    @property
+    def bytes_exceeded(self) -> bool:
+        """Whether the page loaded more bytes than its budget."""
+        return "bytes" in self.violations
+
+    async def count_request(self, request) -> None:
+        """Count the body bytes received for a request of the page.
+
+        The Content-Length header is missing on chunked responses, so the
+        received sizes are used instead.
+
+        Args:
+            request: The finished Playwright request.
+        """
+        size = await response_body_size(request)
+        self.loaded_bytes += size
+        if self.settings.max_bytes and self.loaded_bytes > self.settings.max_bytes:
+            self.exceed("bytes")
+
+    def cap_html(self, html: str, length: int | None = None) -> str:
+        """Cut HTML at the length budget.
+
+        Args:
+            html: The HTML of the page, possibly already cut.
+            length: Length of the whole HTML. Defaults to the length of `html`.
+
+        Returns:
+            str: The HTML, cut if over the budget.
+        """
+        limit = self.settings.max_html_chars
+        if limit and (length or len(html)) > limit:
+            self.exceed("html")
+            return html[:limit]
+        return html
+
+    def start_extraction(self) -> None:
+        """Start the CPU time budget, in the thread running the extraction."""
+        self._cpu_start = time.thread_time()
+
+    @property
+    def extraction_seconds(self) -> float:
+        """CPU seconds used by the extraction so far."""
+        if self._cpu_start is None:
+            return 0.0
+        return time.thread_time() - self._cpu_start
+
+    def exhausted(self) -> bool:
+        """Check whether the extraction must stop.
+
+        Called cooperatively by the extractors, in the extraction thread.
+
+        Returns:
+            bool: True once the CPU time or the memory budget is exceeded.
+        """
+        if "time" in self.violations or "rss" in self.violations:
+            return True
+        seconds = self.settings.extraction_seconds
+        if seconds and self.extraction_seconds > seconds:
+            self.exceed("time")
+            return True
+        self._checks += 1
+        if self.settings.max_rss_mb and self._checks % RSS_CHECK_INTERVAL == 1:
+            if rss_bytes() > self.settings.max_rss_mb * 2**20:
+                self.exceed("rss")
+                return True
+        return False
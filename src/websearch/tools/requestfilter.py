@@ -0,0 +1,538 @@
+"""Rule based request filter for page navigation.
+
+This module compiles EasyList / uBlock Origin style network rules into a
+request filter. Host anchored rules (`||ads.example.com^`) are stored in a
+trie of reversed host labels, and all the other rules are indexed by their
+longest literal substring in an Aho-Corasick automaton, so a request is checked
+against thousands of rules in a single pass over its URL.
+
+Supported syntax:
+    - `||host^` host anchored rules, matching the host and its subdomains.
+    - `|`, `||`, `^` and `*` anchors, separators and wildcards in patterns.
+    - `@@` exception rules, which allow requests matched by blocking rules.
+    - `$` options: resource types (`script`, `~image`, ...), `third-party`,
+      `first-party` and `domain=a.com|~b.com` to scope a rule to some sites.
+    - `!` comments. Cosmetic rules and rules with unsupported options are skipped.
+"""
+
+import pathlib
+import re
+from collections import deque
+from dataclasses import dataclass, field
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.root_logger import root_logger
+from websearch.urls import url_host
+
+logger = root_logger.getChild(__name__)
+
+DEFAULT_RULES = [
+    "||adzerk.net^",
+    "||adservice.google.com^",
+    "||amazon-adsystem.com^",
+    "||cdn.api.twitter.com^",
+    "||connect.facebook.net^",
+    "||criteo.com^",
+    "||criteo.net^",
+    "||doubleclick.net^",
+    "||exelator.com^",
+    "||google-analytics.com^",
+    "||googleadservices.com^",
+    "||googlesyndication.com^",
+    "||googletagmanager.com^",
+    "||googletagservices.com^",
+    "||hotjar.com^",
+    "||kit.fontawesome.com^",
+    "||outbrain.com^",
+    "||quantserve.com^",
+    "||scorecardresearch.com^",
+    "||segment.io^",
+    "||taboola.com^",
+    "||use.fontawesome.com^",
+    "||facebook.com/tr^",
+    "/analytics.js",
+    "/gtag/js",
+]
+"""Built-in rules blocking the most common ad, tracking and analytics hosts."""
+
+RESOURCE_TYPE_OPTIONS = {
+    "script": "script",
+    "image": "image",
+    "stylesheet": "stylesheet",
+    "css": "stylesheet",
+    "font": "font",
+    "media": "media",
+    "object": "object",
+    "xmlhttprequest": "xhr",
+    "xhr": "xhr",
+    "fetch": "fetch",
+    "subdocument": "subdocument",
+    "frame": "subdocument",
+    "ping": "ping",
+    "beacon": "beacon",
+    "websocket": "websocket",
+    "other": "other",
+}
+"""Mapping of the rule type options to Playwright resource types.
+
+Playwright reports the documents of frames as 'document', like the page itself:
+callers pass 'subdocument' for the documents loaded in child frames.
+"""
+
+IGNORED_OPTIONS = {"important", "match-case"}
+
+SECOND_LEVEL_SUFFIXES = {"co.uk", "org.uk", "ac.uk", "com.au", "co.jp", "com.br"}
+
+
+class RequestFilterSettings(BaseSettings):
+    """Configuration of the request filter.
+
+    Attributes:
+        lists: Paths of filter list files (EasyList syntax) to load.
+        allow_hosts: Request hosts that are never blocked.
+        disabled_sites: Page hosts on which only resource types are blocked.
+    """
+
+    lists: list[pathlib.Path] = Field(alias="REQUEST_FILTER_LISTS", default=[])
+    allow_hosts: list[str] = Field(alias="REQUEST_FILTER_ALLOW_HOSTS", default=[])
+    disabled_sites: list[str] = Field(alias="REQUEST_FILTER_DISABLED_SITES", default=[])
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+request_filter_settings = RequestFilterSettings()
+
+
+def host_matches(host: str, domain: str) -> bool:
+    """Check if a host is a domain or one of its subdomains.
+
+    Args:
+        host: The host to check.
+        domain: The domain.
+
+    Returns:
+        bool: True if the host is under the domain.
+    """
+    return host == domain or host.endswith("." + domain)
+
+
+def site_of(host: str) -> str:
+    """Approximate the registrable domain of a host.
+
+    Args:
+        host: The host.
+
+    Returns:
+        str: The last two labels of the host, three for known second level
+            suffixes such as "co.uk".
+    """
+    labels = host.split(".")
+    n = 3 if ".".join(labels[-2:]) in SECOND_LEVEL_SUFFIXES else 2
+    return ".".join(labels[-n:])
+
+
+@dataclass(slots=True)
+class Rule:
+    """A compiled network rule.
+
+    Attributes:
+        text: The source of the rule.
+        pattern: The lowercased URL pattern of the rule, without options.
+        exception: Whether the rule allows matching requests.
+        regex: Regular expression matching the URL, None for pure host rules.
+        types: Resource types the rule applies to, None for all.
+        excluded_types: Resource types the rule does not apply to.
+        third_party: Restrict to third-party (True) or first-party (False)
+            requests, None for both.
+        domains: Sites the rule is restricted to.
+        excluded_domains: Sites the rule does not apply to.
+    """
+
+    text: str
+    pattern: str = ""
+    exception: bool = False
+    regex: re.Pattern | None = None
+    types: frozenset | None = None
+    excluded_types: frozenset = frozenset()
+    third_party: bool | None = None
+    domains: tuple[str, ...] = ()
+    excluded_domains: tuple[str, ...] = ()
+
+    def applies(
+        self, url: str, resource_type: str, page_host: str, third_party: bool
+    ) -> bool:
+        """Check if the rule applies to a request.
+
+        Args:
+            url: The lowercased URL of the request.
+            resource_type: The Playwright resource type of the request,
+                'subdocument' for the document of a child frame.
+            page_host: The host of the page making the request.
+            third_party: Whether the request goes to another site than the page.
+
+        Returns:
+            bool: True if the rule matches the request.
+        """
+        if self.types is not None and resource_type not in self.types:
+            return False
+        if resource_type in self.excluded_types:
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        if self.domains and not any(host_matches(page_host, d) for d in self.domains):
+            return False
+        if any(host_matches(page_host, d) for d in self.excluded_domains):
+            return False
+        return self.regex is None or bool(self.regex.search(url))
+
+
+@dataclass(slots=True)
+class _TrieNode:
+    children: dict = field(default_factory=dict)
+    rules: list = field(default_factory=list)
+
+
+class HostTrie:
+    """Trie of host names keyed by reversed labels.
+
+    A rule stored for "example.com" matches "example.com" and all of its
+    subdomains.
+    """
+
+    def __init__(self):
+        """Initialize an empty trie."""
+        self.root = _TrieNode()
+
+    def insert(self, host: str, rule: Rule) -> None:
+        """Store a rule for a host.
+
+        Args:
+            host: The host the rule is anchored to.
+            rule: The rule.
+        """
+        node = self.root
+        for label in reversed(host.split(".")):
+            node = node.children.setdefault(label, _TrieNode())
+        node.rules.append(rule)
+
+    def match(self, host: str) -> list[Rule]:
+        """Get the rules stored for a host and its parent domains.
+
+        Args:
+            host: The host of the request.
+
+        Returns:
+            list[Rule]: The candidate rules.
+        """
+        rules = []
+        node = self.root
+        for label in reversed(host.split(".")):
+            node = node.children.get(label)
+            if node is None:
+                break
+            rules.extend(node.rules)
+        return rules
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton finding all the keywords contained in a text."""
+
+    def __init__(self):
+        """Initialize an empty automaton."""
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list] = [[]]
+        self._built = True
+
+    def add(self, keyword: str, value) -> None:
+        """Add a keyword.
+
+        Args:
+            keyword: The keyword to find.
+            value: The value reported when the keyword is found.
+        """
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(value)
+        self._built = False
+
+    def build(self) -> None:
+        """Compute the failure links. Called automatically before searching."""
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = (
+                    self.output[next_state] + self.output[self.fail[next_state]]
+                )
+        self._built = True
+
+    def search(self, text: str) -> list:
+        """Find the keywords contained in a text.
+
+        Args:
+            text: The text to search.
+
+        Returns:
+            list: The values of the keywords found, possibly repeated.
+        """
+        if not self._built:
+            self.build()
+        found = []
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found.extend(self.output[state])
+        return found
+
+
+_HOST_RULE_RE = re.compile(r"^\|\|([a-z0-9.-]+)\^?$")
+_LITERAL_RE = re.compile(r"[^*^|]+")
+
+
+def _pattern_to_regex(pattern: str) -> re.Pattern:
+    regex = ""
+    if pattern.startswith("||"):
+        regex = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"
+        pattern = pattern[2:]
+    elif pattern.startswith("|"):
+        regex = "^"
+        pattern = pattern[1:]
+
+    end = ""
+    if pattern.endswith("|"):
+        end = "$"
+        pattern = pattern[:-1]
+
+    for char in pattern:
+        if char == "*":
+            regex += ".*"
+        elif char == "^":
+            regex += r"(?:[^\w\-.%]|$)"
+        else:
+            regex += re.escape(char)
+    return re.compile(regex + end)
+
+
+def parse_rule(line: str) -> Rule | None:
+    """Compile a filter list line into a rule.
+
+    Args:
+        line: The line of the filter list.
+
+    Returns:
+        Rule | None: The rule, or None for comments, cosmetic rules and rules
+            using unsupported syntax.
+    """
+    line = line.strip()
+    if not line or line.startswith(("!", "[")) or "##" in line or "#@#" in line:
+        return None
+
+    rule = Rule(text=line)
+    if line.startswith("@@"):
+        rule.exception = True
+        line = line[2:]
+
+    pattern, _, options = line.partition("$")
+    pattern = pattern.lower()
+    if not pattern or (pattern.startswith("/") and pattern.endswith("/")):
+        return None
+
+    types, excluded_types = set(), set()
+    for option in filter(None, options.split(",")):
+        negated = option.startswith("~")
+        name = option.lstrip("~")
+        if name in RESOURCE_TYPE_OPTIONS:
+            (excluded_types if negated else types).add(RESOURCE_TYPE_OPTIONS[name])
+        elif name in ("third-party", "3p"):
+            rule.third_party = not negated
+        elif name in ("first-party", "1p"):
+            rule.third_party = negated
+        elif name.startswith("domain="):
+            domains = name.removeprefix("domain=").lower().split("|")
+            rule.domains = tuple(d for d in domains if not d.startswith("~"))
+            rule.excluded_domains = tuple(d[1:] for d in domains if d.startswith("~"))
+        elif name not in IGNORED_OPTIONS:
+            return None
+
+    rule.types = frozenset(types) if types else None
+    rule.excluded_types = frozenset(excluded_types)
+    rule.pattern = pattern
+    if not _HOST_RULE_RE.match(pattern):
+        rule.regex = _pattern_to_regex(pattern)
+    return rule
+
+
+@dataclass(slots=True)
+class Match:
+    """Result of checking a request against the filter.
+
+    Attributes:
+        blocked: Whether the request must be blocked.
+        rule: The rule that decided, None if no rule matched.
+    """
+
+    blocked: bool
+    rule: str | None = None
+
+
+class RequestFilter:
+    """Filter deciding which requests of a page to block.
+
+    Args:
+        allow_hosts: Request hosts that are never blocked.
+        disabled_sites: Page hosts on which no rule is applied.
+    """
+
+    def __init__(
+        self,
+        *,
+        allow_hosts: list[str] | None = None,
+        disabled_sites: list[str] | None = None,
+    ):
+        """Initialize an empty filter.
+
+        Args:
+            allow_hosts: Request hosts that are never blocked.
+            disabled_sites: Page hosts on which no rule is applied.
+        """
+        self.allow_hosts = [h.lower() for h in allow_hosts or []]
+        self.disabled_sites = [h.lower() for h in disabled_sites or []]
+        self.hosts = HostTrie()
+        self.keywords = AhoCorasick()
+        self.generic: list[Rule] = []
+        self.size = 0
+
+    @classmethod
+    def from_rules(cls, lines, **kwargs) -> "RequestFilter":
+        """Build a filter from filter list lines.
+
+        Args:
+            lines: The lines of one or more filter lists.
+            **kwargs: Arguments passed to the constructor.
+
+        Returns:
+            RequestFilter: The compiled filter.
+        """
+        request_filter = cls(**kwargs)
+        for line in lines:
+            request_filter.add(line)
+        return request_filter
+
+    def add(self, line: str) -> bool:
+        """Compile and add a rule.
+
+        Args:
+            line: The rule, in filter list syntax.
+
+        Returns:
+            bool: False if the rule was skipped.
+        """
+        rule = parse_rule(line)
+        if rule is None:
+            return False
+
+        host_rule = _HOST_RULE_RE.match(rule.pattern)
+        if host_rule:
+            self.hosts.insert(host_rule.group(1), rule)
+        else:
+            literals = _LITERAL_RE.findall(rule.pattern)
+            keyword = max(literals, key=len) if literals else ""
+            if len(keyword) >= 3:
+                self.keywords.add(keyword, rule)
+            else:
+                self.generic.append(rule)
+        self.size += 1
+        return True
+
+    def match(
+        self, url: str, resource_type: str = "other", page_url: str | None = None
+    ) -> Match:
+        """Check a request against the rules.
+
+        Args:
+            url: The URL of the request.
+            resource_type: The Playwright resource type of the request,
+                'subdocument' for the document of a child frame.
+            page_url: The URL of the page making the request.
+
+        Returns:
+            Match: Whether the request is blocked and by which rule.
+        """
+        host = url_host(url)
+        page_host = url_host(page_url) if page_url else host
+
+        if any(host_matches(host, h) for h in self.allow_hosts) or any(
+            host_matches(page_host, h) for h in self.disabled_sites
+        ):
+            return Match(blocked=False)
+
+        lowered = url.lower()
+        third_party = site_of(host) != site_of(page_host)
+        candidates = [
+            *self.hosts.match(host),
+            *self.keywords.search(lowered),
+            *self.generic,
+        ]
+
+        blocking = None
+        for rule in candidates:
+            if rule.applies(lowered, resource_type, page_host, third_party):
+                if rule.exception:
+                    return Match(blocked=False, rule=rule.text)
+                blocking = blocking or rule
+
+        return Match(blocked=True, rule=blocking.text) if blocking else Match(False)
+
+
+def build_request_filter(
+    settings: RequestFilterSettings = request_filter_settings,
+) -> RequestFilter:
+    """Build the request filter from the built-in rules and the configured lists.
+
+    Args:
+        settings: The request filter configuration.
+
+    Returns:
+        RequestFilter: The compiled filter.
+    """
+    lines = list(DEFAULT_RULES)
+    for path in settings.lists:
+        try:
+            lines.extend(path.read_text().splitlines())
+        except OSError as e:
+            logger.error(f"Error reading filter list {path}: {e}")
+
+    request_filter = RequestFilter.from_rules(
+        lines,
+        allow_hosts=settings.allow_hosts,
+        disabled_sites=settings.disabled_sites,
+    )
+    logger.info(f"Request filter: {request_filter.size} rules")
+    return request_filter
+
+
+request_filter = build_request_filter()
+"""The request filter used by `navigate_link`."""
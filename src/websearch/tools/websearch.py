@@ -1,50 +1,152 @@
 """Web search tools for retrieving information from the internet.
 
 This module provides functionality for performing web searches using the Brave Search API.
-It includes utilities for executing searches and formatting the results into markdown.
+It includes utilities for executing searches and formatting the results compactly,
+within a token budget, for the LLM.
 The main entry point is the `websearch` function which is wrapped as a Tool.
 """
 
+import asyncio
+import json
+from typing import Iterator
+
+from pydantic import Field
 from pydantic_ai import Tool
+from pydantic_settings import BaseSettings
 
+from websearch import iocache
+from websearch.metrics import metrics
+from websearch.retrieval.snippets import clean_snippet
 from websearch.root_logger import root_logger
-from websearch.tools.bravesearch.client import BraveSearchClient
+from websearch.runcontext import current_run, deadline
+from websearch.tokens import estimate_tokens, tokens_to_chars
+from websearch.tools.bravesearch.client import BraveSearchClient, Result
 
 logger = root_logger.getChild(__name__)
 
 
-def mardownify(obj: dict) -> str:
-    """Simple heuristic to convert a dict to a markdown string.
+class WebSearchSettings(BaseSettings):
+    """Configuration of the websearch tool output.
+
+    Attributes:
+        max_tokens: Token budget of the search results sent to the LLM.
+        snippet_chars: Maximum length of the snippet of a result.
+    """
+
+    max_tokens: int = Field(alias="SEARCH_TOOL_MAX_TOKENS", default=1000)
+    snippet_chars: int = Field(alias="SEARCH_TOOL_SNIPPET_CHARS", default=300)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+websearch_settings = WebSearchSettings()
+
+DEFAULT_RESULTS = 3
+"""Number of results of a search when the caller does not choose it."""
+
+RESULT_TYPES = ("faq", "infobox", "web", "news", "videos", "discussion")
+"""Result types kept in the tool output, in order of priority."""
+
+
+def _entries(data: dict) -> Iterator[tuple[str, dict]]:
+    for kind in RESULT_TYPES:
+        for result in (data.get(kind) or {}).get("results") or []:
+            if kind == "discussion":
+                result = result.get("data") or result
+            yield kind, result
+
+
+def format_results(
+    data: dict,
+    *,
+    max_tokens: int | None = None,
+    snippet_chars: int | None = None,
+) -> str:
+    """Format search results compactly for an LLM.
 
-    First layer of keys are # headers.
-    Second layer of keys are ## headers and so on.
-    Lists are converted to bullet points.
+    Only the type, title, URL, age and snippet of each result are kept, one
+    result after the other until the token budget is used.
 
     Args:
-        obj: The dictionary to convert to markdown
+        data: The search response, as returned by `BraveSearchClient.search`.
+        max_tokens: Token budget of the output. Defaults to the settings.
+        snippet_chars: Maximum length of a snippet. Defaults to the settings.
 
     Returns:
-        A formatted markdown string representation of the input dictionary
+        str: The formatted results.
     """
-    markdown = ""
-    for key, value in obj.items():
-        if isinstance(value, dict):
-            markdown += f"## {key}\n"
-            markdown += mardownify(value)
-        elif isinstance(value, list):
-            markdown += f"## {key}\n"
-            for item in value:
-                markdown += f"- {mardownify(item)}\n"
-        else:
-            markdown += f"{key}: {value}\n"
-    return markdown
+    budget = tokens_to_chars(max_tokens or websearch_settings.max_tokens)
+    snippet_chars = snippet_chars or websearch_settings.snippet_chars
+
+    lines = []
+    size = 0
+    omitted = 0
+    for kind, result in _entries(data):
+        title = clean_snippet(result.get("title") or result.get("question") or "")
+        snippet = clean_snippet(
+            result.get("description")
+            or result.get("answer")
+            or result.get("top_comment")
+            or ""
+        )
+        if len(snippet) > snippet_chars:
+            snippet = snippet[:snippet_chars].rsplit(" ", 1)[0] + "…"
+
+        entry = f"[{kind}] {title}"
+        if result.get("url"):
+            entry += f" <{result['url']}>"
+        if result.get("age"):
+            entry += f" ({result['age']})"
+        if snippet:
+            entry += f"\n{snippet}"
+
+        if size + len(entry) > budget and lines:
+            omitted += 1
+            continue
+        lines.append(entry)
+        size += len(entry) + 1
+
+    if omitted:
+        lines.append(f"({omitted} more results omitted)")
+    return "\n".join(lines)
+
+
+async def search(query: str, limit_results: int = DEFAULT_RESULTS) -> Result | None:
+    """Search the web, charging the run budget unless the search is cached.
+
+    Args:
+        query: The query to search for
+        limit_results: The number of results to return
+
+    Returns:
+        The result of the brave search client, None if the search budget of
+        the run is exhausted or the search did not answer before the deadline.
+    """
+    client = BraveSearchClient()
+
+    # Searches served from the cache are free, only new ones use the budget.
+    key = BraveSearchClient.search.__cache_key__(client, query, limit_results)
+    if key not in iocache.cache and not current_run().budget.try_search():
+        logger.info(f"💸 Search budget exhausted, skipping: {query}")
+        return None
+
+    try:
+        async with deadline():
+            return await asyncio.to_thread(client.search, query, limit_results)
+    except TimeoutError:
+        # The thread runs on and caches the results for a later run.
+        logger.warning(f"⏰ Search timed out: {query}")
+        metrics.incr("deadline.searches")
+        return None
 
 
 # Returns a list of links
-def websearch(
+async def websearch(
     query: str,
     *,
-    limit_results: int = 3,
+    limit_results: int = DEFAULT_RESULTS,
 ) -> list[dict] | str:
     """Search the web for information about a specific query.
 
@@ -53,32 +155,36 @@ def websearch(
         limit_results: The number of results to return
 
     Returns:
-        A markdown formatted response from the brave search client or an error message.
-        The successful response contains information from various result types:
-            - discussion: A list of discussion results
-            - faq: A list of FAQ results
-            - locations: A list of location results
-            - mixed: A list of mixed results
-            - news: A list of news results
-            - videos: A list of video results
-            - web: A list of web results with the links
+        The results of the brave search client, formatted by `format_results`, or
+        an error message. Each result has its type (faq, infobox, web, news,
+        videos or discussion), title, URL, age and snippet.
     """
-    client = BraveSearchClient()
-    result = client.search(query, limit_results)
+    result = await search(query, limit_results)
+
+    if result is None:
+        return "The search budget is exhausted. Use the results you already have."
 
     if result["error"]:
         return result["error"]
 
-    result = result["data"]
-    result_str = mardownify(result)
-    logger.info(f"Brave Search Result: {result_str}")
+    result_str = format_results(result["data"])
+
+    # The output is sent again on every following turn of the explorer agent.
+    tokens_before = estimate_tokens(json.dumps(result["data"]))
+    tokens_after = estimate_tokens(result_str)
+    metrics.observe("websearch.tool_tokens", tokens_after)
+    metrics.incr("websearch.tool_tokens_saved", tokens_before - tokens_after)
+    logger.info(
+        f"Brave Search Result: ~{tokens_after} tokens "
+        f"(~{tokens_before} in the raw response)\n{result_str}"
+    )
     return result_str
 
 
 WebSearchTool = Tool(
     websearch,
     name="websearch",
-    description="websearch tool. Returns a JSON response from the brave search client.",
+    description="websearch tool. Returns the title, URL, age and snippet of the results.",
     takes_ctx=False,
     max_retries=3,
 )
@@ -0,0 +1,83 @@
+"""URL helpers.
+
+This module provides URL normalization, used to recognize the same page when
+it is returned by different searches with different tracking parameters,
+fragments or host casing.
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {
+    "_ga",
+    "_gl",
+    "dclid",
+    "fbclid",
+    "gclid",
+    "gclsrc",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "msclkid",
+    "ref_src",
+    "spm",
+    "yclid",
+}
+"""Query parameters that do not change the content of a page.
+
+'ref' is not one of them: it selects a branch or a version on many sites.
+"""
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking_param(name: str) -> bool:
+    """Check if a query parameter is only used for tracking.
+
+    Args:
+        name: The name of the query parameter.
+
+    Returns:
+        bool: True if the parameter can be dropped.
+    """
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith("utm_")
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so that equivalent URLs compare equal.
+
+    The scheme and host are lowercased, default ports, fragments and tracking
+    query parameters are removed, and an empty path becomes "/".
+
+    Args:
+        url: The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = urlencode(
+        [
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not is_tracking_param(k)
+        ]
+    )
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def url_host(url: str) -> str:
+    """Get the lowercased host of a URL.
+
+    Args:
+        url: The URL.
+
+    Returns:
+        str: The host of the URL, without port.
+    """
+    return (urlsplit(url).hostname or "").lower()
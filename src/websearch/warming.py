@@ -0,0 +1,214 @@
+"""Cache warming for anticipated questions.
+
+This module precomputes the work of the runs expected for a list of questions,
+e.g. the questions of a scheduled report or the most frequent questions, so
+that their runs find everything in the cache but the synthesis:
+
+- the search queries generated for the question, in the LLM cache,
+- the searches of the queries, in the search cache,
+- the pages the explorer selects from the results, in the page cache.
+
+The questions are planned as the planner plans them in an idle process, and the
+pages are selected by the ranker of the 'search' explorer, so the cache keys are
+those of the later runs. The syntetizer is never run.
+
+The job runs a bounded number of questions at a time, spaces out the searches
+not served from the cache to respect the rate limit of the search API, and stops
+searching and fetching when its budget is exhausted.
+"""
+
+import asyncio
+import time
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch import iocache
+from websearch.budget import Budget
+from websearch.metrics import metrics
+from websearch.nodes.explorer import explorer_settings, select_pages
+from websearch.nodes.explorer import fetch_pages as fetch_page_texts
+from websearch.nodes.querygen import querygen, querygen_cache_key
+from websearch.planner import plan, remember_queries
+from websearch.root_logger import root_logger
+from websearch.runcontext import RunContext, reset_run, set_run
+from websearch.tools.bravesearch.client import BraveSearchClient
+from websearch.tools.directanswer import fast_path_settings, structured_answers
+from websearch.tools.websearch import DEFAULT_RESULTS, search
+
+logger = root_logger.getChild(__name__)
+
+
+class WarmingSettings(BaseSettings):
+    """Configuration of the cache warming.
+
+    Attributes:
+        concurrency: Maximum number of questions, queries or pages warmed at
+            a time.
+        searches_per_second: Maximum rate of the searches not served from the
+            cache, 0 for no limit.
+        max_searches: Maximum number of searches of a job, None for no limit.
+        max_fetches: Maximum number of page fetches of a job, None for no limit.
+        max_tokens: Maximum number of LLM tokens of a job, None for no limit.
+        llm_ttl: Seconds the generated queries are cached.
+    """
+
+    concurrency: int = Field(alias="WARMING_CONCURRENCY", default=4)
+    searches_per_second: float = Field(alias="WARMING_SEARCHES_PER_SECOND", default=1)
+    max_searches: int | None = Field(alias="WARMING_MAX_SEARCHES", default=None)
+    max_fetches: int | None = Field(alias="WARMING_MAX_FETCHES", default=None)
+    max_tokens: int | None = Field(alias="WARMING_MAX_TOKENS", default=None)
+    llm_ttl: float = Field(alias="WARMING_LLM_TTL", default=60 * 60 * 24)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+warming_settings = WarmingSettings()
+
+
+class RateLimiter:
+    """Space out operations to a maximum rate."""
+
+    def __init__(self, rate: float):
+        """Initialize the limiter.
+
+        Args:
+            rate: Maximum number of operations per second, 0 for no limit.
+        """
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        """Wait for the next slot of the rate."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+async def warm_questions(
+    questions: list[str],
+    *,
+    queries: dict[str, list[str]] | None = None,
+    explorer: Literal["agent", "search"] | None = None,
+    fetch_pages: bool = True,
+    settings: WarmingSettings = warming_settings,
+) -> dict[str, int | str | None]:
+    """Warm the caches for the runs of the given questions.
+
+    Args:
+        questions: The anticipated questions.
+        queries: Search queries already generated for some of the questions,
+            which are remembered for the questions instead of generated.
+        explorer: The explorer of the anticipated runs, whose searches are
+            warmed. Defaults to the `EXPLORER_MODE` setting.
+        fetch_pages: Whether to fetch the selected pages.
+        settings: The warming configuration.
+
+    Returns:
+        dict[str, int | str | None]: The number of 'questions' warmed, of
+            'queries' searched and of distinct 'pages' fetched, the 'searches',
+            'fetches' and 'tokens' used, and the limit of the budget
+            'exhausted', if any.
+    """
+    queries = queries or {}
+    mode = explorer or explorer_settings.mode
+    limiter = RateLimiter(settings.searches_per_second)
+    slots = asyncio.Semaphore(settings.concurrency)
+    client = BraveSearchClient()
+    counts = {"questions": 0, "queries": 0}
+    warmed_pages = set()
+
+    async def warm_search(query: str) -> dict | None:
+        # The agent explorer and the fast path search with the default count.
+        count = explorer_settings.search_count if mode == "search" else DEFAULT_RESULTS
+        if (
+            BraveSearchClient.search.__cache_key__(client, query, count)
+            not in iocache.cache
+        ):
+            await limiter.wait()
+        result = await search(query, count)
+        if result is None or result["error"]:
+            return None
+        return result["data"] or {}
+
+    async def warm_query(query: str, question: str, result_limit: int) -> None:
+        async with slots:
+            data = await warm_search(query)
+        if data is None:
+            return
+        counts["queries"] += 1
+        if not fetch_pages or (
+            fast_path_settings.enabled and structured_answers(data, query)
+        ):
+            return
+        pages = select_pages(data, query, question, result_limit)
+        async with slots:
+            pages = await fetch_page_texts(pages)
+        warmed_pages.update(page.url for page in pages if page.text)
+
+    async def warm_question(question: str) -> None:
+        fanout = plan(question, fetch_pages=fetch_pages, idle=True)
+        question_queries = queries.get(question)
+        if question_queries:
+            remember_queries(question, question_queries)
+        else:
+            async with slots:
+                update = await querygen(
+                    {"user_query": question, "num_queries": fanout.num_queries}
+                )
+            if update.get("error") or not update.get("queries"):
+                logger.warning(f"🔥 No queries generated for '{question}'")
+                return
+            question_queries = update["queries"]
+            iocache.cache.set(
+                querygen_cache_key(question, fanout.num_queries),
+                question_queries,
+                expire=settings.llm_ttl,
+                tag="llm",
+            )
+
+        await asyncio.gather(
+            *(
+                warm_query(query, question, fanout.result_limit)
+                for query in question_queries
+            )
+        )
+        counts["questions"] += 1
+        metrics.incr("warming.questions")
+
+    run = RunContext(
+        budget=Budget(
+            max_tokens=settings.max_tokens,
+            max_searches=settings.max_searches,
+            max_fetches=settings.max_fetches,
+        )
+    )
+    token = set_run(run)
+    try:
+        results = await asyncio.gather(
+            *map(warm_question, questions), return_exceptions=True
+        )
+    finally:
+        run.fetcher.cancel()
+        reset_run(token)
+
+    for question, result in zip(questions, results):
+        if isinstance(result, Exception):
+            logger.error(f"🔥 Warming failed for '{question}': {result}")
+    usage = run.budget.to_dict()
+    report = {
+        **counts,
+        "pages": len(warmed_pages),
+        "searches": usage["searches"],
+        "fetches": usage["fetches"],
+        "tokens": usage["tokens"],
+        "exhausted": run.budget.exhausted(),
+    }
+    logger.info(f"🔥 Warmed {counts['questions']}/{len(questions)} questions: {report}")
+    return report
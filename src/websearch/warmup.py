@@ -0,0 +1,217 @@
+"""Model warmup and keep-alive.
+
+A local Ollama server loads a model on its first request and unloads it after
+a few idle minutes, so the first query after a pause pays the model load time.
+This module provides a warmer that preloads the Ollama models used by the
+agents of the `AppContext`, keeps them resident with periodic minimal
+completions while the process receives queries, and reports whether the models
+are ready, so a load balancer can route queries only to warmed instances.
+Instances that went idle stay routable, their next query warms them again.
+
+Providers other than Ollama are always ready and never pinged.
+"""
+
+import asyncio
+import time
+from typing import Literal
+
+import requests
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.metrics import metrics
+from websearch.modelcontext import AppContext, ctx
+from websearch.root_logger import root_logger
+
+logger = root_logger.getChild(__name__)
+
+
+class WarmupSettings(BaseSettings):
+    """Configuration of the model warmer.
+
+    Attributes:
+        enabled: Whether to warm the model and keep it resident.
+        timeout: Seconds a warmup request may take, including the model load.
+        retry_interval: Seconds between two failed warmup attempts.
+        keepalive_interval: Seconds between two keep-alive pings. Must be
+            shorter than the keep-alive of the Ollama server, 5 minutes by
+            default.
+        keepalive_idle: Seconds without queries after which the pings stop and
+            the model may unload. 0 keeps the model resident forever.
+    """
+
+    enabled: bool = Field(alias="WARMUP_ENABLED", default=True)
+    timeout: float = Field(alias="WARMUP_TIMEOUT", default=120.0)
+    retry_interval: float = Field(alias="WARMUP_RETRY_INTERVAL", default=5.0)
+    keepalive_interval: float = Field(alias="KEEPALIVE_INTERVAL", default=120.0)
+    keepalive_idle: float = Field(alias="KEEPALIVE_IDLE", default=30 * 60)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+warmup_settings = WarmupSettings()
+
+
+class Warmer:
+    """Preload the models and keep them resident while there is traffic.
+
+    Args:
+        context: The model context of the application.
+        settings: The warmer configuration.
+    """
+
+    def __init__(
+        self, context: AppContext = ctx, settings: WarmupSettings = warmup_settings
+    ):
+        """Initialize the warmer.
+
+        Args:
+            context: The model context of the application.
+            settings: The warmer configuration.
+        """
+        self.context = context
+        self.settings = settings
+        self.state: Literal["cold", "warming", "ready", "idle"] = (
+            "cold" if self.needed else "ready"
+        )
+        self.last_traffic: float | None = None
+        self.last_ping: float | None = None
+        self._loop = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def needed(self) -> bool:
+        """Whether an agent uses an Ollama model."""
+        return self.settings.enabled and bool(self.context.ollama_models())
+
+    @property
+    def ready(self) -> bool:
+        """Whether queries can be routed here.
+
+        An idle instance stays routable although its models may have unloaded:
+        no query would otherwise reach it to restart the warmer.
+        """
+        return self.state in ("ready", "idle")
+
+    def status(self) -> dict:
+        """Describe the state of the warmer.
+
+        Returns:
+            dict: The state, readiness, models and seconds since the last ping.
+        """
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "models": self.context.ollama_models(),
+            "last_ping": (
+                round(time.monotonic() - self.last_ping, 1)
+                if self.last_ping is not None
+                else None
+            ),
+        }
+
+    def ping(self) -> bool:
+        """Send a minimal completion request to the models, loading them if needed.
+
+        Returns:
+            bool: True if every model answered.
+        """
+        start = time.monotonic()
+        url = f"{self.context.ollama_base_url.rstrip('/')}/chat/completions"
+        try:
+            for model in self.context.ollama_models():
+                response = requests.post(
+                    url,
+                    json={
+                        "model": model,
+                        "messages": [{"role": "user", "content": "ping"}],
+                        "max_tokens": 1,
+                    },
+                    timeout=self.settings.timeout,
+                )
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"🔥 Model ping failed: {e}")
+            metrics.incr("warmup.ping_failures")
+            return False
+
+        self.last_ping = time.monotonic()
+        metrics.observe("warmup.ping_seconds", self.last_ping - start)
+        return True
+
+    async def warm(self) -> None:
+        """Load the model, retrying until it answers."""
+        self.state = "warming"
+        start = time.monotonic()
+        models = ", ".join(self.context.ollama_models())
+        logger.info(f"🔥 Warming up {models}")
+        while not await asyncio.to_thread(self.ping):
+            await asyncio.sleep(self.settings.retry_interval)
+        self.state = "ready"
+        logger.info(f"🔥 {models} ready in {time.monotonic() - start:.1f}s")
+
+    def _idle(self) -> bool:
+        if not self.settings.keepalive_idle:
+            return False
+        if self.last_traffic is None:
+            return False
+        return time.monotonic() - self.last_traffic > self.settings.keepalive_idle
+
+    async def run(self) -> None:
+        """Warm the model, then keep it resident until the traffic stops."""
+        await self.warm()
+        while True:
+            await asyncio.sleep(self.settings.keepalive_interval)
+            if self._idle():
+                logger.info("🔥 No traffic, letting the models unload")
+                self.state = "idle"
+                return
+            if not await asyncio.to_thread(self.ping):
+                await self.warm()
+
+    def start(self) -> None:
+        """Start warming in the background, unless already running."""
+        if not self.needed:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or loop is not self._loop:
+            self._loop = loop
+            self._task = loop.create_task(self.run())
+
+    def touch(self) -> None:
+        """Record traffic, restarting the warmer if it stopped."""
+        self.last_traffic = time.monotonic()
+        self.start()
+
+    async def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait until the model is ready.
+
+        Args:
+            timeout: Maximum number of seconds to wait, None to wait forever.
+
+        Returns:
+            bool: Whether the model is ready.
+        """
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def stop(self) -> None:
+        """Stop the background warming and keep-alive."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+warmer = Warmer()
+"""The warmer of the model configured for the process."""
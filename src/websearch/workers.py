@@ -0,0 +1,306 @@
+"""Multi-process execution of web search runs.
+
+A process runs everything in one event loop, and the page text extraction
+keeps the GIL busy, so one process tops out at about one core. This module
+provides a pool of worker processes, each with its own graph, agents and event
+loop, and a dispatcher distributing `query.exec` runs between them and
+streaming their events back.
+
+The workers share what is already shared between processes: the `diskcache`
+caches of `iocache`, which are multi-process safe, and a single browser, the
+`BrowserService`, their browser pools connect to. Everything else, e.g. the
+fetch scheduler limits and the metrics, is per worker.
+
+Identical questions in flight are dispatched to the same worker, where the
+`coalescer` shares their run; other runs go to the least loaded worker.
+
+Example:
+    ```python
+    async with WorkerPool(4) as pool:
+        async for event in pool.exec("What is quantum computing?"):
+            print(event)
+    ```
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from websearch.coalesce import Coalescer, coalescer
+from websearch.root_logger import root_logger
+from websearch.tools.browserpool import BrowserService, browser_pool
+
+logger = root_logger.getChild(__name__)
+
+
+class WorkerSettings(BaseSettings):
+    """Configuration of the worker pool.
+
+    Attributes:
+        workers: Number of worker processes. Defaults to the number of cores.
+        shared_browser: Whether the workers share one browser instead of
+            launching one each.
+        shutdown_timeout: Seconds a worker has to exit before it is killed.
+    """
+
+    workers: int | None = Field(alias="WORKERS", default=None)
+    shared_browser: bool = Field(alias="WORKER_SHARED_BROWSER", default=True)
+    shutdown_timeout: float = Field(alias="WORKER_SHUTDOWN_TIMEOUT", default=10.0)
+    model_config = {
+        "env_file": ".env",
+        "extra": "allow",
+    }
+
+
+worker_settings = WorkerSettings()
+
+
+class WorkerError(RuntimeError):
+    """A run failed in a worker process, or the worker died."""
+
+
+def _worker_main(
+    jobs: multiprocessing.Queue,
+    events: multiprocessing.Queue,
+    initializer: Callable[[], None] | None,
+    cdp_endpoint: str | None,
+) -> None:
+    if initializer is not None:
+        initializer()
+    asyncio.run(_serve(jobs, events, cdp_endpoint))
+
+
+async def _serve(
+    jobs: multiprocessing.Queue,
+    events: multiprocessing.Queue,
+    cdp_endpoint: str | None,
+) -> None:
+    if cdp_endpoint:
+        browser_pool.settings.cdp_endpoint = cdp_endpoint
+    await browser_pool.start()
+
+    tasks: dict[int, asyncio.Task] = {}
+    loop = asyncio.get_running_loop()
+    while (message := await loop.run_in_executor(None, jobs.get)) is not None:
+        kind, job_id, payload = message
+        if kind == "cancel":
+            if job_id in tasks:
+                tasks[job_id].cancel()
+            continue
+        task = asyncio.create_task(_run(events, job_id, *payload))
+        tasks[job_id] = task
+        task.add_done_callback(lambda _, job_id=job_id: tasks.pop(job_id, None))
+
+    for task in list(tasks.values()):
+        task.cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    await browser_pool.close()
+
+
+async def _run(
+    events: multiprocessing.Queue,
+    job_id: int,
+    question: str,
+    options: dict[str, Any],
+) -> None:
+    try:
+        async for event in coalescer.exec(question, **options):
+            events.put((job_id, "event", event))
+    except asyncio.CancelledError:
+        events.put((job_id, "done", None))
+        raise
+    except Exception as e:
+        logger.error(f"Run {job_id} failed: {e}")
+        events.put((job_id, "error", f"{type(e).__name__}: {e}"))
+    else:
+        events.put((job_id, "done", None))
+
+
+@dataclass
+class Worker:
+    """A worker process and its job queue.
+
+    Attributes:
+        process: The worker process.
+        jobs: The queue of the jobs sent to the worker.
+        load: Number of runs in flight in the worker.
+    """
+
+    process: multiprocessing.Process
+    jobs: multiprocessing.Queue
+    load: int = 0
+
+
+class WorkerPool:
+    """Run queries in a pool of worker processes.
+
+    Args:
+        workers: Number of worker processes. Defaults to the `WORKERS` setting,
+            else the number of cores.
+        initializer: Function called in every worker before it serves runs,
+            e.g. to configure or patch the pipeline. Must be picklable.
+        settings: The worker pool configuration.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        initializer: Callable[[], None] | None = None,
+        settings: WorkerSettings = worker_settings,
+    ):
+        """Initialize the pool.
+
+        Args:
+            workers: Number of worker processes. Defaults to the `WORKERS`
+                setting, else the number of cores.
+            initializer: Function called in every worker before it serves runs.
+            settings: The worker pool configuration.
+        """
+        self.size = workers or settings.workers or os.cpu_count() or 1
+        self.initializer = initializer
+        self.settings = settings
+        self.workers: list[Worker] = []
+        self._ids = itertools.count()
+        self._jobs: dict[int, asyncio.Queue] = {}
+        # key of the runs in flight -> worker running them and number of callers
+        self._keys: dict[tuple, list] = {}
+        self._loop = None
+        self._events = None
+        self._reader = None
+        self._browser: BrowserService | None = None
+
+    async def start(self) -> None:
+        """Start the worker processes, and the shared browser if enabled."""
+        context = multiprocessing.get_context("spawn")
+        cdp_endpoint = None
+        if self.settings.shared_browser:
+            self._browser = BrowserService()
+            cdp_endpoint = await self._browser.start()
+
+        self._loop = asyncio.get_running_loop()
+        self._events = context.Queue()
+        for i in range(self.size):
+            jobs = context.Queue()
+            process = context.Process(
+                target=_worker_main,
+                args=(jobs, self._events, self.initializer, cdp_endpoint),
+                name=f"websearch-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self.workers.append(Worker(process, jobs))
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        logger.info(f"👷 Started {self.size} workers")
+
+    def _read(self) -> None:
+        # Forward the events of the workers to the loop of the dispatcher.
+        while (message := self._events.get()) is not None:
+            self._loop.call_soon_threadsafe(self._deliver, *message)
+
+    def _deliver(self, job_id: int, kind: str, payload: Any) -> None:
+        queue = self._jobs.get(job_id)
+        if queue is not None:
+            queue.put_nowait((kind, payload))
+
+    def _choose(self, key: tuple) -> Worker:
+        entry = self._keys.get(key)
+        if entry is not None and entry[0].process.is_alive():
+            entry[1] += 1
+            return entry[0]
+        worker = min(
+            (w for w in self.workers if w.process.is_alive()),
+            key=lambda w: w.load,
+            default=None,
+        )
+        if worker is None:
+            raise WorkerError("No worker process is alive")
+        self._keys[key] = [worker, 1]
+        return worker
+
+    def _release(self, key: tuple) -> None:
+        entry = self._keys[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._keys[key]
+
+    async def exec(self, question: str, **options) -> AsyncIterator[dict[str, Any]]:
+        """Execute a query in a worker and stream its results.
+
+        Args:
+            question: The user question.
+            **options: The options of `query.exec`.
+
+        Yields:
+            dict[str, Any]: The events of `query.exec`.
+
+        Raises:
+            WorkerError: If the run failed or its worker died.
+        """
+        key = Coalescer.key(
+            question, {k: v for k, v in options.items() if k != "budget"}
+        )
+        worker = self._choose(key)
+        job_id = next(self._ids)
+        queue = asyncio.Queue()
+        self._jobs[job_id] = queue
+        worker.load += 1
+        finished = False
+        try:
+            worker.jobs.put(("run", job_id, (question, options)))
+            while True:
+                try:
+                    kind, payload = await asyncio.wait_for(queue.get(), timeout=1)
+                except TimeoutError:
+                    if not worker.process.is_alive():
+                        finished = True
+                        raise WorkerError(f"{worker.process.name} died")
+                    continue
+                if kind == "event":
+                    yield payload
+                    continue
+                finished = True
+                if kind == "error":
+                    raise WorkerError(payload)
+                return
+        finally:
+            del self._jobs[job_id]
+            worker.load -= 1
+            self._release(key)
+            if not finished:
+                worker.jobs.put(("cancel", job_id, None))
+
+    async def close(self) -> None:
+        """Stop the workers and the shared browser."""
+        for worker in self.workers:
+            worker.jobs.put(None)
+        for worker in self.workers:
+            await asyncio.to_thread(worker.process.join, self.settings.shutdown_timeout)
+            if worker.process.is_alive():
+                logger.warning(f"Killing {worker.process.name}")
+                worker.process.kill()
+        self.workers = []
+        if self._events is not None:
+            self._events.put(None)
+            await asyncio.to_thread(self._reader.join)
+            self._events = None
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+
+    async def __aenter__(self) -> "WorkerPool":
+        """Start the pool."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        """Stop the pool."""
+        await self.close()
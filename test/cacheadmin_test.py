@@ -0,0 +1,114 @@
+"""Tests for the cache administration tools, on a temporary cache."""
+
+import asyncio
+import time
+
+import diskcache
+import pytest
+
+from websearch import cacheadmin
+from websearch.tools import navigatelinks
+
+
+@pytest.fixture
+def cache(cache):
+    """The temporary cache, with entries of every namespace."""
+    cache.set(("search", "python", 10), {"data": "results"}, tag="search")
+    cache.set(
+        ("page", "https://docs.python.org/3/", False, None, None),
+        {"url": "https://docs.python.org/3/", "text": "python docs"},
+        tag="pages",
+    )
+    cache.set(
+        ("page", "https://example.com/a", False, None, None),
+        {"url": "https://example.com/a", "text": "a"},
+        tag="pages",
+    )
+    cache.set(("content", "ab12"), "page text", tag="content")
+    cache.set(("plan", "what is python"), ["python"], tag="plans")
+    cache.set("untagged", "value")
+    cache.set(("llm", "expired"), ["q"], tag="llm", expire=0.01)
+    time.sleep(0.02)
+    return cache
+
+
+def test_stats(cache):
+    """Entries are counted per namespace."""
+    stats = cacheadmin.stats(cache)
+    assert stats["search"]["entries"] == 1
+    assert stats["pages"]["entries"] == 3
+    assert stats["llm"] == {"entries": 2, "expired": 1, "bytes": stats["llm"]["bytes"]}
+    assert stats["other"]["entries"] == 1
+    assert stats["total"]["entries"] == 7
+    assert stats["pages"]["bytes"] > 0
+
+
+def test_purge_namespace(cache):
+    """A namespace purge removes all its tags."""
+    assert cacheadmin.purge(namespace="pages", cache=cache) == 3
+    assert cacheadmin.stats(cache)["pages"]["entries"] == 0
+    assert cacheadmin.stats(cache)["search"]["entries"] == 1
+
+
+def test_purge_domain(cache):
+    """A domain purge removes the entries of its URLs and subdomains."""
+    assert cacheadmin.purge(domain="python.org", cache=cache) == 1
+    assert ("page", "https://example.com/a", False, None, None) in cache
+
+
+def test_purge_age(cache):
+    """An age purge removes the entries stored before the cutoff."""
+    assert cacheadmin.purge(older_than=3600, cache=cache) == 0
+    time.sleep(0.05)
+    assert cacheadmin.purge(namespace="search", older_than=0.01, cache=cache) == 1
+    with pytest.raises(ValueError):
+        cacheadmin.purge(cache=cache)
+
+
+def test_parse_age():
+    """Ages are seconds, with an optional unit."""
+    assert cacheadmin.parse_age("90") == 90
+    assert cacheadmin.parse_age("12h") == 12 * 3600
+    assert cacheadmin.parse_age("7d") == 7 * 86400
+    with pytest.raises(ValueError):
+        cacheadmin.parse_age("week")
+
+
+def test_export_import(cache, tmp_path):
+    """Exported live entries are imported with their tags."""
+    path = str(tmp_path / "warm.cache")
+    assert cacheadmin.export_cache(path, namespaces=["pages", "llm"], cache=cache) == 4
+
+    target = diskcache.FanoutCache(directory=str(tmp_path / "target"))
+    assert cacheadmin.import_cache(path, cache=target) == 4
+    assert target.get(("content", "ab12"), tag=True) == ("page text", "content")
+    assert cacheadmin.stats(target)["pages"]["entries"] == 3
+    target.close()
+
+
+def test_page_cache(monkeypatch, cache):
+    """Fetched pages are cached and served without fetching again."""
+    fetched = []
+
+    async def navigate(url, **kwargs):
+        fetched.append(url)
+        return {"url": url, "text": "text", "truncated": False}
+
+    monkeypatch.setattr(navigatelinks, "_navigate", navigate)
+
+    async def run():
+        first = await navigatelinks.navigate_link("https://example.org/page")
+        second = await navigatelinks.navigate_link("https://EXAMPLE.org/page#top")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert fetched == ["https://example.org/page"]
+    assert cacheadmin.purge(domain="example.org", cache=cache) == 1
+
+
+def test_unsupported_cache(tmp_path):
+    """A cache without the expected diskcache internals fails loudly."""
+    with diskcache.Cache(str(tmp_path / "single")) as single:
+        with pytest.raises(RuntimeError, match="Unsupported diskcache"):
+            list(cacheadmin.entries(single))
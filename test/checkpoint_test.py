@@ -0,0 +1,107 @@
+"""Tests for the bounded in-memory checkpointer and the resumed runs."""
+
+import asyncio
+import time
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from websearch import query
+from websearch.agents.explorer import explorerAgent
+from websearch.agents.querygen import querygenAgent
+from websearch.agents.syntetizer import syntetizerAgent
+from websearch.checkpoint import BoundedMemorySaver
+from websearch.tools.directanswer import fast_path_settings
+
+
+class State(TypedDict):
+    """State of the test graph."""
+
+    value: int
+
+
+def build(saver):
+    """Compile a one node graph with a checkpointer."""
+    builder = StateGraph(State)
+    builder.add_node("inc", lambda state: {"value": state["value"] + 1})
+    builder.add_edge(START, "inc")
+    builder.add_edge("inc", END)
+    return builder.compile(checkpointer=saver)
+
+
+def run(graph, thread_id):
+    """Run the graph in a thread."""
+    return graph.invoke({"value": 0}, {"configurable": {"thread_id": thread_id}})
+
+
+def test_least_recently_used_runs_are_evicted():
+    """Only the most recent `max_threads` runs are kept."""
+    saver = BoundedMemorySaver(max_threads=2, ttl=60, max_bytes=2**20)
+    graph = build(saver)
+    for thread_id in ["a", "b", "c"]:
+        run(graph, thread_id)
+
+    assert set(saver.storage) == {"b", "c"}
+    assert not any(key[0] == "a" for key in saver.blobs)
+
+
+def test_expired_runs_are_evicted():
+    """Runs unused for longer than the ttl are evicted."""
+    saver = BoundedMemorySaver(max_threads=10, ttl=0.05, max_bytes=2**20)
+    graph = build(saver)
+    run(graph, "a")
+    size = saver.size
+    time.sleep(0.1)
+    run(graph, "b")
+
+    assert saver.get_tuple({"configurable": {"thread_id": "a"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "b"}}) is not None
+    # Only the bytes of "b" are left, about as many as those of "a".
+    assert 0 < saver.size < 1.5 * size
+
+
+def test_resume_failed_run(monkeypatch, cache, model):
+    """A resumed run restarts at the failed node, a finished one replays its answer."""
+    monkeypatch.setattr(fast_path_settings, "enabled", False)
+    calls = {"explorer": 0, "syntetizer": 0}
+
+    def explore(prompt):
+        calls["explorer"] += 1
+        return {
+            "pages": [{"url": "https://example.com", "category": "web", "content": "c"}]
+        }
+
+    def synthesize(prompt):
+        calls["syntetizer"] += 1
+        if calls["syntetizer"] == 1:
+            raise RuntimeError("model unavailable")
+        return {"answer": "answer", "sources": [], "error": None}
+
+    async def collect(question, **kwargs):
+        return [event async for event in query.exec(question, **kwargs)]
+
+    async def run():
+        with (
+            querygenAgent.override(model=model(lambda _: {"queries": ["a", "b"]})),
+            explorerAgent.override(model=model(explore)),
+            syntetizerAgent.override(model=model(synthesize)),
+        ):
+            events = []
+            with pytest.raises(RuntimeError, match="model unavailable"):
+                async for event in query.exec("Why?"):
+                    events.append(event)
+            thread_id = events[0]["thread_id"]
+            explored = calls["explorer"]
+            resumed = await collect("Why?", thread_id=thread_id)
+            finished = await collect("Why?", thread_id=thread_id)
+            with pytest.raises(ValueError, match="another question"):
+                await collect("Why not?", thread_id=thread_id)
+            return explored, resumed, finished
+
+    explored, resumed, finished = asyncio.run(run())
+    assert explored
+    assert calls["explorer"] == explored
+    assert [e["answer"] for e in resumed if "answer" in e] == ["answer"]
+    assert finished[1] == {"answer": "answer", "sources": [], "path": "explorer"}
+    assert calls["syntetizer"] == 2
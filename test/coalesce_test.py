@@ -0,0 +1,172 @@
+"""Tests for the coalescing of identical concurrent queries."""
+
+import asyncio
+
+import pytest
+
+from websearch.coalesce import Coalescer, CoalesceSettings
+
+
+class FakeExec:
+    """Executor yielding a few events, counting its runs."""
+
+    def __init__(
+        self, *, delay: float = 0.05, fail: bool = False, path: str = "explorer"
+    ):
+        """Initialize the executor."""
+        self.delay = delay
+        self.fail = fail
+        self.path = path
+        self.runs = 0
+        self.cancelled = 0
+
+    async def __call__(self, question, **options):  # noqa: D102
+        self.runs += 1
+        try:
+            yield {"thread_id": f"run-{self.runs}"}
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("search failed")
+            yield {"query": question}
+            await asyncio.sleep(self.delay)
+            yield {"answer": "answer", "sources": [], "path": self.path}
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def _coalescer(executor, **settings) -> Coalescer:
+    return Coalescer(executor, CoalesceSettings(**settings))
+
+
+async def _collect(coalescer, question, **options):
+    return [event async for event in coalescer.exec(question, **options)]
+
+
+def test_concurrent_queries_share_a_run():
+    """Trivially different questions share a run, late callers get a replay."""
+    executor = FakeExec()
+    coalescer = _coalescer(executor)
+
+    async def run():
+        first = asyncio.create_task(_collect(coalescer, "What is Python?"))
+        await asyncio.sleep(0.07)
+        second = asyncio.create_task(_collect(coalescer, "what is  python"))
+        other = asyncio.create_task(_collect(coalescer, "What is Rust?"))
+        return await first, await second, await other
+
+    first, second, other = asyncio.run(run())
+    assert executor.runs == 2
+    assert first == second
+    assert [next(iter(e)) for e in first] == ["thread_id", "query", "answer"]
+    assert other[0]["thread_id"] != first[0]["thread_id"]
+
+
+def test_options_are_part_of_the_key():
+    """Runs with different options are not shared."""
+    executor = FakeExec()
+    coalescer = _coalescer(executor)
+
+    async def run():
+        await asyncio.gather(
+            _collect(coalescer, "q", fetch_pages=True),
+            _collect(coalescer, "q", fetch_pages=False),
+        )
+
+    asyncio.run(run())
+    assert executor.runs == 2
+
+
+def test_answer_cache():
+    """Completed runs are replayed until they expire."""
+    executor = FakeExec(delay=0)
+    coalescer = _coalescer(executor, ANSWER_CACHE_TTL=0.2)
+
+    async def run():
+        first = await _collect(coalescer, "q")
+        cached = await _collect(coalescer, "q")
+        await asyncio.sleep(0.25)
+        expired = await _collect(coalescer, "q")
+        return first, cached, expired
+
+    first, cached, expired = asyncio.run(run())
+    assert cached == first
+    assert expired[0]["thread_id"] == "run-2"
+    assert executor.runs == 2
+
+
+def test_partial_answers_not_cached():
+    """Runs answered partially at their deadline are not replayed."""
+    executor = FakeExec(delay=0, path="partial")
+    coalescer = _coalescer(executor)
+
+    async def run():
+        await _collect(coalescer, "q")
+        await asyncio.sleep(0.01)
+        return await _collect(coalescer, "q")
+
+    assert asyncio.run(run())[0]["thread_id"] == "run-2"
+    assert executor.runs == 2
+
+
+def test_errors_reach_every_subscriber():
+    """A failed run raises for every caller and is not cached."""
+    executor = FakeExec(fail=True)
+    coalescer = _coalescer(executor)
+
+    async def run():
+        return await asyncio.gather(
+            _collect(coalescer, "q"), _collect(coalescer, "q"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(_collect(coalescer, "q"))
+    assert executor.runs == 2
+
+
+def test_run_cancelled_when_all_subscribers_leave():
+    """The shared run stops once nobody listens any more."""
+    executor = FakeExec(delay=1)
+    coalescer = _coalescer(executor)
+
+    async def run():
+        task = asyncio.create_task(_collect(coalescer, "q"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert executor.cancelled == 1
+
+
+def test_cancelled_run_not_joined():
+    """A caller arriving as the last subscriber leaves gets a run of its own."""
+    executor = FakeExec(delay=0.01)
+    coalescer = _coalescer(executor)
+
+    async def run():
+        first = coalescer.exec("q")
+        await anext(first)
+        await first.aclose()
+        return await _collect(coalescer, "q")
+
+    events = asyncio.run(run())
+    assert [event for event in events if "answer" in event]
+    assert executor.runs == 2
+
+
+def test_resumed_runs_are_not_coalesced():
+    """Runs resumed by thread id always call the executor."""
+    executor = FakeExec(delay=0)
+    coalescer = _coalescer(executor)
+
+    async def run():
+        await asyncio.gather(
+            _collect(coalescer, "q", thread_id="t"),
+            _collect(coalescer, "q", thread_id="t"),
+        )
+
+    asyncio.run(run())
+    assert executor.runs == 2
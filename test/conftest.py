@@ -0,0 +1,69 @@
+"""Test configuration.
+
+Importing `websearch` builds the agents, which requires the provider settings.
+Provide harmless defaults so the unit tests do not need a `.env` file.
+
+The caches and databases are created at import time, and the memoized functions
+are bound to the cache then: point them all to a temporary directory, so the
+fakes of the tests never leak into the cache of the real runs.
+"""
+
+import os
+import pathlib
+import tempfile
+
+os.environ.setdefault("PROVIDER", "ollama")
+os.environ.setdefault("TOGETHERAI_API_KEY", "test")
+os.environ.setdefault("TOGETHERAI_BASE_URL", "http://localhost")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+_cache_directory = tempfile.TemporaryDirectory(prefix="websearch-test-")
+_cache = pathlib.Path(_cache_directory.name)
+os.environ.setdefault("CACHE_DIRECTORY", str(_cache))
+os.environ.setdefault("CHECKPOINT_SQLITE_PATH", str(_cache / "checkpoints.sqlite"))
+os.environ.setdefault("PASSAGE_STORE_PATH", str(_cache / "passages.db"))
+
+import asyncio  # noqa: E402
+
+import diskcache  # noqa: E402
+import pytest  # noqa: E402
+from pydantic_ai.messages import ModelResponse, ToolCallPart  # noqa: E402
+from pydantic_ai.models.function import FunctionModel  # noqa: E402
+
+from websearch import iocache  # noqa: E402
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    """A temporary cache, so no planned queries are reused across tests."""
+    cache = diskcache.FanoutCache(directory=str(tmp_path / "cache"), shards=2)
+    monkeypatch.setattr(iocache, "cache", cache)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def model():
+    """Make a fake model answering every request with its result tool.
+
+    The model is asynchronous, so `respond` sees the context of the run.
+    """
+
+    def make(respond, delay: float = 0.0) -> FunctionModel:
+        """Make the model.
+
+        Args:
+            respond: Called with the last prompt, returns the tool arguments.
+            delay: Seconds to wait before answering.
+        """
+
+        async def call(messages, info):
+            await asyncio.sleep(delay)
+            prompt = messages[-1].parts[-1].content
+            return ModelResponse(
+                parts=[ToolCallPart(info.result_tools[0].name, respond(prompt))]
+            )
+
+        return FunctionModel(call)
+
+    return make
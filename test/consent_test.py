@@ -0,0 +1,104 @@
+"""Tests for the consent dismissal and the browser storage, without a browser."""
+
+import asyncio
+
+from websearch.tools.browserpool import load_storage_state, save_storage_state
+from websearch.tools.consent import ConsentSettings, dismiss_consent
+
+
+class FakeLocator:
+    """A locator over the buttons of a fake frame."""
+
+    def __init__(self, frame, selector):
+        """Initialize the locator."""
+        self.frame = frame
+        self.parts = [part.strip() for part in selector.split(",")]
+        self.first = self
+
+    def _matches(self):
+        return [part for part in self.parts if part in self.frame.buttons]
+
+    async def count(self):
+        """Count the matching buttons."""
+        return len(self._matches())
+
+    async def is_visible(self):
+        """Whether a matching button is visible."""
+        return any(self.frame.buttons[part] for part in self._matches())
+
+    async def click(self, timeout):
+        """Click the matching buttons."""
+        self.frame.clicked.extend(self._matches())
+
+
+class FakeFrame:
+    """A frame with buttons, by selector and visibility."""
+
+    def __init__(self, buttons):
+        """Initialize the frame."""
+        self.buttons = buttons
+        self.clicked = []
+
+    def locator(self, selector):
+        """Locate buttons by selector."""
+        return FakeLocator(self, selector)
+
+
+class FakePage:
+    """A page with frames."""
+
+    url = "https://example.com/"
+
+    def __init__(self, *frames):
+        """Initialize the page."""
+        self.frames = list(frames)
+
+
+SETTINGS = ConsentSettings(CONSENT_SETTLE_MS=0)
+
+
+def test_dismiss_consent():
+    """The configured choice is clicked, in the frame holding the dialog."""
+    dialog = FakeFrame(
+        {
+            "#onetrust-reject-all-handler": True,
+            "#onetrust-accept-btn-handler": True,
+        }
+    )
+    page = FakePage(FakeFrame({}), dialog)
+    assert asyncio.run(dismiss_consent(page, SETTINGS)) == "onetrust"
+    assert dialog.clicked == ["#onetrust-reject-all-handler"]
+
+
+def test_dismiss_consent_fallback():
+    """The other choice is clicked when the platform has no visible button."""
+    dialog = FakeFrame(
+        {
+            "button.sp_choice_type_13": False,
+            "button.sp_choice_type_11": True,
+        }
+    )
+    assert asyncio.run(dismiss_consent(FakePage(dialog), SETTINGS)) == "sourcepoint"
+    assert dialog.clicked == ["button.sp_choice_type_11"]
+    assert asyncio.run(dismiss_consent(FakePage(FakeFrame({})), SETTINGS)) is None
+
+
+def test_storage_state(cache):
+    """The first-party storage of a site is restored for its other pages."""
+    state = {
+        "cookies": [
+            {"name": "consent", "value": "no", "domain": ".example.com"},
+            {"name": "id", "value": "1", "domain": ".tracker.net"},
+        ],
+        "origins": [
+            {"origin": "https://www.example.com", "localStorage": []},
+            {"origin": "https://tracker.net", "localStorage": []},
+        ],
+    }
+    assert load_storage_state("https://www.example.com/a") is None
+    save_storage_state("https://www.example.com/a", state)
+
+    restored = load_storage_state("https://www.example.com/b")
+    assert [c["name"] for c in restored["cookies"]] == ["consent"]
+    assert [o["origin"] for o in restored["origins"]] == ["https://www.example.com"]
+    assert load_storage_state("https://other.example.com/") is None
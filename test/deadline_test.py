@@ -0,0 +1,95 @@
+"""Tests for the run deadline and the partial answers."""
+
+import asyncio
+import time
+
+import websearch.tools.fetchcoordinator as fetchcoordinator
+from websearch import query
+from websearch.agents.explorer import explorerAgent
+from websearch.agents.querygen import querygenAgent
+from websearch.agents.syntetizer import syntetizerAgent
+from websearch.budget import Budget, DeadlineSettings
+from websearch.tools.directanswer import fast_path_settings
+
+URL = "https://example.com/a"
+
+
+def _run(monkeypatch, model, fetch, *, querygen_delay=0.0, syntetizer_delay=0.0):
+    monkeypatch.setattr(fetchcoordinator, "navigate_link", fetch)
+    monkeypatch.setattr(fast_path_settings, "enabled", False)
+    prompts = []
+
+    def explore(prompt):
+        prompts.append(prompt)
+        return {"pages": [{"url": URL, "category": "a", "content": "snippet"}]}
+
+    answer = {"answer": "answer", "sources": [URL], "error": None}
+
+    async def run():
+        with (
+            querygenAgent.override(
+                model=model(lambda _: {"queries": ["query"]}, querygen_delay)
+            ),
+            explorerAgent.override(model=model(explore)),
+            syntetizerAgent.override(model=model(lambda _: answer, syntetizer_delay)),
+        ):
+            return [
+                event
+                async for event in query.exec(
+                    "why is the sky blue?",
+                    checkpoint=False,
+                    fetch_pages=True,
+                    timeout=1,
+                )
+            ]
+
+    start = time.monotonic()
+    events = asyncio.run(run())
+    return events, prompts, time.monotonic() - start
+
+
+async def _fetch(url, **_):
+    return {"url": url, "text": "Rayleigh scattering makes the sky blue."}
+
+
+def test_partial_answer(monkeypatch, model):
+    """Hung agents are abandoned, and the answer is built from the evidence."""
+    events, prompts, seconds = _run(
+        monkeypatch, model, _fetch, querygen_delay=30, syntetizer_delay=30
+    )
+
+    [answer] = [e for e in events if "answer" in e]
+    assert answer["path"] == "partial"
+    assert "Rayleigh scattering" in answer["answer"]
+    assert answer["sources"] == [URL]
+    assert "webserach: why is the sky blue?" in prompts[0]
+    assert seconds < 3
+
+
+def test_hung_fetch_cancelled(monkeypatch, model):
+    """A fetch not done by the deadline is skipped, then cancelled."""
+    cancelled = []
+
+    async def hang(url, **_):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+
+    events, _, seconds = _run(monkeypatch, model, hang)
+
+    [answer] = [e for e in events if "answer" in e]
+    assert answer["path"] == "explorer"
+    assert cancelled == [URL]
+    assert seconds < 3
+
+
+def test_time_left():
+    """The synthesis may use the time reserved for it, other steps may not."""
+    settings = DeadlineSettings(RUN_SYNTHESIS_RESERVE=10)
+    budget = Budget(max_seconds=60)
+    assert 49 < budget.time_left(settings=settings) <= 50
+    assert 59 < budget.time_left(synthesis=True, settings=settings) <= 60
+    assert 2 < Budget(max_seconds=4).time_left(settings=settings) <= 3
+    assert Budget().time_left() is None
@@ -0,0 +1,94 @@
+"""Tests for the direct answer fast path."""
+
+import asyncio
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+import websearch.tools.directanswer as directanswer
+import websearch.tools.fetchcoordinator as fetchcoordinator
+from websearch import query
+from websearch.agents.explorer import explorerAgent
+from websearch.agents.querygen import querygenAgent
+from websearch.tools.bravesearch.client import BraveSearchResponse
+from websearch.tools.directanswer import fast_path_settings, structured_answers
+
+RESPONSE = BraveSearchResponse.model_validate(
+    {
+        "web": {"results": []},
+        "faq": {
+            "results": [
+                {
+                    "question": "What is the carbon footprint of a Pixel 8?",
+                    "answer": "About 70 kg CO2e over its life cycle.",
+                    "title": "Pixel 8 FAQ",
+                    "url": "https://example.com/faq",
+                },
+                {
+                    "question": "How long does the Pixel 8 battery last?",
+                    "answer": "About a day.",
+                    "title": "Pixel 8 FAQ",
+                    "url": "https://example.com/battery",
+                },
+            ]
+        },
+        "infobox": {
+            "results": [
+                {
+                    "title": "Pixel 8",
+                    "url": "https://example.com/pixel",
+                    "description": "Smartphone by Google",
+                    "attributes": [["Released", "2023"], ["Weight"]],
+                }
+            ]
+        },
+    }
+).model_dump()
+
+
+def test_structured_answers():
+    """Only the answers matching the query are kept."""
+    answers = structured_answers(RESPONSE, "pixel 8 carbon footprint")
+    assert [a.url for a in answers] == [
+        "https://example.com/faq",
+        "https://example.com/pixel",
+    ]
+    assert "70 kg" in answers[0].text
+    assert "Released: 2023" in answers[1].text
+    assert structured_answers(RESPONSE, "iphone emissions") == []
+
+
+def test_direct_answer_skips_explorer_agent(monkeypatch):
+    """Structured answers are returned without the explorer and syntetizer."""
+
+    async def search(query, limit_results=3):
+        return {"data": RESPONSE, "error": None}
+
+    def unexpected(*args):
+        raise AssertionError("the agent must not be called")
+
+    def querygen(messages, info):
+        result = {"queries": ["pixel 8 carbon footprint"]}
+        return ModelResponse(parts=[ToolCallPart(info.result_tools[0].name, result)])
+
+    monkeypatch.setattr(directanswer, "search", search)
+    monkeypatch.setattr(fetchcoordinator, "navigate_link", unexpected)
+    monkeypatch.setattr(fast_path_settings, "direct", True)
+
+    async def run():
+        with (
+            querygenAgent.override(model=FunctionModel(querygen)),
+            explorerAgent.override(model=FunctionModel(unexpected)),
+        ):
+            return [
+                event
+                async for event in query.exec(
+                    "pixel 8 carbon footprint?", checkpoint=False, fetch_pages=True
+                )
+                if "answer" in event
+            ]
+
+    [event] = asyncio.run(run())
+    assert event["path"] == "direct"
+    assert "70 kg" in event["answer"]
+    assert "https://example.com/faq" in event["sources"]
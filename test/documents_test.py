@@ -0,0 +1,107 @@
+"""Tests for the document fetch, with a mocked HTTP transport."""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from websearch.tools import documents
+from websearch.tools.documents import (
+    DocumentSettings,
+    NotADocument,
+    detect_kind,
+    fetch_document,
+    flatten_json,
+    kind_from_content_type,
+    kind_from_path,
+    sniff,
+)
+
+RESOURCES = {
+    "/data.json": ("application/json", json.dumps({"a": {"b": [1, "x"]}}).encode()),
+    "/notes.txt": ("text/plain; charset=utf-8", b"line one\nline  two\n" * 100),
+    "/page.json": ("text/html", b"<!DOCTYPE html><html><body>page</body></html>"),
+    "/report": ("application/pdf", b"%PDF-1.7\n" + b"0" * 2000),
+    "/paper.pdf": ("text/html; charset=utf-8", b"\n<!-- sign in --><head></head>"),
+}
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Serve the resources, recording the requests."""
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path))
+        content_type, body = RESOURCES[request.url.path]
+        return httpx.Response(200, headers={"content-type": content_type}, content=body)
+
+    def client(timeout):
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(documents, "_client", client)
+    return requests
+
+
+def test_kinds():
+    """Kinds are detected from the path, the content type and the body."""
+    assert kind_from_path("https://example.com/paper.PDF?download=1") == "pdf"
+    assert kind_from_path("https://example.com/page") is None
+    assert kind_from_content_type("application/ld+json; charset=utf-8") == "json"
+    assert kind_from_content_type("text/html") is None
+    assert sniff(b"  %PDF-1.4") == "pdf"
+    assert sniff(b"<!doctype html>") == "html"
+
+
+def test_flatten_json():
+    """Every value gets its path, until the character or time budget."""
+    text, truncated = flatten_json('{"a": {"b": [1, null, "x"]}, "c": ""}')
+    assert text == "a.b[0]: 1\na.b[2]: x"
+    assert not truncated
+
+    document = '{"a": [1, 2, 3]}'
+    assert flatten_json(document, max_chars=5) == ("a[0]: 1", True)
+    assert flatten_json(document, deadline=time.monotonic()) == ("", True)
+
+
+def test_detect_kind(monkeypatch, transport):
+    """A HEAD request is sent only when the path does not tell the kind."""
+    monkeypatch.setattr(documents, "pdf_support", lambda: True)
+    settings = DocumentSettings(DOCUMENT_HEAD_PROBE=True)
+    assert asyncio.run(detect_kind("https://example.com/report", settings)) == "pdf"
+    assert asyncio.run(detect_kind("https://example.com/data.json", settings)) == "json"
+    assert transport == [("HEAD", "/report")]
+
+
+def test_fetch_document(transport):
+    """Documents are extracted within the budgets of their kind."""
+    settings = DocumentSettings(TEXT_MAX_BYTES=100, PDF_MAX_BYTES=1000)
+
+    async def fetch(path, kind, **kwargs):
+        url = f"https://example.com{path}"
+        return await fetch_document(url, kind, settings=settings, **kwargs)
+
+    data = asyncio.run(fetch("/data.json", "json"))
+    assert data["text"] == "a.b[0]: 1\na.b[1]: x"
+    assert data["content_type"] == "json"
+
+    notes = asyncio.run(fetch("/notes.txt", "text", max_chars=30))
+    assert notes["text"].startswith("line one\nline two")
+    assert len(notes["text"]) == 30
+    assert notes["truncated"]
+
+    assert asyncio.run(fetch("/report", "pdf")) is None
+    with pytest.raises(NotADocument):
+        asyncio.run(fetch("/page.json", "json"))
+    # Served as HTML, e.g. a login page, whatever its body starts with.
+    with pytest.raises(NotADocument):
+        asyncio.run(fetch("/paper.pdf", "pdf"))
+
+
+def test_pdf_without_support(monkeypatch, transport):
+    """Without the 'pdf' extra, PDFs are left to the browser."""
+    monkeypatch.setattr(documents, "pdf_support", lambda: False)
+    assert asyncio.run(detect_kind("https://example.com/paper.pdf")) is None
+    assert asyncio.run(detect_kind("https://example.com/data.json")) == "json"
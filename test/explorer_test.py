@@ -0,0 +1,69 @@
+"""Tests for the deterministic search explorer."""
+
+import asyncio
+
+from pydantic_ai.models.function import FunctionModel
+
+import websearch.nodes.explorer as explorer_node
+from websearch.agents.explorer import explorerAgent
+from websearch.nodes.explorer import explorer
+from websearch.retrieval import rank_results
+from websearch.retrieval.snippets import clean_snippet, domain_prior
+
+RESULTS = [
+    {
+        "url": "https://www.pinterest.com/pixel",
+        "title": "Pixel carbon footprint ideas",
+        "description": "Pixel <strong>carbon footprint</strong> pins.",
+    },
+    {
+        "url": "https://example.com/camera",
+        "title": "Pixel camera review",
+        "description": "Night photos with the Pixel.",
+    },
+    {
+        "url": "https://en.wikipedia.org/wiki/Pixel",
+        "title": "Pixel",
+        "description": "The Pixel has a carbon footprint of 70 kg CO2e.",
+        "extra_snippets": ["Google publishes a product environmental report."],
+    },
+]
+
+
+def test_rank_results():
+    """Matching snippets rank first, weighted by the domain priors."""
+    ranked = rank_results(RESULTS, ["pixel carbon footprint"], limit=2)
+    assert [r["url"] for r in ranked] == [
+        "https://en.wikipedia.org/wiki/Pixel",
+        "https://www.pinterest.com/pixel",
+    ]
+    no_match = rank_results(RESULTS, ["unrelated"], limit=3)
+    assert no_match == RESULTS
+    assert domain_prior("https://de.wikipedia.org/x") > 1.0
+    assert clean_snippet("a <strong>b</strong> &amp; c") == "a b & c"
+
+
+def test_search_explorer_skips_agent(monkeypatch):
+    """The search explorer selects pages without the explorer agent."""
+
+    async def search(query, limit_results=3):
+        return {"data": {"web": {"results": RESULTS}}, "error": None}
+
+    def unexpected(*args):
+        raise AssertionError("the agent must not be called")
+
+    monkeypatch.setattr(explorer_node, "search", search)
+    state = {
+        "agent_query": "pixel carbon footprint",
+        "user_query": "What is the carbon footprint of a Pixel?",
+        "result_limit": 1,
+        "fetch_pages": False,
+        "explorer_mode": "search",
+    }
+    with explorerAgent.override(model=FunctionModel(unexpected)):
+        command = asyncio.run(explorer(state))
+
+    [page] = command.update["pages"]
+    assert page.url == "https://en.wikipedia.org/wiki/Pixel"
+    assert "70 kg" in page.content
+    assert "environmental report" in page.content
@@ -0,0 +1,53 @@
+"""Tests for the cross-branch page deduplication."""
+
+import asyncio
+
+from websearch.records import PageRecord
+from websearch.state import merge_pages
+from websearch.tools.fetchcoordinator import FetchCoordinator
+from websearch.urls import normalize_url
+
+
+def test_normalize_url():
+    """Equivalent URLs normalize to the same string."""
+    assert (
+        normalize_url("HTTPS://Example.COM:443/a?utm_source=x&id=1&fbclid=2#top")
+        == "https://example.com/a?id=1"
+    )
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("https://github.com/o/r/blob/x.py?ref=v2").endswith("ref=v2")
+    assert normalize_url("http://example.com:8080/") == "http://example.com:8080/"
+
+
+def test_concurrent_fetches_are_shared():
+    """Concurrent requests for the same page trigger a single fetch."""
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {"url": url, "text": "text"}
+
+    async def run():
+        coordinator = FetchCoordinator(fetch)
+        return await asyncio.gather(
+            coordinator.fetch("https://example.com/a#one"),
+            coordinator.fetch("https://EXAMPLE.com/a?utm_medium=x"),
+            coordinator.fetch("https://example.com/b"),
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert results[0] is results[1]
+
+
+def test_merge_pages_drops_duplicates():
+    """Pages already in the state are not added again."""
+    left = [PageRecord.create("https://example.com/a", content="a")]
+    right = [
+        PageRecord.create("https://example.com/a#x", content="b", text="full"),
+        PageRecord.create("https://example.com/c", content="c"),
+    ]
+    merged = merge_pages(left, right)
+    assert [p.content for p in merged] == ["a", "c"]
+    assert merged[0].text == "full"
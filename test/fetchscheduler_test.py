@@ -0,0 +1,107 @@
+"""Tests for the per-host fetch scheduler."""
+
+import asyncio
+import time
+
+from websearch.tools.fetchscheduler import FetchScheduler, SchedulerSettings
+
+
+def make_scheduler(**kwargs) -> FetchScheduler:
+    """Create a scheduler that does not download robots.txt files."""
+    return FetchScheduler(
+        SchedulerSettings(FETCH_RESPECT_ROBOTS=False, **kwargs),
+    )
+
+
+def test_requests_to_a_host_are_spaced():
+    """Requests to the same host start at least `min_interval` apart."""
+    scheduler = make_scheduler(FETCH_MIN_INTERVAL=0.05)
+    starts = []
+
+    async def fetch(url):
+        async with scheduler.slot(url):
+            starts.append(time.monotonic())
+
+    async def run():
+        await asyncio.gather(*(fetch("https://example.com/") for _ in range(3)))
+
+    asyncio.run(run())
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_per_host_concurrency_is_capped():
+    """No more than `per_host` fetches run concurrently on a host."""
+    scheduler = make_scheduler(FETCH_MIN_INTERVAL=0, FETCH_PER_HOST_CONCURRENCY=2)
+    running = peak = 0
+
+    async def fetch(url):
+        nonlocal running, peak
+        async with scheduler.slot(url):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(*(fetch("https://example.com/") for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+
+
+def test_breaker_opens_on_failing_host():
+    """A host whose fetches keep failing is skipped, others are not."""
+    scheduler = make_scheduler(FETCH_BREAKER_MIN_REQUESTS=3, FETCH_BREAKER_COOLDOWN=60)
+    for _ in range(3):
+        scheduler.record("https://down.example.com/a", False)
+
+    assert not scheduler.allow("https://down.example.com/b")
+    assert scheduler.allow("https://up.example.com/")
+
+
+def test_half_open_breaker_admits_one_trial():
+    """After the cooldown a single trial runs, its outcome decides."""
+    scheduler = make_scheduler(FETCH_BREAKER_MIN_REQUESTS=2, FETCH_BREAKER_COOLDOWN=0)
+    for _ in range(2):
+        scheduler.record("https://flaky.example.com/a", False)
+
+    trial = scheduler.allow("https://flaky.example.com/b")
+    assert trial is not None
+    assert scheduler.allow("https://flaky.example.com/c") is None
+    scheduler.record("https://flaky.example.com/b", False, trial)
+
+    trial = scheduler.allow("https://flaky.example.com/d")
+    assert trial is not None
+    scheduler.abandon("https://flaky.example.com/d", trial)
+    trial = scheduler.allow("https://flaky.example.com/e")
+    assert trial is not None
+    scheduler.record("https://flaky.example.com/e", True, trial)
+
+    assert scheduler.allow("https://flaky.example.com/f") is not None
+    assert scheduler.allow("https://flaky.example.com/g") is not None
+
+
+def test_overlapping_fetches_do_not_decide_the_trial():
+    """Fetches started before the breaker opened do not close or reopen it."""
+    scheduler = make_scheduler(FETCH_BREAKER_MIN_REQUESTS=2, FETCH_BREAKER_COOLDOWN=60)
+    url = "https://flaky.example.com/"
+    slow = [scheduler.allow(url) for _ in range(3)]
+    for _ in range(2):
+        scheduler.record(url, False, scheduler.allow(url))
+    assert scheduler.allow(url) is None
+
+    # A slow fetch succeeding after the breaker opened does not close it.
+    scheduler.record(url, True, slow[0])
+    assert scheduler.allow(url) is None
+
+    scheduler.settings.breaker_cooldown = 0
+    trial = scheduler.allow(url)
+    assert trial is not None
+    # Neither a late failure nor a cancelled slow fetch ends the trial.
+    scheduler.record(url, False, slow[1])
+    scheduler.abandon(url, slow[2])
+    assert scheduler.allow(url) is None
+
+    scheduler.record(url, True, trial)
+    assert scheduler.allow(url) is not None
@@ -0,0 +1,48 @@
+"""Tests for the incremental HTML text extractor."""
+
+from websearch.tools.htmlstream import extract_text, iter_chunks, iter_text_blocks
+
+HTML = """
+<html>
+<head><title>Title</title><script>var s = "<p>not content</p>";</script></head>
+<body>
+<nav>Home - About us - Contact - Careers</nav>
+<article>
+<h1>A heading that is long enough</h1>
+<p>The first paragraph of the article body.</p>
+<p>The first paragraph of the article body.</p>
+<p>The second paragraph of the article body.</p>
+</article>
+</body>
+</html>
+"""
+
+
+def test_blocks_skip_scripts_and_navigation():
+    """Script and navigation text is not extracted."""
+    blocks = list(iter_text_blocks(iter_chunks(HTML, 5)))
+    assert blocks[0] == "A heading that is long enough"
+    assert not any("not content" in b or "Careers" in b for b in blocks)
+
+
+def test_extract_text_removes_repeated_blocks():
+    """Repeated blocks are only kept once."""
+    text, truncated = extract_text(iter_chunks(HTML))
+    assert text.count("first paragraph") == 1
+    assert "second paragraph" in text
+    assert not truncated
+
+
+def test_extract_text_stops_at_budget():
+    """Extraction stops reading once the budget is met."""
+    consumed = []
+
+    def chunks():
+        for chunk in iter_chunks(HTML, 10):
+            consumed.append(chunk)
+            yield chunk
+
+    text, truncated = extract_text(chunks(), max_chars=40)
+    assert truncated
+    assert len(text) <= 40
+    assert len("".join(consumed)) < len(HTML)
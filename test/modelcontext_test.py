@@ -0,0 +1,86 @@
+"""Tests for the per-agent models, their fallbacks and metrics."""
+
+import asyncio
+
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.fallback import FallbackModel
+from pydantic_ai.models.function import FunctionModel
+
+from websearch.meteredmodel import MeteredModel
+from websearch.metrics import metrics
+from websearch.modelcontext import AppContext
+
+
+def _context(**settings) -> AppContext:
+    return AppContext(
+        PROVIDER="ollama",
+        TOGETHERAI_API_KEY="x",
+        TOGETHERAI_BASE_URL="https://together.invalid/v1",
+        OLLAMA_MODEL="qwen2.5:7b",
+        **settings,
+    )
+
+
+def test_agent_models():
+    """Agents use their own model, then the fallbacks, else the default one."""
+    context = _context(
+        QUERYGEN_MODEL="ollama:qwen2.5:3b",
+        SYNTETIZER_MODEL="together:meta-llama/Llama-3.3-70B, llama3.1:8b",
+        MODEL_FALLBACKS="together:meta-llama/Llama-3.3-70B,qwen2.5:7b",
+    )
+    assert context.agent_models("querygen") == [
+        ("ollama", "qwen2.5:3b"),
+        ("together", "meta-llama/Llama-3.3-70B"),
+        ("ollama", "qwen2.5:7b"),
+    ]
+    assert context.agent_models("syntetizer") == [
+        ("together", "meta-llama/Llama-3.3-70B"),
+        ("ollama", "llama3.1:8b"),
+        ("ollama", "qwen2.5:7b"),
+    ]
+    assert context.agent_models("explorer")[0] == ("ollama", "qwen2.5:7b")
+    assert context.ollama_models() == ["qwen2.5:7b", "qwen2.5:3b", "llama3.1:8b"]
+
+
+def test_get_model_provider():
+    """A single model is metered, a chain becomes a fallback model."""
+    context = _context(EXPLORER_MODEL="ollama:qwen2.5:3b")
+    model = context.get_model_provider("explorer")
+    assert isinstance(model, MeteredModel)
+    assert model.model_name == "qwen2.5:3b"
+
+    context = _context(MODEL_FALLBACKS="together:meta-llama/Llama-3.3-70B")
+    model = context.get_model_provider("querygen")
+    assert isinstance(model, FallbackModel)
+    assert [m.model_name for m in model.models] == [
+        "qwen2.5:7b",
+        "meta-llama/Llama-3.3-70B",
+    ]
+    assert model.models[1].wrapped.client.base_url.host == "together.invalid"
+
+
+def test_fallback_metrics():
+    """A failing model falls back, and both models are recorded."""
+    metrics.reset()
+
+    def fail(messages, info):
+        raise ModelHTTPError(503, "small")
+
+    def answer(messages, info):
+        return ModelResponse(parts=[TextPart("answer")])
+
+    model = FallbackModel(
+        MeteredModel(FunctionModel(fail), agent="test", price=2.0),
+        MeteredModel(FunctionModel(answer), agent="test", price=2.0),
+    )
+    result = asyncio.run(Agent(model).run("question"))
+
+    assert result.data == "answer"
+    tokens = result.usage().total_tokens
+    assert metrics.counter("llm.test.errors") == 1
+    assert metrics.counter("llm.test.requests") == 1
+    assert metrics.counter("llm.test.tokens") == tokens
+    assert metrics.counter("llm.test.cost_usd") == tokens * 2 / 1_000_000
+    assert metrics.snapshot("llm.test.seconds")
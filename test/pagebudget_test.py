@@ -0,0 +1,163 @@
+"""Tests for the resource budgets of the page fetches."""
+
+import asyncio
+import time
+
+import diskcache
+
+import websearch.tools.navigatelinks as navigatelinks
+from websearch import iocache
+from websearch.records import PageRecord
+from websearch.tools.fetchscheduler import FetchScheduler, SchedulerSettings
+from websearch.tools.navigatelinks import (
+    clean_text,
+    extract_html,
+    extract_page_text,
+    intercept_route,
+)
+from websearch.tools.pagebudget import PageBudget, PageBudgetSettings
+
+HTML = "<main class='main'>" + "".join(
+    f"<div><p>Paragraph {i} of a giant table of numbers.</p></div>" for i in range(500)
+)
+
+
+class FakeRequest:
+    """A finished request whose chunked response has no content length."""
+
+    url = "https://example.com/table"
+
+    def __init__(self, size):
+        """Initialize the request."""
+        self.size = size
+
+    async def sizes(self):
+        """Get the sizes of the request and its response."""
+        return {"requestBodySize": 0, "responseBodySize": self.size}
+
+
+class FakeRoute:
+    """A route recording whether it was aborted."""
+
+    class request:
+        """A script request."""
+
+        url = "https://example.com/script.js"
+        resource_type = "script"
+
+    aborted = False
+
+    async def abort(self):
+        """Abort the request."""
+        self.aborted = True
+
+    async def continue_(self):
+        """Continue the request."""
+
+
+def _budget(**settings):
+    return PageBudget(settings=PageBudgetSettings(**settings))
+
+
+def test_extraction_time_budget():
+    """The extraction stops at the CPU time budget with the text so far."""
+    full, _ = extract_html(HTML, _budget(), stream=False)
+    budget = _budget(PAGE_EXTRACTION_SECONDS=1e-6)
+    text, truncated = extract_html(HTML, budget, stream=False)
+
+    assert truncated
+    assert budget.violations == ["time"]
+    assert len(text) < len(full)
+
+    budget = _budget(PAGE_EXTRACTION_SECONDS=1e-6)
+    text, truncated = extract_html(HTML, budget, stream=True)
+    assert truncated and budget.violations == ["time"]
+
+
+def test_clean_text_stops():
+    """Cleaning a large text stops as soon as asked."""
+    text = " ".join(f"Sentence number {i} is unique." for i in range(2_000))
+    start = time.monotonic()
+    assert clean_text(text, stop=lambda: True)
+    assert time.monotonic() - start < 1
+
+
+def test_extract_page_text_stops():
+    """Once stopped, the extraction walks no other tag or section."""
+    calls = []
+
+    def stop():
+        calls.append(True)
+        return True
+
+    assert extract_page_text(HTML, stop=stop) == ""
+    assert calls == [True]
+
+
+def test_html_and_memory_budgets():
+    """Long HTML is cut, and extractions stop over the memory budget."""
+    budget = _budget(PAGE_MAX_HTML_CHARS=100)
+    assert len(budget.cap_html(HTML)) == 100
+    assert budget.cap_html(HTML[:100], len(HTML)) == HTML[:100]
+    assert budget.violations == ["html"]
+
+    budget = _budget(PAGE_MAX_RSS_MB=1)
+    assert budget.exhausted()
+    assert budget.violations == ["rss"]
+
+
+def test_bytes_budget():
+    """Requests are aborted once the page loaded its budget of bytes."""
+    budget = _budget(PAGE_MAX_BYTES=1000)
+    asyncio.run(budget.count_request(FakeRequest(600)))
+    route = FakeRoute()
+    asyncio.run(intercept_route(route, "https://example.com", budget))
+    assert not route.aborted
+
+    asyncio.run(budget.count_request(FakeRequest(600)))
+    asyncio.run(intercept_route(route, "https://example.com", budget))
+    assert route.aborted
+    assert budget.violations == ["bytes"]
+
+
+def test_page_record_limits():
+    """The limits hit are kept on the page record."""
+    page = PageRecord.create("https://example.com").with_text(
+        "text", truncated=True, limits=["time"]
+    )
+    assert page.limits == ("time",)
+    assert page.to_dict()["limits"] == ["time"]
+    assert PageRecord.create("https://example.com").merge(page).limits == ("time",)
+
+
+def test_transient_limits_not_cached(monkeypatch, tmp_path):
+    """Pages cut by the CPU time or memory budgets are fetched again."""
+    fetched = []
+
+    async def fetch(url, **kwargs):
+        fetched.append(url)
+        limits = ("time",) if "busy" in url else ("bytes",)
+        return {"url": url, "text": "text", "truncated": True, "limits": limits}
+
+    cache = diskcache.FanoutCache(directory=str(tmp_path / "cache"), shards=1)
+    monkeypatch.setattr(iocache, "cache", cache)
+    monkeypatch.setattr(navigatelinks, "_fetch", fetch)
+    monkeypatch.setattr(
+        navigatelinks,
+        "scheduler",
+        FetchScheduler(
+            SchedulerSettings(FETCH_RESPECT_ROBOTS=False, FETCH_MIN_INTERVAL=0)
+        ),
+    )
+
+    async def run():
+        for url in ["https://example.com/busy", "https://example.org/big"] * 2:
+            await navigatelinks.navigate_link(url)
+
+    asyncio.run(run())
+    cache.close()
+    assert fetched == [
+        "https://example.com/busy",
+        "https://example.org/big",
+        "https://example.com/busy",
+    ]
@@ -0,0 +1,121 @@
+"""Tests for the local passage store and the recall node, on Milvus Lite."""
+
+import asyncio
+
+import pytest
+
+import websearch.nodes.recall as recall_node
+from websearch import query
+from websearch.agents.explorer import explorerAgent
+from websearch.agents.querygen import querygenAgent
+from websearch.agents.syntetizer import syntetizerAgent
+from websearch.retrieval.passagestore import PassageStore, passage_store_settings
+from websearch.tools.directanswer import fast_path_settings
+
+pytestmark = pytest.mark.usefixtures("cache")
+
+VOCABULARY = ["sky", "blue", "rust", "compiler"]
+
+SKY = "The sky is blue because of the Rayleigh scattering of the sunlight."
+RUST = "The Rust compiler checks the ownership and the lifetimes of the values."
+
+
+class FakeEmbedding:
+    """Embed texts as the counts of a few words."""
+
+    dim = len(VOCABULARY)
+
+    def _encode(self, texts):
+        return [
+            [text.lower().count(word) + 0.01 for word in VOCABULARY] for text in texts
+        ]
+
+    def encode_documents(self, texts):
+        """Embed passages."""
+        return self._encode(texts)
+
+    def encode_queries(self, texts):
+        """Embed queries."""
+        return self._encode(texts)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store of two pages in a temporary database."""
+    store = PassageStore(tmp_path / "passages.db", embedding_fn=FakeEmbedding())
+    store.add("https://example.com/sky", SKY)
+    store.add("https://example.com/rust", RUST)
+    yield store
+    store.client.close()
+
+
+def test_index_and_search(store):
+    """Passages are found by similarity, and reindexing a page replaces them."""
+    [best, *_] = store.search("why is the sky blue?", top_k=2)
+    assert best.url == "https://example.com/sky"
+    assert best.text == SKY
+    assert best.category == "cached"
+
+    store.add("https://example.com/sky", "A blue sky. The sky at noon.")
+    hits = store.search("sky", top_k=10)
+    assert len([hit for hit in hits if hit.url == "https://example.com/sky"]) == 1
+    assert store.search("sky", max_age=-10) == []
+    assert store.search("sky", top_k=0) == []
+
+
+def _run(monkeypatch, model, store, **settings):
+    monkeypatch.setattr(recall_node, "passage_store", store)
+    monkeypatch.setattr(fast_path_settings, "enabled", False)
+    for name, value in {"enabled": True, "min_hits": 1, **settings}.items():
+        monkeypatch.setattr(passage_store_settings, name, value)
+    generated = []
+
+    def generate(prompt):
+        generated.append(True)
+        return {"queries": ["query"]}
+
+    explored = {
+        "pages": [{"url": "https://example.com/web", "category": "web", "content": ""}]
+    }
+    answer = {"answer": "answer", "sources": [], "error": None}
+
+    async def run():
+        with (
+            querygenAgent.override(model=model(generate)),
+            explorerAgent.override(model=model(lambda _: explored)),
+            syntetizerAgent.override(model=model(lambda _: answer)),
+        ):
+            return [
+                event
+                async for event in query.exec("Why is the sky blue?", checkpoint=False)
+            ]
+
+    events = asyncio.run(run())
+    [answer] = [event for event in events if "answer" in event]
+    return answer, generated
+
+
+def test_recall_hit(monkeypatch, model, store):
+    """A question covered by the store is answered without searching."""
+    answer, generated = _run(monkeypatch, model, store, min_score=0.9)
+    assert answer["path"] == "recall"
+    assert generated == []
+
+
+def test_recall_miss(monkeypatch, model, store):
+    """A question not covered by the store goes to the query generation."""
+    answer, generated = _run(monkeypatch, model, store, min_hits=3)
+    assert answer["path"] == "explorer"
+    assert generated == [True]
+
+
+def test_recall_disabled(monkeypatch, model):
+    """The store is not queried when it is disabled."""
+
+    class Unreachable:
+        def recall(self, query):
+            raise AssertionError("the store must not be queried")
+
+    answer, generated = _run(monkeypatch, model, Unreachable(), enabled=False)
+    assert answer["path"] == "explorer"
+    assert generated == [True]
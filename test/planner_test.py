@@ -0,0 +1,71 @@
+"""Tests for the adaptive fan-out planner."""
+
+import uuid
+from contextlib import ExitStack
+
+from websearch.planner import (
+    estimate_complexity,
+    load,
+    plan,
+    planner_settings,
+    remember_queries,
+)
+
+
+def _saturate(stack: ExitStack, factor: int) -> None:
+    for _ in range(factor * planner_settings.llm_capacity):
+        stack.enter_context(load.track("llm"))
+
+
+def test_complexity():
+    """Comparisons and multi-part questions need more evidence."""
+    simple = estimate_complexity("capital of France?")
+    medium = estimate_complexity("What's the carbon footprint of a google pixel phone?")
+    complex = estimate_complexity(
+        "Compare the carbon footprint of a google pixel and an iphone, "
+        "and explain why they differ"
+    )
+    assert simple < medium < complex <= 1.0
+
+
+def test_plan_scales_with_complexity():
+    """Complex questions get more queries and pages when idle."""
+    simple = plan("capital of France?")
+    complex = plan("Compare the pixel and the iphone, and why do they differ?")
+    assert simple.level == complex.level == "normal"
+    assert simple.num_queries < complex.num_queries
+    assert simple.result_limit < complex.result_limit
+    assert plan("capital of France?", result_limit=7).result_limit == 7
+
+
+def test_plan_degrades_under_load():
+    """The fan-out shrinks as the LLM calls in flight pile up."""
+    question = f"Compare a and b, and explain why {uuid.uuid4()}"
+    idle = plan(question, fetch_pages=True, max_rounds=3)
+
+    with ExitStack() as stack:
+        _saturate(stack, 1)
+        busy = plan(question, fetch_pages=True, max_rounds=3)
+    assert busy.level == "busy"
+    assert busy.num_queries < idle.num_queries
+    assert not busy.fetch_pages and busy.max_rounds == 1
+
+    with ExitStack() as stack:
+        _saturate(stack, 2)
+        overloaded = plan(question)
+    assert overloaded.level == "overloaded"
+    assert overloaded.num_queries == 1 and not overloaded.cache_only
+    assert load["llm"] == 0
+
+
+def test_overloaded_uses_cached_queries(cache):
+    """A question seen recently is answered from its cached searches."""
+    question = f"pixel carbon footprint {uuid.uuid4()}"
+    remember_queries(question, ["pixel emissions", "pixel lifecycle"])
+
+    with ExitStack() as stack:
+        _saturate(stack, 2)
+        overloaded = plan(question.upper())
+    assert overloaded.cache_only
+    assert overloaded.queries == ["pixel emissions", "pixel lifecycle"]
+    assert overloaded.num_queries == 2
@@ -0,0 +1,118 @@
+"""Tests for the rule based request filter."""
+
+import asyncio
+
+from websearch.tools.navigatelinks import intercept_route
+from websearch.tools.requestfilter import AhoCorasick, RequestFilter
+
+RULES = [
+    "! comment",
+    "example.com##.ad-banner",
+    "||ads.example.net^",
+    "/banner/*/track^",
+    "||cdn.example.org/ads.js$script,third-party",
+    "@@||ads.example.net/allowed/",
+    "/sponsor.$domain=news.example.com|~blog.example.com",
+]
+
+
+def test_aho_corasick_finds_overlapping_keywords():
+    """All the keywords contained in the text are reported."""
+    automaton = AhoCorasick()
+    for keyword in ["he", "she", "his", "hers"]:
+        automaton.add(keyword, keyword)
+    assert sorted(automaton.search("ushers")) == ["he", "hers", "she"]
+
+
+def test_host_rules_match_subdomains_only():
+    """Host rules match the host and subdomains, not lookalike hosts."""
+    request_filter = RequestFilter.from_rules(RULES)
+    assert request_filter.size == 5
+    assert request_filter.match("https://x.ads.example.net/a.js", "script").blocked
+    assert not request_filter.match("https://goodads.example.net/", "script").blocked
+    assert not request_filter.match("https://www.google.com/search", "document").blocked
+
+
+def test_exceptions_and_options():
+    """Exception rules win, and options restrict where rules apply."""
+    request_filter = RequestFilter.from_rules(RULES)
+    assert not request_filter.match("https://ads.example.net/allowed/x").blocked
+    assert request_filter.match("https://a.com/banner/1/track?x", "image").blocked
+
+    url = "https://cdn.example.org/ads.js"
+    assert request_filter.match(url, "script", "https://site.com/").blocked
+    assert not request_filter.match(url, "script", "https://cdn.example.org/").blocked
+    assert not request_filter.match(url, "image", "https://site.com/").blocked
+
+    url = "https://static.example.com/sponsor.png"
+    assert request_filter.match(url, "image", "https://news.example.com/").blocked
+    assert not request_filter.match(url, "image", "https://blog.example.com/").blocked
+
+
+def test_allow_hosts():
+    """Allow-listed hosts are never blocked."""
+    request_filter = RequestFilter.from_rules(RULES, allow_hosts=["example.net"])
+    assert not request_filter.match("https://ads.example.net/x.js", "script").blocked
+
+
+def test_subdocument_rules_skip_pages():
+    """Frame rules match the documents of child frames, not the pages."""
+    request_filter = RequestFilter.from_rules(
+        ["||video.example.com/embed/$subdocument"]
+    )
+    url = "https://video.example.com/embed/1"
+    assert request_filter.match(url, "subdocument").blocked
+    assert not request_filter.match(url, "document").blocked
+
+
+class FakeFrame:
+    """A frame, child of `parent_frame` if set."""
+
+    def __init__(self, parent_frame=None):
+        """Initialize the frame."""
+        self.parent_frame = parent_frame
+
+
+class FakeRequest:
+    """A document request of a frame."""
+
+    resource_type = "document"
+
+    def __init__(self, url, frame):
+        """Initialize the request."""
+        self.url = url
+        self.frame = frame
+
+    def is_navigation_request(self):
+        """Documents are navigations."""
+        return True
+
+
+class FakeRoute:
+    """A route recording whether it was aborted."""
+
+    def __init__(self, request):
+        """Initialize the route."""
+        self.request = request
+        self.aborted = None
+
+    async def abort(self):
+        """Abort the request."""
+        self.aborted = True
+
+    async def continue_(self):
+        """Continue the request."""
+        self.aborted = False
+
+
+def test_page_navigation_not_filtered():
+    """A page on a blocked host loads, the same host in a frame does not."""
+    url = "https://stats.doubleclick.net/page"
+    main = FakeFrame()
+    page = FakeRoute(FakeRequest(url, main))
+    frame = FakeRoute(FakeRequest(url, FakeFrame(main)))
+
+    asyncio.run(intercept_route(page, url))
+    asyncio.run(intercept_route(frame, "https://example.com/"))
+    assert page.aborted is False
+    assert frame.aborted is True
@@ -0,0 +1,89 @@
+"""Tests for the deep research mode and the run budgets."""
+
+import asyncio
+import uuid
+
+import websearch.tools.fetchcoordinator as fetchcoordinator
+from websearch import query
+from websearch.agents.explorer import explorerAgent
+from websearch.agents.querygen import querygenAgent
+from websearch.agents.syntetizer import syntetizerAgent
+from websearch.budget import Budget
+from websearch.runcontext import RunContext, reset_run, set_run
+from websearch.tools.directanswer import fast_path_settings
+from websearch.tools.websearch import websearch
+
+
+def _querygen(prompt):
+    if "Current answer" in prompt:
+        return {"queries": [f"follow up {prompt.count('- ')}"]}
+    return {"queries": ["first query"]}
+
+
+def _research(monkeypatch, model, fetched, **kwargs):
+    async def fetch(url, **_):
+        fetched.append(url)
+        return {"url": url, "text": f"text of {url}", "truncated": False}
+
+    monkeypatch.setattr(fetchcoordinator, "navigate_link", fetch)
+    monkeypatch.setattr(fast_path_settings, "enabled", False)
+    explorer_result = {
+        "pages": [{"url": "https://example.com/a", "category": "a", "content": "a"}]
+    }
+    answer = {"answer": "answer", "sources": [], "error": None}
+
+    async def run():
+        with (
+            querygenAgent.override(model=model(_querygen)),
+            explorerAgent.override(model=model(lambda _: explorer_result)),
+            syntetizerAgent.override(model=model(lambda _: answer)),
+        ):
+            return [
+                event
+                async for event in query.exec(
+                    "question", checkpoint=False, fetch_pages=True, **kwargs
+                )
+            ]
+
+    return asyncio.run(run())
+
+
+def test_deep_research_rounds(monkeypatch, model):
+    """Every round adds new queries, and pages already fetched are reused."""
+    fetched = []
+    events = _research(monkeypatch, model, fetched, deep_research=True)
+
+    assert [e["round"] for e in events if "round" in e] == [2, 3]
+    assert len([e for e in events if "answer" in e]) == 3
+    assert fetched == ["https://example.com/a"]
+    usage = events[-1]["usage"]
+    assert usage["fetches"] == 1
+    assert usage["tokens"] > 0
+
+
+def test_budget_stops_research(monkeypatch, model):
+    """No round starts once the budget is used up."""
+    budget = Budget(max_fetches=1)
+    events = _research(monkeypatch, model, [], deep_research=True, budget=budget)
+    assert not [e for e in events if "round" in e]
+    assert events[-1]["usage"]["fetches"] == 1
+    assert budget.fetches == 0 and budget.max_seconds is None
+    assert len([e for e in events if "answer" in e]) == 1
+
+
+def test_single_round_by_default(monkeypatch, model):
+    """Without deep research the graph ends after the first answer."""
+    events = _research(monkeypatch, model, [])
+    assert not [e for e in events if "round" in e]
+
+
+def test_search_budget():
+    """Searches not served from the cache are refused over the budget."""
+    run = RunContext(budget=Budget(max_searches=0))
+    token = set_run(run)
+    try:
+        result = asyncio.run(websearch(f"uncached {uuid.uuid4()}"))
+    finally:
+        reset_run(token)
+    assert "budget is exhausted" in result
+    assert run.budget.searches == 0
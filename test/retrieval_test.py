@@ -0,0 +1,35 @@
+"""Tests for the passage ranking stage."""
+
+from websearch.records import PageRecord
+from websearch.retrieval import BM25Index, rank_passages, split_passages
+
+
+def test_bm25_prefers_matching_documents():
+    """Documents containing the query terms score higher."""
+    index = BM25Index(
+        [
+            "The Pixel phone has a carbon footprint of 70 kg CO2e.",
+            "The camera takes great photos at night.",
+        ]
+    )
+    scores = index.score("pixel carbon footprint")
+    assert scores[0] > scores[1] == 0.0
+
+
+def test_split_passages_respects_max_chars():
+    """Passages never exceed the configured length."""
+    text = "\n".join(f"Sentence number {i} of the page." for i in range(100))
+    passages = split_passages(text, max_chars=120)
+    assert len(passages) > 1
+    assert all(len(p) <= 120 for p in passages)
+
+
+def test_rank_passages_keeps_top_k():
+    """Only the top-K most relevant passages are kept."""
+    pages = [
+        PageRecord.create("a", content="Pixel emissions are 70 kg."),
+        PageRecord.create("b", text="Unrelated cooking recipe."),
+    ]
+    passages = rank_passages(pages, ["pixel emissions"], top_k=1, embeddings=False)
+    assert [p.url for p in passages] == ["a"]
+    assert rank_passages(pages, ["pixel emissions"], top_k=0, embeddings=False) == []
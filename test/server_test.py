@@ -0,0 +1,206 @@
+"""Tests for the HTTP server, with an injected executor."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("starlette")
+
+import httpx  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+from websearch import (
+    query,  # noqa: E402
+    server,  # noqa: E402
+)
+from websearch.agents.explorer import explorerAgent  # noqa: E402
+from websearch.agents.querygen import querygenAgent  # noqa: E402
+from websearch.agents.syntetizer import syntetizerAgent  # noqa: E402
+from websearch.budget import deadline_settings  # noqa: E402
+from websearch.modelcontext import AppContext  # noqa: E402
+from websearch.runcontext import current_run  # noqa: E402
+from websearch.server import ServerSettings, create_app  # noqa: E402
+from websearch.warmup import Warmer, WarmupSettings  # noqa: E402
+
+
+def _events(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def _answer(question, **kwargs):
+    yield {"thread_id": "run"}
+    yield {"query": question}
+    yield {"answer": "answer", "sources": [], "path": "explorer"}
+    yield {"usage": {"max_seconds": kwargs["budget"].max_seconds}}
+
+
+def _app(executor=_answer, **settings):
+    return create_app(executor=executor, settings=ServerSettings(**settings))
+
+
+def test_query_streams_events():
+    """The events of a run are streamed as named Server-Sent Events."""
+    with TestClient(_app(SERVER_DEADLINE=30)) as client:
+        response = client.post("/query", json={"question": "why?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [name for name, _ in events] == ["thread_id", "query", "answer", "usage"]
+    assert events[-1][1]["usage"]["max_seconds"] == 30
+
+
+def test_invalid_request():
+    """A request without a question is refused."""
+    with TestClient(_app()) as client:
+        assert client.post("/query", json={}).status_code == 400
+        assert client.post("/query", content=b"not json").status_code == 400
+
+
+def test_deadline():
+    """A run over its deadline is cut with an error event."""
+
+    async def slow(question, **kwargs):
+        yield {"thread_id": "run"}
+        await asyncio.sleep(5)
+        yield {"answer": "late"}
+
+    with TestClient(_app(slow, SERVER_DEADLINE_GRACE=0.1)) as client:
+        response = client.post("/query", json={"question": "q", "deadline": 0.1})
+
+    assert [name for name, _ in _events(response.text)] == ["thread_id", "error"]
+
+
+def test_deadline_over_run_deadline(monkeypatch, model):
+    """A request deadline above `RUN_DEADLINE` is the deadline of the run."""
+    monkeypatch.setattr(deadline_settings, "run_seconds", 300)
+
+    def answer(prompt):
+        seconds = current_run().budget.max_seconds
+        return {"answer": str(seconds), "sources": [], "error": None}
+
+    with (
+        querygenAgent.override(model=model(lambda _: {"queries": ["q"]})),
+        explorerAgent.override(model=model(lambda _: {"pages": []})),
+        syntetizerAgent.override(model=model(answer)),
+        TestClient(_app(query.exec)) as client,
+    ):
+        response = client.post(
+            "/query",
+            json={"question": "why?", "deadline": 500, "checkpoint": False},
+        )
+
+    answers = [data for name, data in _events(response.text) if name == "answer"]
+    assert answers[0]["answer"] == "500.0"
+
+
+def test_admission_control():
+    """Runs over the capacity are refused with 429 until one finishes."""
+    release = asyncio.Event()
+
+    async def blocked(question, **kwargs):
+        await release.wait()
+        yield {"answer": question}
+
+    app = _app(blocked, SERVER_MAX_CONCURRENT=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            first = asyncio.create_task(c.post("/query", json={"question": "a"}))
+            while not app.state.admission.in_flight:
+                await asyncio.sleep(0.01)
+            refused = await c.post("/query", json={"question": "b"})
+            release.set()
+            await first
+            admitted = await c.post("/query", json={"question": "c"})
+            return refused, admitted
+
+    refused, admitted = asyncio.run(run())
+    assert refused.status_code == 429
+    assert refused.headers["retry-after"] == "5"
+    assert admitted.status_code == 200
+    assert app.state.admission.in_flight == 0
+
+
+def test_admission_released_on_early_disconnect():
+    """A client gone before the first event does not keep its slot."""
+    app = _app(SERVER_MAX_CONCURRENT=1)
+    messages = [
+        {"type": "http.request", "body": json.dumps({"question": "q"}).encode()}
+    ]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client disconnected")
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/query",
+        "headers": [(b"content-type", b"application/json")],
+        "query_string": b"",
+    }
+    with pytest.raises(OSError):
+        asyncio.run(app(scope, receive, send))
+    assert app.state.admission.in_flight == 0
+
+
+class FakePool:
+    """A worker pool running the queries in the server process."""
+
+    def __init__(self, workers):
+        """Initialize the pool."""
+        self.exec = _answer
+
+    async def start(self):
+        """Start no worker."""
+
+    async def close(self):
+        """Stop no worker."""
+
+
+def _wait_ready(client) -> None:
+    deadline = time.monotonic() + 5
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < deadline, "the models never became ready"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_health_and_readiness(monkeypatch, workers):
+    """Readiness follows the model warmer, in pool mode too, health does not."""
+    monkeypatch.setattr(server, "WorkerPool", FakePool)
+    context = AppContext(
+        PROVIDER="ollama", TOGETHERAI_API_KEY="x", TOGETHERAI_BASE_URL="x"
+    )
+    loaded = []
+    cold = Warmer(
+        context, WarmupSettings(WARMUP_ENABLED=True, WARMUP_RETRY_INTERVAL=0.01)
+    )
+    cold.ping = lambda: bool(loaded)
+    app = create_app(
+        executor=None if workers else _answer,
+        settings=ServerSettings(SERVER_WORKERS=workers),
+        model_warmer=cold,
+    )
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["in_flight"] == 0
+        loaded.append(True)
+        _wait_ready(client)
+        assert client.post("/query", json={"question": "q"}).status_code == 200
+        assert client.get("/metrics").status_code == 200
+
+    assert cold.last_traffic is not None
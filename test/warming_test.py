@@ -0,0 +1,98 @@
+"""Tests for the cache warming job, on a temporary cache."""
+
+import asyncio
+import time
+
+import diskcache
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+import websearch.tools.fetchcoordinator as fetchcoordinator
+from websearch import iocache, warming
+from websearch.agents.querygen import querygenAgent
+from websearch.nodes.querygen import querygen_cache_key
+from websearch.planner import known_queries, plan
+from websearch.warming import RateLimiter, WarmingSettings, warm_questions
+
+QUESTION = "What is the carbon footprint of a Pixel?"
+
+RESULTS = [
+    {"url": "https://example.com/camera", "title": "Pixel camera review"},
+    {"url": "https://example.com/footprint", "title": "Pixel carbon footprint"},
+]
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path):
+    """Fake searches and fetches, recorded, and a temporary cache."""
+    calls = {"searches": [], "fetches": [], "prompts": []}
+
+    async def search(query, limit_results=3):
+        calls["searches"].append((query, limit_results))
+        return {"data": {"web": {"results": RESULTS}}, "error": None}
+
+    async def fetch(url, **kwargs):
+        calls["fetches"].append(url)
+        return {"url": url, "text": f"text of {url}", "truncated": False}
+
+    def generate(messages, info):
+        calls["prompts"].append(messages[-1].parts[-1].content)
+        queries = {"queries": ["pixel carbon footprint", "pixel emissions"]}
+        return ModelResponse(parts=[ToolCallPart(info.result_tools[0].name, queries)])
+
+    cache = diskcache.FanoutCache(directory=str(tmp_path / "cache"), shards=2)
+    monkeypatch.setattr(iocache, "cache", cache)
+    monkeypatch.setattr(warming, "search", search)
+    monkeypatch.setattr(fetchcoordinator, "navigate_link", fetch)
+    with querygenAgent.override(model=FunctionModel(generate)):
+        yield calls
+    cache.close()
+
+
+def _warm(questions, **kwargs):
+    settings = WarmingSettings(WARMING_SEARCHES_PER_SECOND=0)
+    return asyncio.run(warm_questions(questions, settings=settings, **kwargs))
+
+
+def test_warm_questions(offline):
+    """Queries, searches and pages are warmed, and queries generated once."""
+    report = _warm([QUESTION], explorer="search")
+
+    fanout = plan(QUESTION, idle=True)
+    queries = ["pixel carbon footprint", "pixel emissions"][: fanout.num_queries]
+    assert iocache.cache.get(querygen_cache_key(QUESTION, fanout.num_queries))
+    assert known_queries(QUESTION) == queries
+    assert report["questions"] == 1
+    assert report["queries"] == len(queries)
+    assert [query for query, _ in offline["searches"]] == queries
+    assert offline["fetches"][0] == "https://example.com/footprint"
+    assert report["pages"] == len(offline["fetches"])
+
+    _warm([QUESTION], explorer="search")
+    assert len(offline["prompts"]) == 1
+
+
+def test_warm_given_queries(offline):
+    """Pre-generated queries are searched without the LLM, with the agent count."""
+    report = _warm(
+        ["Which phone?"], queries={"Which phone?": ["best phone"]}, fetch_pages=False
+    )
+
+    assert offline["prompts"] == []
+    assert offline["searches"] == [("best phone", 3)]
+    assert offline["fetches"] == []
+    assert known_queries("Which phone?") == ["best phone"]
+    assert report["questions"] == 1
+
+
+def test_rate_limiter():
+    """Operations are spaced out to the rate."""
+
+    async def run():
+        limiter = RateLimiter(20)
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(3)))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.1
@@ -0,0 +1,134 @@
+"""Tests for the model warmer, against a stub Ollama server."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from websearch.modelcontext import AppContext
+from websearch.warmup import Warmer, WarmupSettings
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """OpenAI-compatible completions endpoint loading its model on first use."""
+
+    load_seconds = 0.3
+    loaded = False
+    requests: list[float] = []
+
+    def do_POST(self):  # noqa: D102
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubOllama.requests.append(time.monotonic())
+        if not StubOllama.loaded:
+            time.sleep(StubOllama.load_seconds)
+            StubOllama.loaded = True
+        payload = json.dumps(
+            {
+                "object": "chat.completion",
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant"}}],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # noqa: D102
+        pass
+
+
+@pytest.fixture
+def ollama():
+    """Serve the stub on a free local port."""
+    StubOllama.loaded = False
+    StubOllama.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+
+
+def _warmer(base_url: str, **settings) -> Warmer:
+    context = AppContext(
+        PROVIDER="ollama",
+        TOGETHERAI_API_KEY="x",
+        TOGETHERAI_BASE_URL="x",
+        OLLAMA_BASE_URL=base_url,
+    )
+    settings = {
+        "WARMUP_ENABLED": True,
+        "WARMUP_RETRY_INTERVAL": 0.05,
+        "KEEPALIVE_INTERVAL": 0.1,
+        **settings,
+    }
+    return Warmer(context, WarmupSettings(**settings))
+
+
+async def _wait_for(condition, timeout: float = 5) -> None:
+    """Wait until a condition holds, failing after the timeout."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_warmup_and_keepalive(ollama):
+    """The model is loaded once, then pinged while there is traffic."""
+    warmer = _warmer(ollama)
+
+    async def run():
+        assert not warmer.ready
+        warmer.touch()
+        assert await warmer.wait_ready(timeout=5)
+        warmed = len(StubOllama.requests)
+        await _wait_for(lambda: len(StubOllama.requests) >= warmed + 2)
+        await warmer.stop()
+
+    asyncio.run(run())
+    assert StubOllama.loaded
+    assert warmer.status()["ready"]
+
+
+def test_keepalive_stops_when_idle(ollama):
+    """Without traffic the pings stop, the instance stays routable."""
+    warmer = _warmer(ollama, KEEPALIVE_IDLE=0.15)
+
+    async def run():
+        warmer.touch()
+        await warmer.wait_ready(timeout=5)
+        await _wait_for(lambda: warmer.state == "idle")
+        assert warmer.ready
+        pings = len(StubOllama.requests)
+        await asyncio.sleep(0.3)
+        assert len(StubOllama.requests) == pings
+        warmer.touch()
+        await _wait_for(lambda: len(StubOllama.requests) > pings)
+        await warmer.stop()
+
+    asyncio.run(run())
+
+
+def test_retries_until_server_is_up():
+    """Readiness stays false while the server is unreachable."""
+    warmer = _warmer("http://127.0.0.1:9/v1", WARMUP_TIMEOUT=0.2)
+
+    async def run():
+        ready = await warmer.wait_ready(timeout=0.3)
+        await warmer.stop()
+        return ready
+
+    assert not asyncio.run(run())
+    assert warmer.state == "warming"
+
+
+def test_other_providers_are_ready():
+    """Hosted providers need no warmup."""
+    context = AppContext(
+        PROVIDER="together", TOGETHERAI_API_KEY="x", TOGETHERAI_BASE_URL="x"
+    )
+    assert Warmer(context, WarmupSettings(WARMUP_ENABLED=True)).ready
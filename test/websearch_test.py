@@ -0,0 +1,55 @@
+"""Tests for the websearch tool output."""
+
+import json
+
+from websearch.tokens import estimate_tokens
+from websearch.tools.websearch import format_results
+
+RESPONSE = {
+    "web": {
+        "results": [
+            {
+                "url": f"https://example.com/{i}",
+                "title": f"Result <strong>{i}</strong>",
+                "description": "Pixel carbon footprint " * 30,
+                "age": "2 days ago",
+                "thumbnail": {"src": "https://imgs.example.com/t.jpg"},
+                "meta_url": {"scheme": "https", "netloc": "example.com"},
+                "profile": None,
+            }
+            for i in range(20)
+        ]
+    },
+    "discussion": {
+        "results": [
+            {
+                "data": {
+                    "forum_name": "r/pixel",
+                    "title": "Pixel emissions?",
+                    "question": "How green is it?",
+                    "top_comment": "Not very.",
+                    "num_answers": 3,
+                    "score": 10,
+                }
+            }
+        ]
+    },
+    "locations": None,
+}
+
+
+def test_format_results_is_compact():
+    """Only the useful fields are kept, within the token budget."""
+    text = format_results(RESPONSE, max_tokens=300, snippet_chars=80)
+    assert text.startswith("[web] Result 0 <https://example.com/0> (2 days ago)\n")
+    assert "thumbnail" not in text and "None" not in text
+    assert estimate_tokens(text) <= 300 + 10
+    assert "more results omitted" in text
+    assert estimate_tokens(text) < estimate_tokens(json.dumps(RESPONSE)) / 5
+
+
+def test_format_results_keeps_discussions():
+    """Discussion results are described by their forum thread."""
+    text = format_results(RESPONSE, max_tokens=100_000)
+    assert "[discussion] Pixel emissions?\nNot very." in text
+    assert text.count("[web]") == 20
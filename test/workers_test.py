@@ -0,0 +1,69 @@
+"""Tests for the worker pool, with a fake executor in the workers."""
+
+import asyncio
+import itertools
+import os
+
+import pytest
+
+from websearch.workers import WorkerError, WorkerPool, WorkerSettings
+
+_runs = itertools.count(1)
+
+
+async def _fake_exec(question, **options):
+    run = next(_runs)
+    yield {"thread_id": f"{os.getpid()}-{run}"}
+    if question == "fail":
+        raise ValueError("search failed")
+    await asyncio.sleep(5 if question == "slow" else 0.2)
+    yield {"answer": question, "sources": [], "path": "explorer"}
+
+
+def _install_fake():
+    from websearch.coalesce import coalescer
+
+    coalescer.executor = _fake_exec
+
+
+def _run(coroutine_fn):
+    async def run():
+        async with WorkerPool(
+            2,
+            initializer=_install_fake,
+            settings=WorkerSettings(WORKER_SHARED_BROWSER=False),
+        ) as pool:
+            return await coroutine_fn(pool)
+
+    return asyncio.run(run())
+
+
+async def _collect(pool, question, **options):
+    return [event async for event in pool.exec(question, **options)]
+
+
+def test_worker_pool():
+    """Runs are spread, identical runs shared, failures and cancels reported."""
+
+    async def scenario(pool):
+        spread = await asyncio.gather(
+            _collect(pool, "question a"), _collect(pool, "question b")
+        )
+        shared = await asyncio.gather(
+            _collect(pool, "Question c?"), _collect(pool, "question c")
+        )
+        with pytest.raises(WorkerError, match="search failed"):
+            await _collect(pool, "fail")
+
+        async for event in pool.exec("slow"):
+            break
+        after_cancel = await _collect(pool, "question d")
+        return spread, shared, after_cancel, [w.load for w in pool.workers]
+
+    spread, shared, after_cancel, loads = _run(scenario)
+
+    pids = {events[0]["thread_id"].split("-")[0] for events in spread}
+    assert len(pids) == 2
+    assert shared[0] == shared[1]
+    assert after_cancel[-1]["answer"] == "question d"
+    assert loads == [0, 0]